@@ -0,0 +1,59 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import cv2
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from frame_extraction import FrameExtraction
+
+
+# Compares the seek-per-frame extraction against the sequential grab()/retrieve() extraction
+VIDEO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "labeling_project", "test folder", "test.mp4")
+EXTRACTION_RATE = 25
+RUNS = 3
+
+
+def benchmark(video_path, sequential_decoding, start_second, end_second):
+    durations = []
+    extracted = 0
+
+    for _ in range(RUNS):
+        output_dir = tempfile.mkdtemp()
+        frame_extraction = FrameExtraction(video_path=video_path, output_dir=output_dir, similarity_threshold=0.8, sequential_decoding=sequential_decoding)
+
+        start = time.perf_counter()
+        frame_extraction.extract_frames_by_damage_time(start_second, end_second, EXTRACTION_RATE, auto_histogram=False)
+        durations.append(time.perf_counter() - start)
+
+        extracted = len(os.listdir(output_dir))
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    return min(durations), extracted
+
+
+def main():
+    video_path = sys.argv[1] if len(sys.argv) > 1 else VIDEO_PATH
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        print(f"Error opening video file: {video_path}")
+        return
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    start_second = 0
+    end_second = int(total_frames / fps)
+    kept_frames = len(range(0, int(end_second * fps) + 1, EXTRACTION_RATE))
+
+    print(f"Video: {video_path}\n{total_frames} frames at {fps} fps, extracting every {EXTRACTION_RATE}th frame ({kept_frames} frames)\n")
+
+    for name, sequential_decoding in (("seek per frame", False), ("sequential decode", True)):
+        duration, extracted = benchmark(video_path, sequential_decoding, start_second, end_second)
+        print(f"{name:>18}: {duration:.2f}s, {kept_frames / duration:.1f} frames/s, {extracted} frames written")
+
+
+if __name__ == "__main__":
+    main()
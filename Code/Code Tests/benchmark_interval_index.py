@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from interval_index import FrameIndex, IntervalIndex
+
+
+# Compares the linear searches the MainWindow ran over the intervals and frames with the FrameIndex and IntervalIndex:
+# the grid index of the start and end frame of every intervall before tracking, and the intervall of a clicked frame
+NUM_FRAMES = 5000
+FRAME_STEP = 25
+NUM_INTERVALS = 200
+
+
+def get_intervall_indexes_linear(frame_nums, start_frame_num, end_frame_num):
+    start_frame_index = None
+    end_frame_index = None
+    for index, frame_num in enumerate(frame_nums):
+        if start_frame_num == frame_num:
+            start_frame_index = index
+        if end_frame_num == frame_num:
+            end_frame_index = index
+        if start_frame_index is not None and end_frame_index is not None:
+            break
+    return start_frame_index, end_frame_index
+
+
+def find_linear(intervals, frame_num):
+    clicked_intervall = None
+    for start, end in intervals:
+        if start <= frame_num <= end:
+            clicked_intervall = (start, end)
+    return clicked_intervall
+
+
+def main():
+    frame_nums = [frame_index * FRAME_STEP for frame_index in range(NUM_FRAMES)]
+    interval_length = NUM_FRAMES // NUM_INTERVALS
+    intervals = [(frame_nums[i * interval_length], frame_nums[i * interval_length + interval_length - 2]) for i in range(NUM_INTERVALS)]
+
+    start = time.perf_counter()
+    for start_frame_num, end_frame_num in intervals:
+        get_intervall_indexes_linear(frame_nums, start_frame_num, end_frame_num)
+    for frame_num in frame_nums:
+        find_linear(intervals, frame_num)
+    print(f"{'linear':>16}: {(time.perf_counter() - start) * 1000:7.1f} ms")
+
+    start = time.perf_counter()
+    frame_index = FrameIndex(frame_nums)
+    interval_index = IntervalIndex(intervals)
+    for start_frame_num, end_frame_num in intervals:
+        frame_index.get_index(start_frame_num), frame_index.get_index(end_frame_num)
+    for frame_num in frame_nums:
+        interval_index.find(frame_num)
+    print(f"{'interval index':>16}: {(time.perf_counter() - start) * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
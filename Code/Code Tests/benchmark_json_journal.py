@@ -0,0 +1,87 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from damage_info import DamageInfo
+from image_info import ImageInfo
+from json_annotation_manager import JsonAnnotationManager
+from mask_conversion import mask_to_polygons, polygons_to_lists
+from mask_rle import encode_mask
+
+
+# Compares saving a session after a click on one frame: writing the whole JSON three times, like save_to_json did
+# before, and appending the change to the journal of the JsonAnnotationManager
+NUM_FRAMES = 500
+NUM_SAVES = 20
+FRAME_SIZE = (1920, 1080)
+
+
+def create_image_infos(frame_dir, mask_storage):
+    image_infos = []
+    for frame_index in range(NUM_FRAMES):
+        image_info = ImageInfo(os.path.join(frame_dir, f"{frame_index * 25}.jpg"))
+        for object_index, (x, y, radius) in enumerate(((300, 400, 150), (1200, 600, 90))):
+            mask = np.zeros((FRAME_SIZE[1], FRAME_SIZE[0]), dtype=np.uint8)
+            cv2.ellipse(mask, (x + frame_index % 500, y + frame_index % 200), (radius, radius // 2), 0, 0, 360, 1, -1)
+            damage_info = DamageInfo(f"Observation {object_index}")
+            if mask_storage == "rle":
+                damage_info.set_mask(mask_rle=encode_mask(mask))
+            else:
+                damage_info.set_mask(polygons_to_lists(mask_to_polygons(mask)))
+            image_info.data_coordinates.append(damage_info)
+        image_infos.append(image_info)
+    return image_infos
+
+
+def save_whole_json(json_path, json_data):
+    with open(json_path, "w") as outfile:
+        json.dump(json_data, outfile, indent=4)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for mask_storage in ("polygon", "rle"):
+            image_infos = create_image_infos(temp_dir, mask_storage)
+            json_data = {"Info": {"Marked Frames": [], "Instance Intervals": {}}}
+            for image_info in image_infos:
+                json_data[str(image_info.frame_num)] = {"File Name": image_info.image_name,
+                                                        "Observations": {damage_info.damage_name: damage_info.get_dict() for damage_info in image_info.data_coordinates}}
+
+            json_path = os.path.join(temp_dir, f"{mask_storage}.json")
+            start = time.perf_counter()
+            for _ in range(NUM_SAVES):
+                for _ in range(3):
+                    save_whole_json(json_path, json_data)
+            whole_time = (time.perf_counter() - start) / NUM_SAVES
+
+            json_annotation_manager = JsonAnnotationManager(snapshot_delay=60)
+            json_annotation_manager.load(json_path)
+            for image_info in image_infos:
+                json_annotation_manager.add_to_frame(image_info)
+            json_annotation_manager.save()
+
+            start = time.perf_counter()
+            for save_index in range(NUM_SAVES):
+                image_infos[save_index].data_coordinates[0].positive_point_coordinates = [(save_index, save_index)]
+                for image_info in image_infos:
+                    json_annotation_manager.add_to_frame(image_info)
+                json_annotation_manager.add_to_info("Marked Frames", [])
+                json_annotation_manager.add_to_info("Instance Intervals", {})
+                json_annotation_manager.save()
+            journal_time = (time.perf_counter() - start) / NUM_SAVES
+
+            start = time.perf_counter()
+            json_annotation_manager.close()
+            close_time = time.perf_counter() - start
+
+            print(f"{mask_storage:>8}: whole JSON 3x {whole_time * 1000:7.1f} ms per save, journal {journal_time * 1000:6.2f} ms per save, "
+                  f"snapshot when closing {close_time * 1000:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
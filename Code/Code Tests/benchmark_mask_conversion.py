@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from mask_conversion import MaskConverter
+
+
+# Compares the mask -> polygon conversion the windows did after every tracked frame with the MaskConverter,
+# on the masks of a 1000 frame propagation with two objects
+NUM_FRAMES = 1000
+FRAME_SIZE = (1920, 1080)
+TRACKING_LATENCY = 0.0      # Seconds per tracked frame, e.g. 0.05 to see how much of the conversion hides behind the tracking
+
+
+def create_masks(frame_index):
+    masks = {}
+    for object_index, (x, y, radius) in enumerate(((300, 400, 150), (1200, 600, 90))):
+        mask = np.zeros((FRAME_SIZE[1], FRAME_SIZE[0]), dtype=np.uint8)
+        cv2.ellipse(mask, (x + frame_index % 500, y + frame_index % 200), (radius, radius // 2 + frame_index % 30), frame_index % 180, 0, 360, 1, -1)
+        cv2.circle(mask, (x, y + radius // 4), radius // 6, 0, -1)
+        masks[object_index] = mask.astype(bool)[None]
+    return masks
+
+
+def tracking(masks_per_frame):
+    for frame_index, masks in enumerate(masks_per_frame):
+        time.sleep(TRACKING_LATENCY)
+        yield frame_index, masks
+
+
+def masks_to_polygons_per_frame(masks):
+    # The conversion the windows ran before, one frame after another
+    polygons = []
+    for mask in masks:
+        mask = np.squeeze(mask)
+        contours, _ = cv2.findContours(mask.astype(np.uint8), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        for contour in contours:
+            epsilon = 0.0005 * cv2.arcLength(contour, True)
+            simplified_contour = cv2.approxPolyDP(contour, epsilon, True)
+            polygons.append([(int(point[0][0]), int(point[0][1])) for point in simplified_contour])
+    return polygons
+
+
+def main():
+    masks_per_frame = [create_masks(frame_index) for frame_index in range(NUM_FRAMES)]
+
+    start = time.perf_counter()
+    for _, masks in tracking(masks_per_frame):
+        {object_index: masks_to_polygons_per_frame([mask]) for object_index, mask in masks.items()}
+    print(f"{'per frame':>32}: {time.perf_counter() - start:7.2f} s")
+
+    for name, mask_converter in (("converter, threads", MaskConverter()), ("converter, processes", MaskConverter(use_processes=True))):
+        start = time.perf_counter()
+        for _ in mask_converter.convert_iter(tracking(masks_per_frame)):
+            pass
+        print(f"{name:>32}: {time.perf_counter() - start:7.2f} s ({mask_converter.num_workers} workers)")
+
+        # Tracking again with unchanged masks, e.g. after points of another observation changed
+        start = time.perf_counter()
+        for _ in mask_converter.convert_iter(tracking(masks_per_frame)):
+            pass
+        print(f"{name + ', unchanged':>32}: {time.perf_counter() - start:7.2f} s ({mask_converter.reused_count} masks reused)")
+        mask_converter.shutdown()
+
+    mask_converter = MaskConverter(keep_holes=True)
+    start = time.perf_counter()
+    for _ in mask_converter.convert_iter(tracking(masks_per_frame)):
+        pass
+    print(f"{'converter, with holes':>32}: {time.perf_counter() - start:7.2f} s")
+    mask_converter.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from damage_info import DamageInfo
+from mask_conversion import mask_to_polygons, polygons_to_lists
+from mask_rle import encode_mask
+
+
+# Compares the session JSON with the masks stored as polygons and as run length encoding:
+# file size, loading the JSON, creating the DamageInfos and getting the polygons of the frames shown in the window
+NUM_FRAMES = 500
+NUM_SHOWN_FRAMES = 9
+FRAME_SIZE = (1920, 1080)
+
+
+def create_mask(frame_index, x, y, radius):
+    mask = np.zeros((FRAME_SIZE[1], FRAME_SIZE[0]), dtype=np.uint8)
+    cv2.ellipse(mask, (x + frame_index % 500, y + frame_index % 200), (radius, radius // 2 + frame_index % 30), frame_index % 180, 0, 360, 1, -1)
+    cv2.circle(mask, (x, y + radius // 4), radius // 6, 0, -1)
+    return mask.astype(bool)
+
+
+def create_session(mask_storage):
+    frames = {}
+    for frame_index in range(NUM_FRAMES):
+        observations = {}
+        for object_index, (x, y, radius) in enumerate(((300, 400, 150), (1200, 600, 90))):
+            mask = create_mask(frame_index, x, y, radius)
+            if mask_storage == "rle":
+                observations[f"Observation {object_index}"] = {"Mask RLE": encode_mask(mask)}
+            else:
+                observations[f"Observation {object_index}"] = {"Mask Polygon": polygons_to_lists(mask_to_polygons(mask))}
+        frames[str(frame_index * 25)] = {"Observations": observations}
+    return {"Info": {"Video Path": "video.mp4"}, "Instance Intervals": {}, "Frames": frames}
+
+
+def main():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for mask_storage in ("polygon", "rle"):
+            json_path = os.path.join(temp_dir, f"{mask_storage}.json")
+            with open(json_path, "w") as file:
+                json.dump(create_session(mask_storage), file, indent=4)
+
+            start = time.perf_counter()
+            with open(json_path, "r") as file:
+                data = json.load(file)
+            load_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            damage_infos_per_frame = []
+            for frame in data["Frames"].values():
+                damage_infos = []
+                for name, coordinate_dict in frame["Observations"].items():
+                    damage_info = DamageInfo(name)
+                    damage_info.set_mask(coordinate_dict.get("Mask Polygon"), coordinate_dict.get("Mask RLE"))
+                    damage_infos.append(damage_info)
+                damage_infos_per_frame.append(damage_infos)
+            create_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for damage_infos in damage_infos_per_frame[:NUM_SHOWN_FRAMES]:
+                for damage_info in damage_infos:
+                    damage_info.get_mask_polygon()
+            draw_time = time.perf_counter() - start
+
+            print(f"{mask_storage:>8}: {os.path.getsize(json_path) / 1e6:7.2f} MB, json.load {load_time * 1000:7.1f} ms, "
+                  f"DamageInfos {create_time * 1000:6.1f} ms, polygons of {NUM_SHOWN_FRAMES} shown frames {draw_time * 1000:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from main import load_config
+from sam2_class import Sam2Class
+from image_info import ImageInfo
+from damage_info import DamageInfo
+
+
+# Compares SAM2 on the cpu with the PyTorch image encoder against the exported ONNX encoder, fp32 and int8 quantized.
+# Export the encoder first with: python Code/onnx_image_encoder.py <path> --quantize
+FRAME_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "labeling_project", "test folder", "source images")
+NUM_CLICKS = 5
+NUM_TRACKED_FRAMES = 30
+
+
+def create_image_info(frame_path, image_index):
+    image_info = ImageInfo(frame_path)
+    image_info.image_index = image_index
+    damage_info = DamageInfo("Benchmark")
+    damage_info.is_selected = True
+    # A click in the middle of the frame
+    width, height = image_info.img_size
+    damage_info.positive_point_coordinates = [(width // 2, height // 2)]
+    image_info.data_coordinates.append(damage_info)
+    return image_info
+
+
+def benchmark(name, config, onnx_encoder_filepath):
+    settings = config["settings"]
+    sam_model = Sam2Class(
+        checkpoint_filepath=config["sam_model_paths"]["sam2_checkpoint"],
+        model_filepath=config["sam_model_paths"]["model_cfg"],
+        device="cpu",
+        onnx_encoder_filepath=onnx_encoder_filepath,
+        onnx_threads=settings.get("onnx_threads", 0)
+    )
+
+    start = time.perf_counter()
+    sam_model.load(FRAME_DIR)
+    load_time = time.perf_counter() - start
+
+    # Per click: the first click on a frame encodes it, so every click is on an other frame
+    click_times = []
+    image_infos = [create_image_info(frame_path, index) for index, frame_path in enumerate(sam_model.frame_paths[:NUM_CLICKS])]
+    for image_info in image_infos:
+        sam_model.reset_predictor_state()
+        start = time.perf_counter()
+        sam_model.add_points(image_info)
+        click_times.append(time.perf_counter() - start)
+
+    num_frames = min(NUM_TRACKED_FRAMES, len(sam_model.frame_paths))
+    frame_infos = [image_infos[0]] + [ImageInfo(frame_path) for frame_path in sam_model.frame_paths[1:num_frames]]
+    start = time.perf_counter()
+    tracked_frames = len(sam_model.track_objects(frame_infos, 0, num_frames - 1) or {})
+    tracking_time = time.perf_counter() - start
+
+    print(f"{name:>12}: {load_time * 1000:8.1f} ms load | {sum(click_times) / len(click_times) * 1000:8.1f} ms per click | "
+          f"{tracking_time / max(tracked_frames, 1) * 1000:8.1f} ms per propagated frame ({tracked_frames} frames)")
+    sam_model.cleanup()
+
+
+def main():
+    config = load_config()
+    onnx_encoder_filepath = config["settings"].get("onnx_image_encoder")
+
+    benchmark("PyTorch cpu", config, None)
+    if not onnx_encoder_filepath:
+        print("Set onnx_image_encoder in the config to compare with ONNX Runtime.")
+        return
+
+    root, extension = os.path.splitext(onnx_encoder_filepath)
+    for name, filepath in (("ONNX fp32", onnx_encoder_filepath), ("ONNX int8", f"{root}_int8{extension}")):
+        if os.path.exists(filepath):
+            benchmark(name, config, filepath)
+        else:
+            print(f"{name:>12}: {filepath} not found")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from damage_info import DamageInfo
+from image_info import ImageInfo
+from json_annotation_manager import JsonAnnotationManager
+from main_window import MainWindow
+
+
+# Compares loading the masks and points of a session into the DamageInfos: probing the copied JSON dict for
+# every frame, like the MainWindow did before, and the AnnotationSession of the JsonAnnotationManager
+NUM_FRAMES = 1000
+NUM_OBSERVATIONS = 10
+FRAME_STEP = 25
+NUM_RUNS = 10
+
+
+def create_json_data():
+    json_data = {"Info": {"Marked Frames": [FRAME_STEP * 10, FRAME_STEP * 20],
+                          "Instance Intervals": {f"Observation {index}": [[index * 500 + 13, index * 500 + 2012]] for index in range(NUM_OBSERVATIONS)}}}
+    for frame_index in range(NUM_FRAMES):
+        observations = {}
+        for index in range(NUM_OBSERVATIONS):
+            coordinate_dict = {"Mask RLE": {"size": [1080, 1920], "counts": "0X5ga03M4O1N3K" * 4}}
+            if frame_index % 50 == index:
+                coordinate_dict["Points"] = {"1": [[100 + index, 200]], "0": []}
+            observations[f"Observation {index}"] = coordinate_dict
+        json_data[str(frame_index * FRAME_STEP)] = {"File Name": f"{frame_index * FRAME_STEP}.jpg", "Observations": observations}
+    return json_data
+
+
+def create_image_infos():
+    return [ImageInfo(f"{frame_index * FRAME_STEP}.jpg") for frame_index in range(NUM_FRAMES)]
+
+
+def load_data_per_frame(json_data, image_infos, observations):
+    # The loading the MainWindow ran before, with a copy of the JSON and a lookup and a print per frame and intervall
+    json_data = json_data.copy()
+    marked_frames = json_data["Info"].get("Marked Frames", [])
+    split_intervals = json_data["Info"].get("Instance Intervals", {})
+    for value in json_data.values():
+        if "Observations" in value:
+            for observation in value["Observations"].keys():
+                if observation not in observations:
+                    observations.append(observation)
+
+    for i, image_info in enumerate(image_infos):
+        frame_num = image_info.frame_num
+        next_frame_num = image_infos[i + 1].frame_num if i < len(image_infos) - 1 else frame_num + 1
+        frame_data = json_data.get(str(frame_num)) or json_data.get(frame_num)
+        image_info.image_index = i
+        if frame_num in marked_frames:
+            image_info.is_marked = True
+
+        for observation in observations:
+            new_intervalls = []
+            coordinate_dict = frame_data["Observations"].get(observation, dict())
+            damage_info = DamageInfo(observation)
+            damage_info.set_mask(coordinate_dict.get("Mask Polygon"), coordinate_dict.get("Mask RLE"))
+            if "Points" in coordinate_dict:
+                damage_info.positive_point_coordinates = coordinate_dict["Points"].get("1")
+                damage_info.negative_point_coordinates = coordinate_dict["Points"].get("0")
+            for begin_frame_num, end_frame_num in split_intervals[observation]:
+                val1, val2 = begin_frame_num, end_frame_num
+                print(f"current frame num: {frame_num}, next_frame_num: {next_frame_num}, begin: {begin_frame_num}, end: {end_frame_num}")
+                if frame_num <= begin_frame_num < next_frame_num:
+                    val1 = frame_num
+                    damage_info.is_start_of_intervall = True
+                if frame_num <= end_frame_num < next_frame_num:
+                    val2 = frame_num
+                    damage_info.is_end_of_intervall = True
+                new_intervalls.append((val1, val2))
+            split_intervals[observation] = new_intervalls
+            image_info.data_coordinates.append(damage_info)
+
+
+def load_data_from_session(json_annotation_manager, image_infos):
+    # The MainWindow without its window, only the fields the loading uses
+    main_window = MainWindow.__new__(MainWindow)
+    main_window.json_annotation_manager = json_annotation_manager
+    main_window.image_infos = image_infos
+    main_window.observations = []
+    main_window.frame_index = None
+    main_window.frame_index_source = None
+    main_window._MainWindow__load_data_from_json()
+    return main_window
+
+
+def main():
+    json_data = create_json_data()
+
+    times = []
+    for _ in range(NUM_RUNS):
+        image_infos = create_image_infos()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            load_data_per_frame(json_data, image_infos, [])
+        times.append(time.perf_counter() - start)
+    print(f"{'per frame':>24}: {min(times) * 1000:7.1f} ms")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        json_path = os.path.join(temp_dir, "session.json")
+        with open(json_path, "w") as file:
+            json.dump(json_data, file, indent=4)
+        json_annotation_manager = JsonAnnotationManager()
+        json_annotation_manager.load(json_path)
+
+        times = []
+        for _ in range(NUM_RUNS):
+            image_infos = create_image_infos()
+            # A new session is created for every run, as after loading the JSON
+            json_annotation_manager._JsonAnnotationManager__session = None
+            start = time.perf_counter()
+            load_data_from_session(json_annotation_manager, image_infos)
+            times.append(time.perf_counter() - start)
+        print(f"{'session':>24}: {min(times) * 1000:7.1f} ms")
+
+        # Reloading after the session was created once, e.g. when the frames change
+        main_window = load_data_from_session(json_annotation_manager, create_image_infos())
+        times = []
+        for _ in range(NUM_RUNS):
+            start = time.perf_counter()
+            main_window._MainWindow__reload_from_json()
+            times.append(time.perf_counter() - start)
+        print(f"{'session, reload':>24}: {min(times) * 1000:7.1f} ms")
+        json_annotation_manager.close()
+
+
+if __name__ == "__main__":
+    main()
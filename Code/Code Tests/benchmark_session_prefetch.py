@@ -0,0 +1,95 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import main
+from session_prefetcher import SessionPrefetcher
+
+
+# Measures how long "Next" waits in the list mode until the next session can open, when every row is prepared only
+# when it is opened and when the next rows are prepared in the background while the current one is labeled.
+# The labeling is simulated by sleeping, the video is generated, so the frames differ and are all extracted
+NUM_ROWS = 4
+VIDEO_SECONDS = 90
+LABELING_SECONDS = 20.0
+CANVAS_SIZE = (1200, 800)
+
+
+class ListTable:
+    """The rows of the table in memory, with the methods of TableAndIndex the SessionPrefetcher uses."""
+    def __init__(self, output_dir, rows):
+        self.output_dir = output_dir
+        self.rows = rows
+        self.current_index = -1
+
+    def get_output_dir(self):
+        return self.output_dir
+
+    def get_damage_table_row(self):
+        self.current_index += 1
+        return self.rows[self.current_index] if self.current_index < len(self.rows) else None
+
+    def peek_damage_table_rows(self, count):
+        first_index = self.current_index + 1
+        return [(index, self.rows[index]) for index in range(first_index, min(first_index + count, len(self.rows)))]
+
+
+def create_video(video_path):
+    rng = np.random.default_rng(0)
+    writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*"MJPG"), 25, (704, 576))
+    for _ in range(VIDEO_SECONDS * 25):
+        writer.write(rng.integers(0, 255, (576, 704, 3), dtype=np.uint8))
+    writer.release()
+
+
+def benchmark(config, video_path, output_dir, look_ahead):
+    rows = [{"Videoname": f"video {index}", "Videopfad": video_path, "Videozeitpunkt (h:min:sec)": "0:01:00"} for index in range(NUM_ROWS)]
+    table = ListTable(output_dir, rows)
+
+    def prepare_session(damage_table_row, frame_dir, is_cancelled):
+        return main.prepare_list_mode_session(config, damage_table_row, frame_dir, None, output_dir, lambda: CANVAS_SIZE, is_cancelled)
+
+    prefetcher = SessionPrefetcher(table, prepare_session, look_ahead)
+    waits = []
+    start = time.perf_counter()
+    session = prefetcher.get_next()
+    first_wait = time.perf_counter() - start
+    while session:
+        prefetcher.prefetch()
+        time.sleep(LABELING_SECONDS)
+        if session.frame_store is not None:
+            session.frame_store.close()
+
+        start = time.perf_counter()
+        session = prefetcher.get_next()
+        if session:
+            waits.append(time.perf_counter() - start)
+    prefetcher.shutdown()
+    return first_wait, waits
+
+
+def main_benchmark():
+    config = main.load_config()
+    config["settings"]["auto_deinterlacing"] = False
+    config["settings"]["prefetch_embeddings"] = False
+    config["settings"]["frame_signature_index"] = False
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        video_path = os.path.join(temp_dir, "generated.avi")
+        create_video(video_path)
+        for look_ahead in (0, 1):
+            output_dir = os.path.join(temp_dir, f"look ahead {look_ahead}")
+            first_wait, waits = benchmark(config, video_path, output_dir, look_ahead)
+            print(f"look_ahead {look_ahead}: first session {first_wait * 1000:7.1f} ms, next sessions {np.mean(waits) * 1000:7.1f} ms on average")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,49 @@
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from frame_similarity import SIMILARITY_BACKENDS, create_similarity_backend, calibrate_threshold
+from calibrate_similarity_backends import VIDEO_PATH, collect_frame_pairs
+
+
+# Compares speed and accuracy of all similarity backends against the full resolution SSIM.
+# Usage: python benchmark_similarity_backends.py <video> [image_similarity_threshold] [thumbnail_width]
+
+
+def time_backend(backend, pairs):
+    """
+    Times the way frame extraction uses a backend: one prepare per frame and one compare per pair.
+    Returns the scores and the average milliseconds per frame.
+    """
+    start = time.perf_counter()
+    scores = [backend.compare(backend.prepare(frame1), backend.prepare(frame2)) for frame1, frame2 in pairs]
+    duration = time.perf_counter() - start
+    return scores, duration / len(pairs) / 2 * 1000
+
+
+def main():
+    video_path = sys.argv[1] if len(sys.argv) > 1 else VIDEO_PATH
+    reference_threshold = float(sys.argv[2]) if len(sys.argv) > 2 else 0.8
+    thumbnail_width = int(sys.argv[3]) if len(sys.argv) > 3 else 320
+
+    pairs = collect_frame_pairs(video_path)
+    if not pairs:
+        print("No frame pairs found!")
+        return
+
+    reference_scores, reference_ms = time_backend(create_similarity_backend("ssim"), pairs)
+    print(f"{len(pairs)} frame pairs of size {pairs[0][0].shape[1]}x{pairs[0][0].shape[0]}\n")
+    print(f"{'backend':>15} {'ms/frame':>9} {'speedup':>8} {'corr':>6} {'agreement':>10}")
+
+    for name in SIMILARITY_BACKENDS:
+        backend = create_similarity_backend(name, thumbnail_width)
+        scores, ms = time_backend(backend, pairs)
+        _, agreement = calibrate_threshold(reference_scores, scores, reference_threshold)
+        correlation = np.corrcoef(reference_scores, scores)[0, 1] if np.std(scores) > 0 else 0.0
+        print(f"{name:>15} {ms:>9.2f} {reference_ms / ms:>7.1f}x {correlation:>6.3f} {agreement * 100:>9.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import os
+import sys
+import json
+import random
+import shutil
+import tempfile
+import time
+from PIL import Image
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from image_info import ImageInfo
+from damage_info import DamageInfo
+from json_annotation_manager import JsonAnnotationManager
+from stub_predictor import StubVideoPredictor
+from mask_conversion import MaskConverter
+from repropagate_results import SessionRepropagator, get_json_path
+
+
+# Times the parts of the tracking pipeline, which do not need the window or a GPU, with the stub predictor:
+# collecting the points, planning and running the tracking, converting the masks to polygons and saving the JSON.
+NUM_FRAMES = 500
+FRAME_SIZE = (704, 576)
+NUM_OBSERVATIONS = 4
+INTERVALS_PER_OBSERVATION = 3
+FRAME_LATENCY = 0.0     # Seconds per propagated frame, e.g. 0.05 to simulate a GPU
+SEED = 0
+
+
+def create_session(session_dir):
+    """Writes frames and a JSON with points and instance intervals, like a labeled session in the results directory."""
+    frame_dir = os.path.join(session_dir, "source images")
+    os.makedirs(frame_dir)
+    image = Image.new("RGB", FRAME_SIZE, (90, 90, 90))
+    for frame_num in range(NUM_FRAMES):
+        image.save(os.path.join(frame_dir, f"{frame_num:05d}.jpg"))
+
+    json_data = {"Info": {"Instance Intervals": {}}}
+    for observation_index in range(NUM_OBSERVATIONS):
+        observation = f"Observation {observation_index}"
+        intervals = []
+        for _ in range(INTERVALS_PER_OBSERVATION):
+            start_frame_num = random.randint(0, NUM_FRAMES - 100)
+            end_frame_num = start_frame_num + random.randint(50, 100)
+            intervals.append([start_frame_num, end_frame_num])
+
+            prompt_frame_num = random.randint(start_frame_num, end_frame_num)
+            x, y = random.randint(100, FRAME_SIZE[0] - 300), random.randint(100, FRAME_SIZE[1] - 200)
+            frame_data = json_data.setdefault(str(prompt_frame_num), {"File Name": f"{prompt_frame_num:05d}.jpg", "Observations": {}})
+            frame_data["Observations"][observation] = {"Points": {"1": [[x, y], [x + 60, y + 40]], "0": []}}
+        json_data["Info"]["Instance Intervals"][observation] = intervals
+
+    with open(get_json_path(session_dir), "w") as file:
+        json.dump(json_data, file, indent=4)
+    return frame_dir, json_data
+
+
+def main():
+    random.seed(SEED)
+    temp_dir = tempfile.mkdtemp()
+    try:
+        session_dir = os.path.join(temp_dir, "benchmark session")
+        frame_dir, json_data = create_session(session_dir)
+        sam_model = StubVideoPredictor(frame_latency=FRAME_LATENCY)
+        observations = list(json_data["Info"]["Instance Intervals"].keys())
+
+        start = time.perf_counter()
+        sam_model.load(frame_dir)
+        load_time = time.perf_counter() - start
+
+        # Collecting the points, like the MainWindow does when a session is loaded
+        start = time.perf_counter()
+        image_infos = []
+        for frame_path in sam_model.frame_paths:
+            image_info = ImageInfo(frame_path)
+            image_info.image_index = len(image_infos)
+            frame_data = json_data.get(str(image_info.frame_num), {})
+            for observation in observations:
+                damage_info = DamageInfo(observation)
+                points = frame_data.get("Observations", {}).get(observation, {}).get("Points", {})
+                damage_info.positive_point_coordinates = points.get("1", [])
+                damage_info.negative_point_coordinates = points.get("0", [])
+                image_info.data_coordinates.append(damage_info)
+            image_infos.append(image_info)
+        intervals = [(observations.index(observation), start_frame_num, end_frame_num)
+                     for observation, observation_intervals in json_data["Info"]["Instance Intervals"].items()
+                     for start_frame_num, end_frame_num in observation_intervals]
+        prompt_time = time.perf_counter() - start
+
+        tracking_time, conversion_time, tracked_frames = 0.0, 0.0, 0
+        mask_converter = MaskConverter(num_workers=1)
+        start = time.perf_counter()
+        for out_frame_idx, masks in sam_model.track_all_objects_iter(image_infos, intervals):
+            tracking_time += time.perf_counter() - start
+            start = time.perf_counter()
+            for observation_index, mask in masks.items():
+                image_infos[out_frame_idx].data_coordinates[observation_index].mask_polygon = mask_converter.convert(mask)
+            tracked_frames += 1
+            conversion_time += time.perf_counter() - start
+            start = time.perf_counter()
+        tracking_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        json_annotation_manager = JsonAnnotationManager()
+        json_annotation_manager.load(get_json_path(session_dir))
+        for image_info in image_infos:
+            json_annotation_manager.add_to_frame(image_info)
+        json_annotation_manager.save()
+        save_time = time.perf_counter() - start
+        json_size = os.path.getsize(get_json_path(session_dir))
+
+        print(f"{NUM_FRAMES} frames, {len(intervals)} intervalls, {tracked_frames} tracked frames, {sam_model.last_tracking_plan.frame_count} propagated frames")
+        print(f"{'load frames':>22}: {load_time * 1000:9.1f} ms")
+        print(f"{'collect points':>22}: {prompt_time * 1000:9.1f} ms")
+        print(f"{'plan + track (stub)':>22}: {tracking_time * 1000:9.1f} ms")
+        print(f"{'mask -> polygon':>22}: {conversion_time * 1000:9.1f} ms ({conversion_time / max(tracked_frames, 1) * 1000:.2f} ms per frame)")
+        print(f"{'save json':>22}: {save_time * 1000:9.1f} ms ({json_size / 1024:.0f} KB)")
+
+        # The same session end to end through the headless re-propagation
+        start = time.perf_counter()
+        SessionRepropagator(sam_model).repropagate(session_dir)
+        print(f"{'repropagate session':>22}: {(time.perf_counter() - start) * 1000:9.1f} ms")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import os
+import sys
+import random
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from tracking_planner import TrackedObject, TrackingPlanner
+
+
+# Compares the frames SAM2 has to propagate when every intervall is tracked on its own against the merged tracking plan
+NUM_FRAMES = 2000
+RUNS = 5
+SEED = 0
+
+
+def create_tracked_objects(num_observations, intervals_per_observation, interval_length):
+    tracked_objects = []
+    for damage_index in range(num_observations):
+        for _ in range(intervals_per_observation):
+            start_frame_index = random.randint(0, NUM_FRAMES - interval_length)
+            end_frame_index = start_frame_index + random.randint(interval_length // 2, interval_length)
+            first_prompt_index = random.randint(start_frame_index, end_frame_index)
+            tracked_objects.append(TrackedObject(len(tracked_objects), damage_index, start_frame_index, end_frame_index, first_prompt_index))
+    return tracked_objects
+
+
+def main():
+    random.seed(SEED)
+    tracking_planner = TrackingPlanner()
+
+    for num_observations, intervals_per_observation, interval_length in ((1, 1, 200), (1, 4, 300), (3, 3, 400), (5, 4, 600)):
+        separate_frames, planned_frames, separate_sweeps, planned_sweeps = 0, 0, 0, 0
+        for _ in range(RUNS):
+            tracking_plan = tracking_planner.plan(create_tracked_objects(num_observations, intervals_per_observation, interval_length))
+            separate_frames += tracking_plan.separate_frame_count
+            planned_frames += tracking_plan.frame_count
+            separate_sweeps += tracking_plan.separate_sweeps
+            planned_sweeps += len(tracking_plan.sweeps)
+
+        name = f"{num_observations} obs x {intervals_per_observation} intervalls ({interval_length} frames)"
+        print(f"{name:>38}: separate {separate_sweeps / RUNS:5.1f} sweeps, {separate_frames / RUNS:7.1f} frames | "
+              f"planned {planned_sweeps / RUNS:5.1f} sweeps, {planned_frames / RUNS:7.1f} frames | "
+              f"{separate_frames / max(planned_frames, 1):.2f}x fewer frames")
+        # The plan is not run here, so nothing is executed
+        print(f"{'last run':>38}: {tracking_plan.get_report()}")
+
+
+if __name__ == "__main__":
+    main()
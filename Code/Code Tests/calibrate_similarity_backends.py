@@ -0,0 +1,67 @@
+import os
+import sys
+import cv2
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from frame_similarity import SIMILARITY_BACKENDS, create_similarity_backend, calibrate_threshold
+
+
+# Maps the scores of every similarity backend onto the image_similarity_threshold of the full resolution SSIM.
+# Usage: python calibrate_similarity_backends.py <video> [image_similarity_threshold] [thumbnail_width]
+VIDEO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "labeling_project", "test folder", "test.mp4")
+EXTRACTION_RATE = 25
+MAX_FRAMES = 200
+PAIR_DISTANCES = (1, 2, 4)  # Compare each sampled frame with the 1st, 2nd and 4th next sample, to also get dissimilar pairs
+
+
+def collect_frame_pairs(video_path, extraction_rate=EXTRACTION_RATE, max_frames=MAX_FRAMES):
+    """Reads every extraction_rate-th frame of the video and returns pairs of them in different distances."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        print(f"Error opening video file: {video_path}")
+        return []
+
+    frames = []
+    frame_number = 0
+    while len(frames) < max_frames:
+        if not cap.grab():
+            break
+        if frame_number % extraction_rate == 0:
+            ret, frame = cap.retrieve()
+            if not ret:
+                break
+            frames.append(frame)
+        frame_number += 1
+    cap.release()
+
+    pairs = []
+    for distance in PAIR_DISTANCES:
+        pairs += [(frames[i], frames[i + distance]) for i in range(len(frames) - distance)]
+    return pairs
+
+
+def score_pairs(backend, pairs):
+    return [backend.similarity(frame1, frame2) for frame1, frame2 in pairs]
+
+
+def main():
+    video_path = sys.argv[1] if len(sys.argv) > 1 else VIDEO_PATH
+    reference_threshold = float(sys.argv[2]) if len(sys.argv) > 2 else 0.8
+    thumbnail_width = int(sys.argv[3]) if len(sys.argv) > 3 else 320
+
+    pairs = collect_frame_pairs(video_path)
+    if not pairs:
+        print("No frame pairs found!")
+        return
+
+    reference_scores = score_pairs(create_similarity_backend("ssim"), pairs)
+    print(f"{len(pairs)} frame pairs, reference ssim threshold {reference_threshold}\n")
+
+    for name in SIMILARITY_BACKENDS:
+        backend_scores = score_pairs(create_similarity_backend(name, thumbnail_width), pairs)
+        threshold, agreement = calibrate_threshold(reference_scores, backend_scores, reference_threshold)
+        print(f"{name:>15}: similarity_backend_threshold: {threshold:.4f}  (same decision for {agreement * 100:.1f}% of pairs)")
+
+
+if __name__ == "__main__":
+    main()
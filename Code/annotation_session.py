@@ -0,0 +1,90 @@
+from dataclasses import dataclass, field
+from damage_info import DamageInfo
+
+
+@dataclass
+class ObservationAnnotation:
+    """Mask and points of one observation on one frame, as they are stored in the session JSON."""
+    mask_polygon: list = field(default=None)
+    mask_rle: dict = field(default=None)
+    positive_point_coordinates: list = field(default=None)
+    negative_point_coordinates: list = field(default=None)
+    has_points: bool = field(default=False)
+
+    @classmethod
+    def from_dict(cls, coordinate_dict: dict) -> "ObservationAnnotation":
+        points = coordinate_dict.get("Points")
+        return cls(mask_polygon=coordinate_dict.get("Mask Polygon"),
+                   mask_rle=coordinate_dict.get("Mask RLE"),
+                   positive_point_coordinates=points.get("1") if points is not None else None,
+                   negative_point_coordinates=points.get("0") if points is not None else None,
+                   has_points=points is not None)
+
+    def apply_to(self, damage_info: DamageInfo):
+        """Sets the mask and the points on the DamageInfo. Fields, which are not stored, are left as they are."""
+        if self.mask_polygon or self.mask_rle:
+            damage_info.set_mask(self.mask_polygon, self.mask_rle)
+        if self.has_points:
+            damage_info.positive_point_coordinates = self.positive_point_coordinates
+            damage_info.negative_point_coordinates = self.negative_point_coordinates
+
+
+@dataclass
+class FrameAnnotation:
+    frame_num: int
+    file_name: str
+    observations: dict = field(default_factory=dict)       # observation name: ObservationAnnotation
+
+
+@dataclass
+class AnnotationSession:
+    """
+    Typed view of a session JSON: the frames by their frame number, the observations of a frame by their name
+    and the instance intervals of every observation sorted by their start.
+    The lists of masks and points are the ones of the JSON data and are not copied.
+    """
+    info: dict = field(default_factory=dict)
+    frames: dict = field(default_factory=dict)              # frame number: FrameAnnotation
+    observation_names: list = field(default_factory=list)   # In the order they first appear in the frames
+    marked_frames: list = field(default_factory=list)
+    intervals: dict = field(default_factory=dict)           # observation name: sorted list of (start, end) frame numbers
+    _marked_frame_set: set = field(init=False, default_factory=set, repr=False)
+
+    def __post_init__(self):
+        self._marked_frame_set = set(self.marked_frames)
+
+    @classmethod
+    def from_json(cls, json_data: dict) -> "AnnotationSession":
+        """Creates the session in one pass over the JSON data. Frame keys may be strings or numbers."""
+        info = json_data.get("Info", {})
+        frames = {}
+        observation_names = {}
+        for key, value in json_data.items():
+            if key == "Info" or not isinstance(value, dict) or "Observations" not in value:
+                continue
+            try:
+                frame_num = int(key)
+            except ValueError:
+                continue
+
+            observations = {}
+            for observation, coordinate_dict in value["Observations"].items():
+                observation_names.setdefault(observation, None)
+                if coordinate_dict:
+                    observations[observation] = ObservationAnnotation.from_dict(coordinate_dict)
+            frames[frame_num] = FrameAnnotation(frame_num, value.get("File Name", ""), observations)
+
+        intervals = {observation: sorted(tuple(interval) for interval in observation_intervals)
+                     for observation, observation_intervals in info.get("Instance Intervals", {}).items()}
+        return cls(info=info, frames=frames, observation_names=list(observation_names),
+                   marked_frames=list(info.get("Marked Frames", [])), intervals=intervals)
+
+    def get_frame(self, frame_num: int) -> FrameAnnotation:
+        return self.frames.get(frame_num)
+
+    def get_observation(self, frame_num: int, observation: str) -> ObservationAnnotation:
+        frame = self.frames.get(frame_num)
+        return frame.observations.get(observation) if frame is not None else None
+
+    def is_marked(self, frame_num: int) -> bool:
+        return frame_num in self._marked_frame_set
@@ -2,8 +2,8 @@ import tkinter as tk
 from PIL import Image, ImageTk
 from image_info import ImageInfo
 from draw_image_info import DrawImageInfo
-import cv2
-import numpy as np
+from mask_conversion import mask_to_polygons
+from mask_rle import encode_mask
 
 class AnnotationWindow:
     """
@@ -36,6 +36,9 @@ class AnnotationWindow:
 
         self.polygons = []
         self.order_of_addition = []
+        self.keep_mask_holes = False
+        self.mask_storage = "polygon"      # With "rle", only the run length encoding of the mask is stored
+        self.mask_rle = None
 
         self.image_info = None
         self.color = None
@@ -227,12 +230,13 @@ class AnnotationWindow:
         
         self.image_info.data_coordinates[self.object_class_id].positive_point_coordinates = self.points.get("1")
         self.image_info.data_coordinates[self.object_class_id].negative_point_coordinates = self.points.get("0")
-        self.image_info.data_coordinates[self.object_class_id].mask_polygon = self.polygons
+        self.image_info.data_coordinates[self.object_class_id].set_mask(self.polygons, self.mask_rle)
         DrawImageInfo(self.image_info)  
         self.__draw_image_on_canvas()
 
     def __segment_image(self):
         # Prepare the structure and then send to sam
+        self.mask_rle = None
 
         try:
             self.image_info.data_coordinates[self.object_class_id].mask_polygon = self.polygons
@@ -248,21 +252,11 @@ class AnnotationWindow:
             print("Error: Mask length == 0")
             return
 
-        polygons = []
-        mask = np.squeeze(mask)  # Squeeze to remove dimensions of size 1
-        
-        # Extract contours using OpenCV
-        contours, _ = cv2.findContours(mask.astype(np.uint8), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-        for contour in contours:
-            # Simplify the contour using approxPolyDP
-            epsilon = 0.0005 * cv2.arcLength(contour, True)  # Adjust epsilon for simplification level
-            simplified_contour = cv2.approxPolyDP(contour, epsilon, True)
-
-            # Convert contour points to a list of tuples
-            simplified_contour = [(int(point[0][0]), int(point[0][1])) for point in simplified_contour]
-            polygons.append(simplified_contour)
-        return polygons
+        # A run length encoded mask keeps no polygons, get_mask_polygon of the DamageInfo converts it when it is drawn
+        if self.mask_storage == "rle" and mask.any():
+            self.mask_rle = encode_mask(mask)
+            return []
+        return mask_to_polygons(mask, self.keep_mask_holes)
     
 
     def __get_color(self, color=None, color_index=None) -> tuple:
@@ -9,6 +9,8 @@ class DamageInfo:
     negative_point_coordinates: list[tuple] = field(init=False, default_factory=list)
 
     mask_polygon: list[int] = field(init=False, default_factory=list)
+    # COCO run length encoding of the mask. If it is set, it is saved instead of the polygons, which are derived from it for drawing
+    mask_rle: dict = field(init=False, default=None)
 
     is_start_of_intervall: bool = field(init=False, default=False)
     is_end_of_intervall: bool = field(init=False, default=False)
@@ -16,6 +18,38 @@ class DamageInfo:
     is_shown: bool = field(init=False, default=True)
     is_selected: bool = field(init=False, default=False)
 
+    # Set whenever a field changes, so only changed frames are drawn again
+    is_dirty: bool = field(init=False, default=True, repr=False, compare=False)
+    # Set whenever a field changes, so the JsonAnnotationManager only saves changed observations
+    is_unsaved: bool = field(init=False, default=True, repr=False, compare=False)
+
+    def __setattr__(self, name, value):
+        # Written into __dict__ directly, every frame of a session creates its DamageInfos through here
+        attributes = self.__dict__
+        # Fields, which were never set, still have the default of the class
+        if name not in ("is_dirty", "is_unsaved") and _is_changed(attributes[name] if name in attributes else getattr(type(self), name, None), value):
+            attributes["is_dirty"] = True
+            attributes["is_unsaved"] = True
+        if name == "mask_polygon" and attributes.get("mask_rle") is not None:
+            # New polygons replace the mask, the encoding of the old one is not valid anymore
+            attributes["mask_rle"] = None
+        attributes[name] = value
+
+    def set_mask(self, mask_polygon: list = None, mask_rle: dict = None):
+        """Sets the mask as polygons, as run length encoding, or both if they describe the same mask."""
+        self.mask_polygon = mask_polygon or []
+        self.mask_rle = mask_rle
+
+    def get_mask_polygon(self) -> list:
+        """Returns the polygons of the mask. If only its run length encoding is set, they are derived from it once."""
+        if len(self.mask_polygon) == 0 and self.mask_rle is not None:
+            # Imported here, the polygons are only needed for drawing
+            from mask_rle import decode_mask
+            from mask_conversion import mask_to_polygons
+            # The encoding is exact, so the holes are drawn as well. Not marked dirty, the mask did not change
+            object.__setattr__(self, "mask_polygon", mask_to_polygons(decode_mask(self.mask_rle), keep_holes=True))
+        return self.mask_polygon
+
     def get_dict(self) -> dict:  
 
         damage_dict = {}
@@ -26,7 +60,20 @@ class DamageInfo:
                             "0": self.negative_point_coordinates
                         }
         
-        if len(self.mask_polygon) > 0:
-            damage_dict["Mask Polygon"] = self.mask_polygon
+        if self.mask_rle is not None:
+            damage_dict["Mask RLE"] = self.mask_rle
+        elif len(self.mask_polygon) > 0:
+            # Tracked polygons are numpy arrays, the JSON needs lists
+            damage_dict["Mask Polygon"] = [polygon.tolist() if hasattr(polygon, "tolist") else polygon for polygon in self.mask_polygon]
+
+        return damage_dict
+
 
-        return damage_dict
\ No newline at end of file
+def _is_changed(old_value, new_value) -> bool:
+    if old_value is new_value:
+        # The same list may have been changed in place
+        return isinstance(new_value, (list, dict))
+    try:
+        return bool(old_value != new_value)
+    except (TypeError, ValueError):
+        return True
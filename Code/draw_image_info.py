@@ -1,18 +1,33 @@
 from PIL import Image, ImageDraw
+import numpy as np
 from image_info import ImageInfo
 
 class DrawImageInfo:
     """
     This class draws masks, points and borders.
+    All overlays are drawn onto one transparent layer, which is composited onto the image once.
+    If a base_image is given, e.g. a grid thumbnail, the overlays are scaled onto it instead of the full image,
+    and the result is only available as drawn_image of this object.
     """
-    def __init__(self, image_info: ImageInfo):
+    def __init__(self, image_info: ImageInfo, base_image: Image.Image = None):
+        self.drawn_image = base_image
         try:
-            image_info.reset_drawn_image()
-            self.__drawn_image = image_info.drawn_image
+            if base_image is None:
+                image = image_info.image
+                self.__scale = (1.0, 1.0)
+            else:
+                image = base_image
+                full_width, full_height = image_info.img_size
+                self.__scale = (base_image.width / full_width, base_image.height / full_height)
+
+            self.__overlay = Image.new("RGBA", image.size, (0, 0, 0, 0))
+            self.__overlay_draw = ImageDraw.Draw(self.__overlay)
+            self.__has_overlay = False
+
             for color_index, damage_info in enumerate(image_info.data_coordinates):
 
                 if damage_info.is_shown:
-                    self.__draw_polygon(damage_info.mask_polygon, color_index)
+                    self.__draw_polygon(damage_info.get_mask_polygon(), color_index)
             
                 if damage_info.is_selected:
                     if damage_info.is_start_of_intervall:
@@ -23,57 +38,84 @@ class DrawImageInfo:
                     self.__draw_points(damage_info.positive_point_coordinates, damage_info.negative_point_coordinates)
 
             if image_info.is_marked:
-                self.__draw_border("top", "red_full")
-            image_info.drawn_image = self.__drawn_image
+                self.__draw_border("top", self.__get_color("red_full"))
+
+            if self.__has_overlay:
+                drawn_image = image.convert("RGBA")
+                drawn_image.alpha_composite(self.__overlay)
+            else:
+                drawn_image = image.copy() if base_image is None else image
+
+            self.drawn_image = drawn_image
+            if base_image is None:
+                image_info.drawn_image = drawn_image
         except Exception as e:
             print(f"Error in drawing: {e}")
 
     def __draw_points(self, pos_points, neg_points, radius=5):
-        base_img = self.__drawn_image
-        overlay = Image.new("RGBA", base_img.size, (0, 0, 0, 0))
-        overlay_draw = ImageDraw.Draw(overlay)
+        # Points and borders are opaque, so they can be drawn straight onto the overlay
+        radius = self.__scale_length(radius)
 
         for point in pos_points:
-            x, y = point
-            overlay_draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=self.__get_color("green_full"))
+            x, y = self.__scale_point(point)
+            self.__overlay_draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=self.__get_color("green_full"))
+            self.__has_overlay = True
 
         for point in neg_points:
-            x, y = point
-            overlay_draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=self.__get_color("red_full"))
-
-        base_img = base_img.convert("RGBA")
-        base_img = Image.alpha_composite(base_img, overlay)
-        self.__drawn_image = base_img
+            x, y = self.__scale_point(point)
+            self.__overlay_draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=self.__get_color("red_full"))
+            self.__has_overlay = True
 
     def __draw_polygon(self, polygons, color_index=0):
         color = self.__get_color(color_index=color_index)
 
-        base_img = self.__drawn_image
-
-        overlay = Image.new("RGBA", base_img.size, (0, 0, 0, 0))
-        overlay_draw = ImageDraw.Draw(overlay, "RGBA")
-
-        if polygons:
-            for polygon in polygons:
-                polygon_tuples = [tuple(point) for point in polygon]
-                if len(polygon_tuples) > 3:
-                    overlay_draw.polygon(polygon_tuples, outline=color[:3], fill=color)
-
-        base_img = base_img.convert("RGBA")
-        base_img = Image.alpha_composite(base_img, overlay)
-        self.__drawn_image = base_img
+        if not polygons:
+            return
+
+        # Polygons are lists of points from the JSON, or arrays from the tracking, both are scaled at once
+        scale = np.array(self.__scale, dtype=np.float32)
+        polygon_list = [np.asarray(polygon, dtype=np.float32).reshape(-1, 2) * scale for polygon in polygons if len(polygon) > 3]
+        if len(polygon_list) == 0:
+            return
+
+        # The masks are transparent, so each one is drawn on a layer only as large as its bounding box,
+        # which is then composited onto the overlay
+        img_width, img_height = self.__overlay.size
+        left = max(int(min(polygon[:, 0].min() for polygon in polygon_list)) - 1, 0)
+        top = max(int(min(polygon[:, 1].min() for polygon in polygon_list)) - 1, 0)
+        right = min(int(max(polygon[:, 0].max() for polygon in polygon_list)) + 2, img_width)
+        bottom = min(int(max(polygon[:, 1].max() for polygon in polygon_list)) + 2, img_height)
+        if right <= left or bottom <= top:
+            return
+
+        layer = Image.new("RGBA", (right - left, bottom - top), (0, 0, 0, 0))
+        layer_draw = ImageDraw.Draw(layer, "RGBA")
+        offset = np.array((left, top), dtype=np.float32)
+        # Holes, which are only stored with keep_mask_holes, run the other way around than the outer contours they are in
+        signed_areas = [self.__get_signed_area(polygon) for polygon in polygon_list]
+        has_outer_contours = any(signed_area < 0 for signed_area in signed_areas)
+        holes = []
+        for polygon, signed_area in zip(polygon_list, signed_areas):
+            if has_outer_contours and signed_area > 0:
+                holes.append(polygon)
+                continue
+            layer_draw.polygon((polygon - offset).ravel().tolist(), outline=color[:3], fill=color)
+
+        if holes:
+            # Drawn without blending, so the holes become transparent again
+            hole_draw = ImageDraw.Draw(layer)
+            for polygon in holes:
+                hole_draw.polygon((polygon - offset).ravel().tolist(), outline=color[:3], fill=(0, 0, 0, 0))
+
+        self.__overlay.alpha_composite(layer, dest=(left, top))
+        self.__has_overlay = True
 
     def __draw_border(self, side="all", color=None, num_of_intervall=0, thickness=20):
         if color is None:
             color = self.__get_split_color(num_of_intervall)
 
-        base_img = self.__drawn_image
-
-        img_width, img_height = base_img.size
-        thickness = min(thickness, img_width, img_height)
-
-        overlay = Image.new("RGBA", base_img.size, (0, 0, 0, 0))
-        overlay_draw = ImageDraw.Draw(overlay)
+        img_width, img_height = self.__overlay.size
+        thickness = min(self.__scale_length(thickness), img_width, img_height)
 
         borders = {
             "all": [
@@ -89,11 +131,19 @@ class DrawImageInfo:
         }
 
         for rect in borders.get(side, []):
-            overlay_draw.rectangle(rect, fill=color)
+            self.__overlay_draw.rectangle(rect, fill=color)
+            self.__has_overlay = True
+
+    def __get_signed_area(self, polygon: np.ndarray) -> float:
+        # Shoelace formula, negative for the outer contours of OpenCV
+        x, y = polygon[:, 0], polygon[:, 1]
+        return 0.5 * float(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+
+    def __scale_point(self, point) -> tuple:
+        return (point[0] * self.__scale[0], point[1] * self.__scale[1])
 
-        base_img = base_img.convert("RGBA")
-        base_img = Image.alpha_composite(base_img, overlay)
-        self.__drawn_image = base_img
+    def __scale_length(self, length) -> int:
+        return max(1, round(length * self.__scale[0]))
 
     def __get_color(self, color=None, color_index=None) -> tuple:
         color_map = {
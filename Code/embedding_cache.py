@@ -0,0 +1,201 @@
+import hashlib
+import os
+import queue
+import threading
+from collections import OrderedDict
+import torch
+
+
+class EmbeddingCache:
+    """
+    This class stores the image features computed by the SAM2 image encoder on the disk, so they are not computed again
+    when the same frames are loaded again, e.g. when a session is reopened or the histogram or deinterlacing is toggled back.
+    The features are keyed by a hash of the frame content and stored in a subfolder for every model checkpoint.
+    When the cache gets larger than max_size_mb, the least recently used features are deleted first.
+    It can be used from several threads, e.g. while the features of the next session are computed in the background.
+    The features are written to the disk on a background thread, so computing them does not wait for the disk.
+    """
+    def __init__(self, cache_dir: str, checkpoint_filepath: str, model_filepath: str, max_size_mb: int = 20000, variant: str = "", write_queue_size: int = 8):
+        self.cache_dir = cache_dir
+        self.max_size = max(int(max_size_mb), 1) * 1024 * 1024
+        self.model_dir = os.path.join(cache_dir, self.__get_model_key(checkpoint_filepath, model_filepath, variant))
+        os.makedirs(self.model_dir, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+        self.__entries = OrderedDict()     # file path: size, least recently used first
+        self.__size = 0
+        self.__lock = threading.Lock()     # Guards the entries and their size, the files are read and written outside of it
+        self.__pending = {}                # file path: features on the cpu, which are not written yet
+        self.__write_queue = queue.Queue(maxsize=max(int(write_queue_size), 1))
+        self.__writer_thread = None
+        self.__scan_cache_dir()
+
+    def __contains__(self, key: str) -> bool:
+        path = self.__get_path(key)
+        with self.__lock:
+            return path in self.__entries or path in self.__pending
+
+    def get(self, key: str, device=None):
+        """
+        Returns the stored features moved to the device, or None if they are not cached.
+        """
+        path = self.__get_path(key)
+        with self.__lock:
+            pending_features = self.__pending.get(path)
+            if pending_features is not None:
+                self.hits += 1
+                return self.__to_device(pending_features, device)
+            if path not in self.__entries:
+                self.misses += 1
+                return None
+
+        try:
+            features = torch.load(path, map_location=device)
+            # The modification time marks the last use, so the order survives a restart
+            os.utime(path)
+        except Exception as e:
+            print(f"Error: Could not read cached features {path}: {e}")
+            with self.__lock:
+                self.__remove(path)
+                self.misses += 1
+            return None
+
+        with self.__lock:
+            if path in self.__entries:
+                self.__entries.move_to_end(path)
+            self.hits += 1
+        return features
+
+    def put(self, key: str, features):
+        """
+        Stores the features, a tensor or a dict / list of tensors, and deletes the least recently used features if the cache is full.
+        The features are copied to the cpu at once and written in the background. Blocks while write_queue_size features wait.
+        """
+        path = self.__get_path(key)
+        features = self.__to_cpu(features)
+        with self.__lock:
+            self.__pending[path] = features
+            if self.__writer_thread is None:
+                self.__writer_thread = threading.Thread(target=self.__write_features, daemon=True)
+                self.__writer_thread.start()
+        self.__write_queue.put((path, features))
+
+    def flush(self):
+        """Waits until all queued features are written."""
+        self.__write_queue.join()
+
+    def __write_features(self):
+        while True:
+            path, features = self.__write_queue.get()
+            try:
+                self.__write(path, features)
+            finally:
+                with self.__lock:
+                    if self.__pending.get(path) is features:
+                        del self.__pending[path]
+                self.__write_queue.task_done()
+
+    def __write(self, path: str, features):
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            torch.save(features, temp_path)
+            # Replacing the file at once, so no other process reads a half written file
+            os.replace(temp_path, path)
+        except Exception as e:
+            print(f"Error: Could not cache features {path}: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+
+        size = os.path.getsize(path)
+        with self.__lock:
+            if path in self.__entries:
+                self.__size -= self.__entries.pop(path)
+            self.__entries[path] = size
+            self.__size += size
+            self.__evict()
+
+    @staticmethod
+    def hash_content(data) -> str:
+        """Returns the hash of a numpy array, a tensor or bytes, which is used as key of its features."""
+        if isinstance(data, torch.Tensor):
+            data = data.detach().cpu().contiguous().numpy()
+        hasher = hashlib.blake2b(digest_size=16)
+        if hasattr(data, "shape"):
+            hasher.update(f"{data.shape}{data.dtype}".encode())
+            data = data.tobytes()
+        hasher.update(data)
+        return hasher.hexdigest()
+
+    @staticmethod
+    def hash_file(file_path: str) -> str:
+        """Returns the hash of the content of a file, e.g. of a frame file, which is much cheaper than hashing the preprocessed frame."""
+        hasher = hashlib.blake2b(digest_size=16)
+        with open(file_path, "rb") as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                hasher.update(chunk)
+        return f"file_{hasher.hexdigest()}"
+
+    def __get_path(self, key: str) -> str:
+        return os.path.join(self.model_dir, f"{key}.pt")
+
+    def __get_model_key(self, checkpoint_filepath: str, model_filepath: str, variant: str) -> str:
+        # A retrained checkpoint at the same path has another size or modification time
+        hasher = hashlib.blake2b(digest_size=8)
+        hasher.update(os.path.basename(model_filepath).encode())
+        hasher.update(variant.encode())
+        hasher.update(os.path.abspath(checkpoint_filepath).encode())
+        if os.path.exists(checkpoint_filepath):
+            hasher.update(f"{os.path.getsize(checkpoint_filepath)}{os.path.getmtime(checkpoint_filepath)}".encode())
+        name = os.path.splitext(os.path.basename(checkpoint_filepath))[0]
+        return f"{name}_{hasher.hexdigest()}"
+
+    def __scan_cache_dir(self):
+        # The features of all models count towards the size of the cache
+        entries = []
+        for model_dir in os.scandir(self.cache_dir):
+            if not model_dir.is_dir():
+                continue
+            for entry in os.scandir(model_dir.path):
+                if entry.name.endswith(".tmp"):
+                    # Left over from a crash while writing
+                    os.remove(entry.path)
+                elif entry.name.endswith(".pt"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.path, stat.st_size))
+
+        for _, path, size in sorted(entries):
+            self.__entries[path] = size
+            self.__size += size
+        self.__evict()
+
+    def __evict(self):
+        while self.__size > self.max_size and len(self.__entries) > 1:
+            path = next(iter(self.__entries))
+            self.__remove(path)
+
+    def __remove(self, path: str):
+        self.__size -= self.__entries.pop(path, 0)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def __to_device(self, features, device):
+        if isinstance(features, torch.Tensor):
+            return features.to(device) if device is not None else features
+        if isinstance(features, dict):
+            return {key: self.__to_device(value, device) for key, value in features.items()}
+        if isinstance(features, (list, tuple)):
+            return type(features)(self.__to_device(value, device) for value in features)
+        return features
+
+    def __to_cpu(self, features):
+        if isinstance(features, torch.Tensor):
+            return features.detach().cpu()
+        if isinstance(features, dict):
+            return {key: self.__to_cpu(value) for key, value in features.items()}
+        if isinstance(features, (list, tuple)):
+            return type(features)(self.__to_cpu(value) for value in features)
+        return features
@@ -1,6 +1,8 @@
 import cv2
-import os
-from skimage.metrics import structural_similarity as ssim
+from frame_writer import FrameWriter
+from frame_store import FrameStore
+from frame_similarity import SimilarityBackend, create_similarity_backend
+from frame_signature_index import FrameSignatureIndex
 
 
 class FrameExtraction:
@@ -8,25 +10,39 @@ class FrameExtraction:
     This class loads the video and extracts frames in ranges set in the config file, or from a given to a given frame.
     When extract from video player function is loaded, it opens the VideoPlayer class and enables getting frames through the video player
     """
-    def __init__(self, video_path, output_dir, similarity_threshold=0.8):
+    SEEK_DISTANCE = 250     # Frames, from which on seeking is faster than grabbing every frame in between
+
+    def __init__(self, video_path, output_dir, similarity_threshold=0.8, sequential_decoding=True, output_format="jpg", output_quality=95, encoder_threads=4, similarity_backend: SimilarityBackend = None, signature_index_dir=None, video_hash=None, frame_store: FrameStore = None):
         self.video_path = video_path
         self.output_dir = output_dir
         self.similarity_threshold = similarity_threshold
+        self.sequential_decoding = sequential_decoding  # Decode the range once instead of seeking to every extracted frame
+        self.output_format = output_format
+        self.output_quality = output_quality
+        self.encoder_threads = encoder_threads
+        self.similarity_backend = similarity_backend if similarity_backend else create_similarity_backend("ssim")
+
+        # The signature index can only answer similarity decisions for backends, whose signatures it stores
+        self.signature_index_dir = signature_index_dir
+        self.video_hash = video_hash
+        self.__video_hash_path = video_path     # The Videohash of the table only belongs to the original video
+        self.__signature_indexes = {}
+        self.__is_signature_index_warned = False
+
+        # If a frame store is set, extracted frames are handed to it and saved in the background
+        self.frame_store = frame_store
         self.fps = None
         self.do_histogram = False
         self.extraction_rate = None
+        # Optional Job of the JobRunner, which gets the progress of the extraction and can cancel it
+        self.job = None
 
     def get_fps(self):
         return self.fps
     
     def extract_frames_by_damage_time(self, start_seconds: int, end_seconds: int, extraction_rate: int, auto_histogram = None):
-        if not self.fps:
-            cap = cv2.VideoCapture(self.video_path)
-            if not cap.isOpened():
-                print(f"Error opening video file: {self.video_path}")
-                return False
-            self.fps = cap.get(cv2.CAP_PROP_FPS)
-            cap.release()
+        if not self.__load_fps():
+            return False
         
         if auto_histogram is not None:
             self.do_histogram = auto_histogram
@@ -50,25 +66,82 @@ class FrameExtraction:
         :param extraction_rate: Number of frames to skip between analyses.
         :param direction: Direction to analyze ("forward" or "backward").
         """
-        if not self.fps:
-            cap = cv2.VideoCapture(self.video_path)
-            if not cap.isOpened():
-                print(f"Error opening video file: {self.video_path}")
-                return False
-            self.fps = cap.get(cv2.CAP_PROP_FPS)
-            cap.release()
+        if not self.__load_fps():
+            return False
+
+        start_frame = int(start_second * self.fps)
+        end_frame = int(end_second * self.fps)
+
+        next_frame = self.__find_segment_boundary(start_frame, end_frame, frame_count, extraction_rate, direction)
+        if next_frame is None:
+            return False
+
+        if direction == "forward":
+            end_frame = next_frame
+        elif direction == "backward":
+            start_frame = next_frame
+
+        return self.__extract_frames(start_frame, end_frame, extraction_rate)
+
+    def extend_frames(self, first_frame: int, last_frame: int, frame_count: int, extraction_rate: int, direction: str = "forward"):
+        """
+        Like extract_video_segment_by_similarity, but only extracts the frames beyond the already extracted range,
+        so the existing frames are neither deleted nor extracted again.
+
+        :param first_frame: Frame number of the first already extracted frame.
+        :param last_frame: Frame number of the last already extracted frame.
+        :param frame_count: Number of dissimilar frames to look for.
+        :param extraction_rate: Number of frames to skip between analyses.
+        :param direction: Direction to extend ("forward" or "backward").
+        """
+        if not self.__load_fps():
+            return False
+
+        next_frame = self.__find_segment_boundary(first_frame, last_frame, frame_count, extraction_rate, direction)
+        if next_frame is None:
+            return False
+
+        if direction == "forward":
+            return self.__extract_frames(last_frame + extraction_rate, next_frame, extraction_rate)
+        return self.__extract_frames(max(next_frame, 0), first_frame - 1, extraction_rate)
+
+    def extract_frames_by_frame_range(self, start_frame: int, end_frame: int, extraction_rate: int):
+        """
+        Extracts every extraction_rate-th frame from start_frame to end_frame, without touching frames outside of that range.
+        """
+        if not self.__load_fps():
+            return False
+
+        if extraction_rate:
+            self.extraction_rate = extraction_rate
+
+        return self.__extract_frames(int(start_frame), int(end_frame), int(extraction_rate))
+
+    def __load_fps(self) -> bool:
+        if self.fps:
+            return True
 
         cap = cv2.VideoCapture(self.video_path)
         if not cap.isOpened():
             print(f"Error opening video file: {self.video_path}")
             return False
+        self.fps = cap.get(cv2.CAP_PROP_FPS)
+        cap.release()
+        return True
+
+    def __find_segment_boundary(self, start_frame: int, end_frame: int, frame_count: int, extraction_rate: int, direction: str):
+        """
+        Walks from end_frame forward, or from start_frame backward, until frame_count dissimilar frames were found.
+        Returns the frame number where the walk stopped, or None on errors.
+        """
+        cap = cv2.VideoCapture(self.video_path)
+        if not cap.isOpened():
+            print(f"Error opening video file: {self.video_path}")
+            return None
 
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        start_frame = int(start_second * self.fps)
-        end_frame = int(end_second * self.fps)
 
         # Determine direction and boundaries
-        looking_range = None
         if direction == "forward":
             next_frame = min(end_frame, total_frames - 1)
         elif direction == "backward":
@@ -76,10 +149,15 @@ class FrameExtraction:
         else:
             print("Invalid direction specified. Use 'forward' or 'backward'.")
             cap.release()
-            return False
+            return None
+
+        # Answer the search from the signature index, if possible (the search always compares equalized frames)
+        signature_index = self.__get_signature_index(equalized=True)
+        if signature_index is not None:
+            cap.release()
+            return self.__find_segment_boundary_in_index(signature_index, next_frame, frame_count, extraction_rate, direction, total_frames)
 
-        last_frame = None
-        dissimilar_start = None
+        last_signature = None
 
         extractable_frame_counter = 0
 
@@ -106,25 +184,21 @@ class FrameExtraction:
             frame = self.__apply_histogram_equalization(frame)
 
             # Check similarity
-            if last_frame is not None:
-                similarity_index = self.__check_for_similarity(last_frame, frame)
+            signature = self.similarity_backend.prepare(frame)
+            if last_signature is not None:
+                similarity_index = self.similarity_backend.compare(last_signature, signature)
                 if similarity_index < self.similarity_threshold:
                     extractable_frame_counter += 1
 
-            last_frame = frame
+            last_signature = signature
 
         cap.release()
-
-        if direction == "forward":
-            end_frame = next_frame
-        elif direction == "backward":
-            start_frame = next_frame
-
-        return self.__extract_frames(start_frame, end_frame, extraction_rate)
+        return next_frame
 
     def __extract_frames(self, start_frame: int, end_frame: int, extraction_rate: int) -> bool:
 
-        last_frame = None
+        last_signature = None
+        last_frame_number = None
         
         cap = cv2.VideoCapture(self.video_path)
         if not cap.isOpened():
@@ -145,34 +219,192 @@ class FrameExtraction:
         counter_skipped = 0
         avg_similarity = 0
 
-        for frame_number in range(start_frame, end_frame+1, extraction_rate):
-            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
-            ret, frame = cap.read()
+        # If the signature index already covers the sampled frames, the kept frames are known before decoding.
+        # Else the sampled frames are added to the index while extracting, so indexing decodes no further frames.
+        signature_index = self.__get_signature_index(equalized=self.do_histogram)
+        kept_frames = None
+        if signature_index is not None and signature_index.covers(start_frame, end_frame, extraction_rate):
+            kept_frames = signature_index.select_frames(start_frame, end_frame, extraction_rate, self.similarity_threshold)
+            counter_skipped = len(range(start_frame, end_frame+1, extraction_rate)) - len(kept_frames)
+            frames = self.__read_frames(cap, start_frame, end_frame, extraction_rate, frame_numbers=set(kept_frames))
+        else:
+            frames = self.__read_frames(cap, start_frame, end_frame, extraction_rate)
+
+        # Decoding stays on this thread, encoding and saving runs on the writers thread pool
+        frame_store = self.frame_store if self.frame_store is not None and self.frame_store.frame_dir == self.output_dir else None
+        frame_writer = None
+        if frame_store is None:
+            frame_writer = FrameWriter(self.output_dir, self.output_format, self.output_quality, self.encoder_threads)
+            frame_writer.start()
+
+        try:
+            for frame_number, frame in frames:
+                if not self.__report_progress(frame_number - start_frame, end_frame - start_frame, "Extracting Frames"):
+                    print("Frame extraction cancelled.")
+                    break
+
+                if self.do_histogram:
+                    frame = self.__apply_histogram_equalization(frame)
+
+                if kept_frames is None and signature_index is not None:
+                    signature_index.add(frame_number, frame)
+                    if last_frame_number is not None:
+                        similarity_index = signature_index.similarity(last_frame_number, frame_number)
+                        if similarity_index > self.similarity_threshold:
+                            counter_skipped += 1
+                            avg_similarity = similarity_index if avg_similarity == 0 else (avg_similarity + similarity_index) / 2
+                            continue
+
+                elif kept_frames is None:
+                    signature = self.similarity_backend.prepare(frame)
+                    if last_signature is not None:
+                        similarity_index = self.similarity_backend.compare(last_signature, signature)
+                    if last_signature is not None and similarity_index > self.similarity_threshold:
+                        counter_skipped += 1
+                        avg_similarity = similarity_index if avg_similarity == 0 else (avg_similarity + similarity_index) / 2
+                        continue
+                    last_signature = signature
+
+                if frame_store is not None:
+                    frame_store.add(frame_number, frame)
+                else:
+                    frame_writer.write(frame_number, frame)
+                
+                counter_pos += 1
+                last_frame_number = frame_number
+        finally:
+            cap.release()
+            if frame_writer is not None:
+                frame_writer.close()
+            if signature_index is not None:
+                signature_index.save()
+
+        print(f"Frames have been saved to {self.output_dir}.\nSuccessfully Extracted {counter_pos} Frames, Skipped {counter_skipped} Frames with Avg Similarity of {int(round(avg_similarity, 2) * 100)}%\n")
+        return True
 
+    def __read_frames(self, cap, start_frame: int, end_frame: int, extraction_rate: int, frame_numbers: set = None, sequential: bool = None):
+        """
+        Yields (frame_number, frame) for every extraction_rate-th frame from start_frame to end_frame,
+        or for the given frame_numbers within that range.
+        In sequential mode the capture only seeks once to start_frame and then walks the stream with grab(),
+        so only the kept frames are retrieved. Otherwise it seeks to every frame, which forces a keyframe
+        seek and a re-decode of the GOP for every extracted frame.
+        """
+        if frame_numbers is not None:
+            wanted_frames = sorted(frame_number for frame_number in frame_numbers if start_frame <= frame_number <= end_frame)
+        else:
+            wanted_frames = range(start_frame, end_frame+1, extraction_rate)
+
+        if sequential is None:
+            sequential = self.sequential_decoding
+
+        if not sequential:
+            for frame_number in wanted_frames:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+                ret, frame = cap.read()
+
+                if not ret:
+                    print(f"Failed to read frame {frame_number}.")
+                    return
+                yield frame_number, frame
+            return
+
+        if start_frame > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        position = start_frame
+
+        for frame_number in wanted_frames:
+            # Only seek again, when the next wanted frame is so far away, that grabbing all frames in between takes longer
+            if frame_number - position > self.SEEK_DISTANCE:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+                position = frame_number
+
+            while position <= frame_number:
+                if not cap.grab():
+                    print(f"Failed to read frame {position}.")
+                    return
+                position += 1
+
+            ret, frame = cap.retrieve()
             if not ret:
                 print(f"Failed to read frame {frame_number}.")
-                break
-            
-            if self.do_histogram:
-                frame = self.__apply_histogram_equalization(frame)
-            
-            if last_frame is not None:
-                similarity_index = self.__check_for_similarity(last_frame, frame)
-            if last_frame is not None and similarity_index > self.similarity_threshold:
-                counter_skipped += 1
-                avg_similarity = similarity_index if avg_similarity == 0 else (avg_similarity + similarity_index) / 2
-                continue
-
-            output_filename = os.path.join(self.output_dir, f'{frame_number:05d}.jpg')
-            cv2.imwrite(output_filename, frame)
-            
-            counter_pos += 1
-            last_frame = frame
+                return
+            yield frame_number, frame
 
-        cap.release()
+    def __get_signature_index(self, equalized: bool):
+        """
+        Returns the signature index of the current video, or None if no index is used.
+        """
+        if not self.signature_index_dir or not self.video_path:
+            return None
+        if self.similarity_backend.name not in FrameSignatureIndex.METRICS:
+            if not self.__is_signature_index_warned:
+                print(f"The frame signature index only works with the backends {', '.join(FrameSignatureIndex.METRICS)}, not with {self.similarity_backend.name}")
+                self.__is_signature_index_warned = True
+            return None
+
+        key = (self.video_path, equalized)
+        if key not in self.__signature_indexes:
+            video_hash = self.video_hash if self.video_path == self.__video_hash_path else None
+            try:
+                self.__signature_indexes[key] = FrameSignatureIndex(self.video_path, self.signature_index_dir, video_hash, equalized, self.similarity_backend.name)
+            except Exception as e:
+                print(f"Error creating frame signature index: {e}")
+                return None
+        return self.__signature_indexes[key]
+
+    def __index_frame_range(self, signature_index: FrameSignatureIndex, start_frame: int, end_frame: int, equalized: bool, step: int = 1):
+        """
+        Adds every step-th frame of the range, which is not in the index yet, in one pass.
+        """
+        missing_frames = signature_index.missing_frames(start_frame, end_frame, step)
+        if len(missing_frames) == 0:
+            return
 
-        print(f"Frames have been saved to {self.output_dir}.\nSuccessfully Extracted {counter_pos} Frames, Skipped {counter_skipped} Frames with Avg Similarity of {int(round(avg_similarity, 2) * 100)}%\n")
-        return True
+        cap = cv2.VideoCapture(self.video_path)
+        if not cap.isOpened():
+            print(f"Error opening video file: {self.video_path}")
+            return
+
+        try:
+            for frame_number, frame in self.__read_frames(cap, int(missing_frames[0]), int(missing_frames[-1]), 1, frame_numbers=set(missing_frames.tolist())):
+                if not self.__report_progress(frame_number - int(missing_frames[0]), int(missing_frames[-1]) - int(missing_frames[0]), "Indexing Frames"):
+                    break
+                if equalized:
+                    frame = self.__apply_histogram_equalization(frame)
+                signature_index.add(frame_number, frame)
+        finally:
+            cap.release()
+            signature_index.save()
+
+    def __find_segment_boundary_in_index(self, signature_index: FrameSignatureIndex, from_frame: int, frame_count: int, extraction_rate: int, direction: str, total_frames: int) -> int:
+        """
+        Searches the segment boundary in the signature index. The indexed range grows until the boundary is found or the video ends.
+        """
+        search_length = max(extraction_rate * frame_count * 4, extraction_rate)
+
+        while True:
+            if direction == "forward":
+                range_start, range_end = from_frame, min(from_frame + search_length, total_frames - 1)
+            else:
+                # Starts on a frame of the search, also when the range is cut off at the start of the video
+                range_start, range_end = from_frame - min(search_length, from_frame) // extraction_rate * extraction_rate, from_frame
+
+            # The search only compares every extraction_rate-th frame from from_frame on, so only these are indexed
+            self.__index_frame_range(signature_index, range_start, range_end, equalized=True, step=extraction_rate)
+            frame_number, ran_out_of_frames = signature_index.find_segment_boundary(from_frame, extraction_rate, frame_count, self.similarity_threshold, direction)
+
+            reached_video_end = range_end >= total_frames - 1 if direction == "forward" else range_start < extraction_rate
+            if not ran_out_of_frames or reached_video_end:
+                return frame_number
+
+            search_length *= 2
+
+    def __report_progress(self, done: int, total: int, text: str) -> bool:
+        # Returns False if the job of the extraction was cancelled
+        if self.job is None:
+            return True
+        return self.job.set_progress(done, total, text)
 
     def __apply_histogram_equalization(self, frame):
         """
@@ -187,21 +419,3 @@ class FrameExtraction:
         # Convert back to BGR color space
         equalized_frame = cv2.cvtColor(yuv_frame, cv2.COLOR_YUV2BGR)
         return equalized_frame
-    
-    def __check_for_similarity(self, frame1, frame2):
-        """
-        Compares two frames and checks for similarity.
-        """
-
-        # Resize frames to the same size if necessary
-        if frame1.shape != frame2.shape:
-            frame1 = cv2.resize(frame1, (frame2.shape[1], frame2.shape[0]))
-
-        # Convert frames to grayscale for SSIM comparison
-        gray_frame1 = cv2.cvtColor(frame1, cv2.COLOR_BGR2GRAY)
-        gray_frame2 = cv2.cvtColor(frame2, cv2.COLOR_BGR2GRAY)
-
-        # Compute SSIM between the two frames
-        similarity_index = ssim(gray_frame1, gray_frame2)
-
-        return similarity_index
\ No newline at end of file
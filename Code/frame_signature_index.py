@@ -0,0 +1,201 @@
+import cv2
+import hashlib
+import numpy as np
+import os
+from frame_similarity import PerceptualHashBackend, HistogramBackend
+
+
+class FrameSignatureIndex:
+    """
+    This class stores a compact signature for every frame of a video on disk:
+        - a 64 bit perceptual hash
+        - a normalized 64 bin luminance histogram
+        - an interlace score (mean difference between even and odd rows)
+    The signatures of the frames the extraction samples are merged into the index file,
+    so similarity decisions and segment boundary searches can later be answered without decoding the video again.
+    The index file is keyed by the Videohash column of the table, or by a hash of the video file content.
+    """
+    METRICS = ("phash", "histogram")
+
+    def __init__(self, video_path: str, index_dir: str, video_hash=None, equalized: bool = False, metric: str = "phash"):
+        self.video_path = video_path
+        self.metric = metric if metric in self.METRICS else "phash"
+        self.is_changed = False
+
+        self.__hash_backend = PerceptualHashBackend()
+        self.__histogram_backend = HistogramBackend(bins=64)
+
+        key = str(video_hash) if video_hash else self.__hash_video_file(video_path)
+        suffix = "_equalized" if equalized else ""
+        os.makedirs(index_dir, exist_ok=True)
+        self.index_path = os.path.join(index_dir, f"{key}{suffix}.npz")
+
+        self.frame_numbers = np.empty(0, dtype=np.int32)
+        self.hashes = np.empty((0, 8), dtype=np.uint8)
+        self.histograms = np.empty((0, 64), dtype=np.float16)
+        self.interlace_scores = np.empty(0, dtype=np.float32)
+        self.__pending = {}
+
+        self.load()
+
+    def load(self) -> bool:
+        if not os.path.exists(self.index_path):
+            return False
+        try:
+            with np.load(self.index_path) as data:
+                self.frame_numbers = data["frame_numbers"]
+                self.hashes = data["hashes"]
+                self.histograms = data["histograms"]
+                self.interlace_scores = data["interlace_scores"]
+            return True
+        except Exception as e:
+            print(f"Error loading frame signature index {self.index_path}: {e}")
+            return False
+
+    def save(self) -> bool:
+        """
+        Merges the newly added signatures and writes the index with an atomic rename.
+        """
+        self.__merge_pending()
+        if not self.is_changed:
+            return True
+
+        temp_path = f"{self.index_path}.tmp.npz"
+        try:
+            np.savez(temp_path, frame_numbers=self.frame_numbers, hashes=self.hashes, histograms=self.histograms, interlace_scores=self.interlace_scores)
+            os.replace(temp_path, self.index_path)
+            self.is_changed = False
+            return True
+        except Exception as e:
+            print(f"Error saving frame signature index {self.index_path}: {e}")
+            return False
+
+    def add(self, frame_number: int, frame):
+        """
+        Computes and stores the signature of a decoded (BGR) frame.
+        """
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        even_rows = gray[0::2].astype(np.int16)
+        odd_rows = gray[1::2].astype(np.int16)
+        rows = min(len(even_rows), len(odd_rows))
+        interlace_score = float(np.abs(even_rows[:rows] - odd_rows[:rows]).mean())
+
+        self.__pending[int(frame_number)] = (self.__hash_backend.prepare(gray), self.__histogram_backend.prepare(gray), interlace_score)
+
+    def contains(self, frame_number: int) -> bool:
+        if frame_number in self.__pending:
+            return True
+        position = np.searchsorted(self.frame_numbers, frame_number)
+        return position < len(self.frame_numbers) and self.frame_numbers[position] == frame_number
+
+    def missing_frames(self, start_frame: int, end_frame: int, step: int = 1) -> np.ndarray:
+        """Frame numbers from start_frame to end_frame in steps of step, which are not indexed."""
+        wanted = np.arange(start_frame, end_frame + 1, max(int(step), 1), dtype=np.int32)
+        missing = wanted[~np.isin(wanted, self.frame_numbers, assume_unique=True)]
+        return np.array([frame_number for frame_number in missing if int(frame_number) not in self.__pending], dtype=np.int32)
+
+    def covers(self, start_frame: int, end_frame: int, step: int = 1) -> bool:
+        return len(self.missing_frames(start_frame, end_frame, step)) == 0
+
+    def similarity(self, frame_number1: int, frame_number2: int) -> float:
+        """
+        Similarity of two indexed frames with the metric of this index, in the range of 0 to 1.
+        The signatures are read from the pending ones or the index, the pending ones are only merged on save,
+        since merging them for every extracted frame would sort the whole index again and again.
+        """
+        hash1, histogram1 = self.__get_signature(frame_number1)
+        hash2, histogram2 = self.__get_signature(frame_number2)
+
+        if self.metric == "histogram":
+            return self.__histogram_backend.compare(histogram1, histogram2)
+        return self.__hash_backend.compare(hash1, hash2)
+
+    def get_interlace_scores(self, start_frame: int, end_frame: int) -> np.ndarray:
+        self.__merge_pending()
+        start, end = np.searchsorted(self.frame_numbers, [start_frame, end_frame + 1])
+        return self.interlace_scores[start:end]
+
+    def select_frames(self, start_frame: int, end_frame: int, extraction_rate: int, similarity_threshold: float) -> list[int]:
+        """
+        Returns the frame numbers frame extraction keeps: every extraction_rate-th frame, which is not more similar
+        than similarity_threshold to the last kept frame.
+        """
+        kept_frames = []
+        for frame_number in range(start_frame, end_frame + 1, extraction_rate):
+            if not self.contains(frame_number):
+                break
+            if kept_frames and self.similarity(kept_frames[-1], frame_number) > similarity_threshold:
+                continue
+            kept_frames.append(frame_number)
+        return kept_frames
+
+    def find_segment_boundary(self, from_frame: int, extraction_rate: int, frame_count: int, similarity_threshold: float, direction: str = "forward"):
+        """
+        Walks from from_frame in extraction_rate steps until frame_count dissimilar frames were found.
+        Returns (frame number where the walk stopped, True if it stopped because the index has no more frames).
+        """
+        step = extraction_rate if direction == "forward" else -extraction_rate
+        frame_number = from_frame
+        last_frame = None
+        dissimilar_frames = 0
+
+        while dissimilar_frames < frame_count:
+            frame_number += step
+            if not self.contains(frame_number):
+                return frame_number, True
+            if last_frame is not None and self.similarity(last_frame, frame_number) < similarity_threshold:
+                dissimilar_frames += 1
+            last_frame = frame_number
+
+        return frame_number, False
+
+    def __get_signature(self, frame_number: int) -> tuple:
+        """Perceptual hash and histogram of an indexed frame, the histogram rounded like it is stored."""
+        if int(frame_number) in self.__pending:
+            frame_hash, histogram, _ = self.__pending[int(frame_number)]
+            return frame_hash, histogram.astype(np.float16).astype(np.float32)
+        position = self.__position(frame_number)
+        return self.hashes[position], self.histograms[position].astype(np.float32)
+
+    def __position(self, frame_number: int) -> int:
+        position = int(np.searchsorted(self.frame_numbers, frame_number))
+        if position >= len(self.frame_numbers) or self.frame_numbers[position] != frame_number:
+            raise KeyError(f"Frame {frame_number} is not in the signature index")
+        return position
+
+    def __merge_pending(self):
+        if not self.__pending:
+            return
+
+        pending_numbers = np.array(list(self.__pending.keys()), dtype=np.int32)
+        keep = ~np.isin(self.frame_numbers, pending_numbers)
+        pending_values = list(self.__pending.values())
+
+        frame_numbers = np.concatenate((self.frame_numbers[keep], pending_numbers))
+        hashes = np.concatenate((self.hashes[keep], np.stack([value[0] for value in pending_values])))
+        histograms = np.concatenate((self.histograms[keep], np.stack([value[1] for value in pending_values]).astype(np.float16)))
+        interlace_scores = np.concatenate((self.interlace_scores[keep], np.array([value[2] for value in pending_values], dtype=np.float32)))
+
+        order = np.argsort(frame_numbers, kind="stable")
+        self.frame_numbers = frame_numbers[order]
+        self.hashes = hashes[order]
+        self.histograms = histograms[order]
+        self.interlace_scores = interlace_scores[order]
+
+        self.__pending = {}
+        self.is_changed = True
+
+    def __hash_video_file(self, video_path: str, chunk_size: int = 1024 * 1024) -> str:
+        """
+        Hashes the file size and three 1 MB chunks from the start, middle and end of the video.
+        Reading whole inspection videos would take longer than building the index.
+        """
+        sha1 = hashlib.sha1()
+        file_size = os.path.getsize(video_path)
+        sha1.update(str(file_size).encode())
+
+        with open(video_path, "rb") as file:
+            for offset in (0, max(file_size // 2 - chunk_size // 2, 0), max(file_size - chunk_size, 0)):
+                file.seek(offset)
+                sha1.update(file.read(chunk_size))
+        return sha1.hexdigest()
@@ -0,0 +1,199 @@
+import cv2
+import numpy as np
+from skimage.metrics import structural_similarity as ssim
+
+
+class SimilarityBackend:
+    """
+    Base class for the frame similarity checks used during frame extraction.
+    A backend first turns a frame into a signature (prepare) and then compares two signatures (compare).
+    This way the signature of the last kept frame is only computed once, no matter how many frames it is compared to.
+    Scores are in the range of 0 to 1, where 1 means identical.
+    """
+    name = ""
+
+    def prepare(self, frame):
+        raise NotImplementedError
+
+    def compare(self, signature1, signature2) -> float:
+        raise NotImplementedError
+
+    def similarity(self, frame1, frame2) -> float:
+        return self.compare(self.prepare(frame1), self.prepare(frame2))
+
+    def _to_gray(self, frame, thumbnail_width: int = 0):
+        if frame.ndim == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        if thumbnail_width and frame.shape[1] > thumbnail_width:
+            height = max(int(round(frame.shape[0] * thumbnail_width / frame.shape[1])), 7)
+            frame = cv2.resize(frame, (thumbnail_width, height), interpolation=cv2.INTER_AREA)
+        return frame
+
+
+class SsimBackend(SimilarityBackend):
+    """
+    skimage SSIM on the full resolution grayscale frames. This is the reference all other backends are calibrated against.
+    """
+    name = "ssim"
+
+    def prepare(self, frame):
+        return self._to_gray(frame)
+
+    def compare(self, signature1, signature2) -> float:
+        if signature1.shape != signature2.shape:
+            signature1 = cv2.resize(signature1, (signature2.shape[1], signature2.shape[0]))
+        return float(ssim(signature1, signature2))
+
+
+class ThumbnailSsimBackend(SsimBackend):
+    """
+    skimage SSIM on a downscaled grayscale thumbnail of the frames.
+    """
+    name = "thumbnail_ssim"
+
+    def __init__(self, thumbnail_width: int = 320):
+        self.thumbnail_width = thumbnail_width
+
+    def prepare(self, frame):
+        return self._to_gray(frame, self.thumbnail_width)
+
+
+class BoxSsimBackend(SimilarityBackend):
+    """
+    SSIM with a uniform 7x7 window computed with cv2.blur, optionally on a downscaled thumbnail.
+    Uses the same constants and sample covariance correction as skimage, so the scores match skimage's SSIM closely.
+    The local means and squares of a frame are part of its signature and only calculated once.
+    """
+    name = "box_ssim"
+
+    def __init__(self, thumbnail_width: int = 0, win_size: int = 7):
+        self.thumbnail_width = thumbnail_width
+        self.win_size = win_size
+
+    def prepare(self, frame):
+        gray = self._to_gray(frame, self.thumbnail_width).astype(np.float32)
+        window = (self.win_size, self.win_size)
+        mean = cv2.blur(gray, window, borderType=cv2.BORDER_REFLECT)
+        mean_of_square = cv2.blur(gray * gray, window, borderType=cv2.BORDER_REFLECT)
+        return gray, mean, mean_of_square
+
+    def compare(self, signature1, signature2) -> float:
+        gray1, mean1, mean_sq1 = signature1
+        gray2, mean2, mean_sq2 = signature2
+        if gray1.shape != gray2.shape:
+            return self.similarity(cv2.resize(gray1, (gray2.shape[1], gray2.shape[0])), gray2)
+
+        window = (self.win_size, self.win_size)
+        mean_of_product = cv2.blur(gray1 * gray2, window, borderType=cv2.BORDER_REFLECT)
+
+        num_pixels = self.win_size ** 2
+        cov_norm = num_pixels / (num_pixels - 1)
+        var1 = cov_norm * (mean_sq1 - mean1 * mean1)
+        var2 = cov_norm * (mean_sq2 - mean2 * mean2)
+        covariance = cov_norm * (mean_of_product - mean1 * mean2)
+
+        # Same constants as skimage for uint8 images
+        c1 = (0.01 * 255) ** 2
+        c2 = (0.03 * 255) ** 2
+
+        ssim_map = ((2 * mean1 * mean2 + c1) * (2 * covariance + c2)) / ((mean1 ** 2 + mean2 ** 2 + c1) * (var1 + var2 + c2))
+
+        # skimage ignores the border, where the window does not fit completely
+        pad = (self.win_size - 1) // 2
+        return float(ssim_map[pad:-pad, pad:-pad].mean())
+
+
+class PerceptualHashBackend(SimilarityBackend):
+    """
+    64 bit DCT perceptual hash. The score is the share of equal bits of both hashes.
+    """
+    name = "phash"
+
+    def prepare(self, frame):
+        gray = self._to_gray(frame)
+        small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+        low_frequencies = cv2.dct(small)[:8, :8].flatten()
+        # The DC component only holds the average brightness, leave it out of the median
+        bits = low_frequencies > np.median(low_frequencies[1:])
+        return np.packbits(bits)
+
+    def compare(self, signature1, signature2) -> float:
+        different_bits = int(np.unpackbits(np.bitwise_xor(signature1, signature2)).sum())
+        return 1.0 - different_bits / 64
+
+
+class HistogramBackend(SimilarityBackend):
+    """
+    Correlation of the normalized luminance histograms of both frames.
+    """
+    name = "histogram"
+
+    def __init__(self, bins: int = 64):
+        self.bins = bins
+
+    def prepare(self, frame):
+        gray = self._to_gray(frame, 320)
+        histogram = cv2.calcHist([gray], [0], None, [self.bins], [0, 256])
+        return cv2.normalize(histogram, histogram).flatten()
+
+    def compare(self, signature1, signature2) -> float:
+        correlation = cv2.compareHist(signature1, signature2, cv2.HISTCMP_CORREL)
+        return float(max(0.0, correlation))
+
+
+SIMILARITY_BACKENDS = {
+    backend.name: backend for backend in (SsimBackend, ThumbnailSsimBackend, BoxSsimBackend, PerceptualHashBackend, HistogramBackend)
+}
+
+
+def create_similarity_backend(name: str = "ssim", thumbnail_width: int = 320) -> SimilarityBackend:
+    """
+    Creates the similarity backend with the given name. Unknown names fall back to the full resolution SSIM.
+    """
+    if name not in SIMILARITY_BACKENDS:
+        print(f"Error: Unknown similarity backend '{name}', using ssim instead.")
+        name = "ssim"
+
+    if name in ("thumbnail_ssim", "box_ssim"):
+        return SIMILARITY_BACKENDS[name](thumbnail_width=thumbnail_width)
+    return SIMILARITY_BACKENDS[name]()
+
+
+def calibrate_threshold(reference_scores, backend_scores, reference_threshold: float) -> tuple:
+    """
+    Maps the image_similarity_threshold of the reference SSIM onto a backend.
+    Frame pairs with a reference score above reference_threshold count as similar (they would be skipped).
+    The returned threshold is the one, for which the backend makes the same skip decisions for the most pairs.
+    Args:
+        reference_scores: Scores of the full resolution SSIM for a set of frame pairs
+        backend_scores: Scores of the backend for the same frame pairs
+        reference_threshold: The image_similarity_threshold set in the config
+    Returns:
+        tuple: (calibrated threshold, share of pairs with the same decision)
+    """
+    reference_scores = np.asarray(reference_scores, dtype=np.float64)
+    backend_scores = np.asarray(backend_scores, dtype=np.float64)
+    if len(reference_scores) == 0:
+        return reference_threshold, 0.0
+
+    is_similar = reference_scores > reference_threshold
+
+    order = np.argsort(backend_scores)
+    sorted_scores = backend_scores[order]
+    sorted_similar = is_similar[order]
+
+    # Threshold between position i-1 and i: everything below is dissimilar, everything from i on similar
+    dissimilar_below = np.concatenate(([0], np.cumsum(~sorted_similar)))
+    similar_from = np.concatenate((np.cumsum(sorted_similar[::-1])[::-1], [0]))
+    agreement = dissimilar_below + similar_from
+
+    best = int(np.argmax(agreement))
+    if best == 0:
+        threshold = sorted_scores[0] - 1e-6
+    elif best == len(sorted_scores):
+        threshold = sorted_scores[-1]
+    else:
+        threshold = (sorted_scores[best - 1] + sorted_scores[best]) / 2
+
+    return float(threshold), float(agreement[best] / len(reference_scores))
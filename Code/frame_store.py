@@ -0,0 +1,184 @@
+import cv2
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from frame_writer import FrameWriter
+
+
+class FrameStore:
+    """
+    This class keeps the frames of the current frame_dir decoded in memory.
+    Every frame is decoded only once, either from the video during extraction or from the frame files, and then served to
+    SAM2, to the displayed ImageInfos and to the disk. Saving the frame files runs in the background on a FrameWriter,
+    so nothing has to wait for a frame to be written and read back again.
+    At most max_memory_mb of frames are kept, the least recently used ones are dropped first and read from their file
+    again, when they are needed. The store still knows every frame, only the decoded pixels are dropped.
+    Frames are stored as BGR arrays, the way OpenCV decodes them.
+    """
+    FRAME_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+    def __init__(self, frame_dir: str, output_format: str = "jpg", output_quality: int = 95, encoder_threads: int = 4, max_memory_mb: int = 2048):
+        self.frame_dir = frame_dir
+        self.max_memory = max(int(max_memory_mb), 1) * 1024 * 1024
+        self.__writer = FrameWriter(frame_dir, output_format, output_quality, encoder_threads)
+        self.__frames = OrderedDict()   # frame number: decoded frame, least recently used first
+        self.__memory = 0               # Bytes of the decoded frames
+        self.__paths = {}               # frame number: path, of every frame of the store
+        self.__lock = threading.Lock()
+
+    def __contains__(self, frame_number: int) -> bool:
+        return frame_number in self.__paths
+
+    def __len__(self) -> int:
+        return len(self.__paths)
+
+    @property
+    def frame_numbers(self) -> list[int]:
+        with self.__lock:
+            return sorted(self.__paths)
+
+    def get_frame_paths(self) -> list[str]:
+        """
+        Returns the paths of all stored frames, sorted by frame number. The files may still be in the writers queue.
+        """
+        with self.__lock:
+            return [self.__paths[frame_number] for frame_number in sorted(self.__paths)]
+
+    def add(self, frame_number: int, frame, persist: bool = True):
+        """
+        Stores a decoded BGR frame. If persist is set, the frame is also queued to be saved in frame_dir.
+        """
+        path = self.__writer.get_output_path(frame_number)
+        with self.__lock:
+            self.__paths[frame_number] = path
+            self.__cache_frame(frame_number, frame)
+        if persist:
+            self.__writer.write(frame_number, frame)
+
+    def remove(self, frame_number: int):
+        with self.__lock:
+            self.__paths.pop(frame_number, None)
+            self.__drop_frame(frame_number)
+
+    def clear(self):
+        """
+        Waits for pending writes, so no file is written after the caller deleted it, and forgets all frames.
+        """
+        self.flush()
+        with self.__lock:
+            self.__frames = OrderedDict()
+            self.__memory = 0
+            self.__paths = {}
+
+    def get_frame(self, frame_number: int, load: bool = True):
+        """
+        Returns the BGR frame, or None if the frame is not stored. A dropped frame is read from its file again,
+        unless load is False.
+        """
+        with self.__lock:
+            frame = self.__frames.get(frame_number)
+            if frame is not None:
+                self.__frames.move_to_end(frame_number)
+                return frame
+            path = self.__paths.get(frame_number)
+        if path is None or not load:
+            return None
+
+        # The file of a dropped frame may still be in the writers queue
+        self.__writer.flush()
+        frame = cv2.imread(path)
+        if frame is None:
+            print(f"Error: Could not read frame {path}")
+            return None
+        with self.__lock:
+            if self.__paths.get(frame_number) == path:
+                self.__cache_frame(frame_number, frame)
+        return frame
+
+    def get_rgb(self, frame_number: int):
+        frame = self.get_frame(frame_number)
+        if frame is None:
+            return None
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    def get_image(self, frame_number: int, load: bool = True):
+        """Returns the frame as PIL Image, or None if the frame is not stored."""
+        frame = self.get_frame(frame_number, load)
+        if frame is None:
+            return None
+        return Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+
+    def get_image_by_path(self, image_path: str, load: bool = True):
+        frame_number = self.frame_number_from_path(image_path)
+        if frame_number is None:
+            return None
+        stored_path = self.__paths.get(frame_number)
+        if stored_path is None or os.path.normcase(os.path.abspath(stored_path)) != os.path.normcase(os.path.abspath(image_path)):
+            return None
+        return self.get_image(frame_number, load)
+
+    def load_directory(self, num_threads: int = 4) -> int:
+        """
+        Adds all frame files of frame_dir, which are not stored yet. As many of them are decoded, as fit into max_memory_mb,
+        the others are decoded when they are needed. Returns the number of added frames.
+        """
+        if not os.path.isdir(self.frame_dir):
+            print(f"Error: Frame directory {self.frame_dir} does not exist!")
+            return 0
+
+        paths = {}
+        for file_name in os.listdir(self.frame_dir):
+            stem, extension = os.path.splitext(file_name)
+            if extension.lower() in self.FRAME_EXTENSIONS and stem.isdigit() and int(stem) not in self.__paths:
+                paths[int(stem)] = os.path.join(self.frame_dir, file_name)
+        paths = dict(sorted(paths.items()))
+        with self.__lock:
+            self.__paths.update(paths)
+
+        # cv2 releases the GIL while decoding, so the files can be read in parallel. They are read in chunks,
+        # so decoding stops once the memory is full
+        num_threads = max(int(num_threads), 1)
+        frame_numbers = list(paths)
+        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+            for start in range(0, len(frame_numbers), num_threads * 4):
+                # Once frames were dropped, the memory is full
+                if any(frame_number not in self.__frames for frame_number in frame_numbers[:start]):
+                    break
+                chunk = frame_numbers[start:start + num_threads * 4]
+                frames = executor.map(cv2.imread, [paths[frame_number] for frame_number in chunk])
+                for frame_number, frame in zip(chunk, frames):
+                    if frame is None:
+                        print(f"Error: Could not read frame {paths[frame_number]}")
+                        continue
+                    with self.__lock:
+                        self.__cache_frame(frame_number, frame)
+
+        return len(paths)
+
+    def flush(self):
+        """Waits until all queued frames are saved."""
+        self.__writer.flush()
+
+    def close(self):
+        self.__writer.close()
+
+    @staticmethod
+    def frame_number_from_path(image_path: str):
+        stem = os.path.splitext(os.path.basename(image_path))[0]
+        return int(stem) if stem.isdigit() else None
+
+    def __cache_frame(self, frame_number: int, frame):
+        # Called with the lock held
+        self.__drop_frame(frame_number)
+        self.__frames[frame_number] = frame
+        self.__memory += frame.nbytes
+        while self.__memory > self.max_memory and len(self.__frames) > 1:
+            _, dropped_frame = self.__frames.popitem(last=False)
+            self.__memory -= dropped_frame.nbytes
+
+    def __drop_frame(self, frame_number: int):
+        frame = self.__frames.pop(frame_number, None)
+        if frame is not None:
+            self.__memory -= frame.nbytes
@@ -0,0 +1,117 @@
+import cv2
+import os
+import queue
+import threading
+
+
+class FrameWriter:
+    """
+    This class encodes and saves extracted frames on a pool of encoder threads.
+    The decoding thread hands its frames over through a bounded queue. If the encoders fall behind, write() blocks
+    until a slot is free again, so the decoder never holds more than queue_size frames in memory.
+    """
+    FORMATS = {
+        "jpg": (".jpg", cv2.IMWRITE_JPEG_QUALITY),
+        "png": (".png", cv2.IMWRITE_PNG_COMPRESSION),
+        "webp": (".webp", cv2.IMWRITE_WEBP_QUALITY),
+    }
+
+    def __init__(self, output_dir: str, output_format: str = "jpg", quality: int = 95, num_threads: int = 4, queue_size: int = None):
+        if output_format not in self.FORMATS:
+            print(f"Error: Unknown output format '{output_format}', using jpg instead.")
+            output_format = "jpg"
+
+        self.output_dir = output_dir
+        self.output_format = output_format
+        self.quality = quality
+        self.num_threads = max(int(num_threads), 1)
+        self.queue_size = queue_size if queue_size else self.num_threads * 2
+
+        self.__queue = None
+        self.__threads = []
+        self.__written = 0
+        self.__lock = threading.Lock()
+
+    @property
+    def extension(self) -> str:
+        return self.FORMATS[self.output_format][0]
+
+    def get_output_path(self, frame_number: int) -> str:
+        return os.path.join(self.output_dir, f"{frame_number:05d}{self.extension}")
+
+    def start(self):
+        self.__queue = queue.Queue(maxsize=self.queue_size)
+        self.__written = 0
+        self.__threads = [threading.Thread(target=self.__encode_frames, daemon=True) for _ in range(self.num_threads)]
+        for thread in self.__threads:
+            thread.start()
+
+    def write(self, frame_number: int, frame):
+        """
+        Queues a frame for encoding. Blocks while the queue is full.
+        """
+        if self.__queue is None:
+            self.start()
+        self.__queue.put((frame_number, frame))
+
+    def flush(self):
+        """
+        Waits until every queued frame is saved, but keeps the encoder threads running.
+        """
+        if self.__queue is not None:
+            self.__queue.join()
+
+    def close(self) -> int:
+        """
+        Waits until every queued frame is saved and stops the encoder threads.
+        Returns the number of frames written.
+        """
+        if self.__queue is None:
+            return 0
+
+        for _ in self.__threads:
+            self.__queue.put(None)
+        for thread in self.__threads:
+            thread.join()
+
+        self.__queue = None
+        self.__threads = []
+        return self.__written
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __encode_frames(self):
+        extension, quality_flag = self.FORMATS[self.output_format]
+        if self.output_format == "png":
+            # PNG is lossless, map the quality onto its compression level (0 = fastest, 9 = smallest)
+            params = [quality_flag, max(0, min(9, 9 - int(self.quality) // 11))]
+        else:
+            params = [quality_flag, int(self.quality)]
+
+        while True:
+            item = self.__queue.get()
+            if item is None:
+                self.__queue.task_done()
+                break
+
+            frame_number, frame = item
+            output_filename = self.get_output_path(frame_number)
+            try:
+                # Written to a temporary file first, so a frame file, which exists, is always complete
+                is_encoded, buffer = cv2.imencode(extension, frame, params)
+                if is_encoded:
+                    buffer.tofile(f"{output_filename}.tmp")
+                    os.replace(f"{output_filename}.tmp", output_filename)
+                    with self.__lock:
+                        self.__written += 1
+                else:
+                    print(f"Error: Could not write frame {output_filename}")
+            except Exception as e:
+                print(f"Error writing frame {output_filename}: {e}")
+            finally:
+                self.__queue.task_done()
@@ -4,6 +4,7 @@ from typing import Optional
 import os
 import re
 from damage_info import DamageInfo
+from frame_store import FrameStore
 
 
 @dataclass
@@ -11,13 +12,22 @@ class ImageInfo:
     """
     Dataclass to store information about a frame, including the original image,
     its overlays, and associated data for saving as JSON.
+    The image is only loaded when it is accessed, and can be released again with unload().
     """
     image_path: str
     image_index: int = field(init=False, default=None)
-    image: Optional[Image.Image] = field(init=False, default=None)
-    drawn_image: Optional[Image.Image] = field(init=False, default=None)
     is_marked: bool = field(init=False, default=False)
     data_coordinates: list[DamageInfo] = field(default_factory=list)
+    frame_store: Optional[FrameStore] = field(default=None, repr=False)
+    _image: Optional[Image.Image] = field(init=False, default=None, repr=False)
+    _drawn_image: Optional[Image.Image] = field(init=False, default=None, repr=False)
+    _img_size: Optional[tuple] = field(init=False, default=None, repr=False)
+    _is_dirty: bool = field(init=False, default=True, repr=False)
+
+    def __setattr__(self, name, value):
+        if name in ("is_marked", "data_coordinates"):
+            super().__setattr__("_is_dirty", True)
+        super().__setattr__(name, value)
     
 
     @property
@@ -29,28 +39,106 @@ class ImageInfo:
         image_name = self.image_name
         return int(image_name.split(".")[0])
 
+    @property
+    def image(self) -> Image.Image:
+        if self._image is None:
+            self.load_image()
+        return self._image
+
+    @image.setter
+    def image(self, image: Image.Image):
+        self._image = image
+        self._drawn_image = None
+        if image is not None:
+            self._img_size = image.size
+
+    @property
+    def drawn_image(self) -> Image.Image:
+        if self._drawn_image is None:
+            self.reset_drawn_image()
+        return self._drawn_image
+
+    @drawn_image.setter
+    def drawn_image(self, drawn_image: Image.Image):
+        self._drawn_image = drawn_image
+
+    @property
+    def is_dirty(self) -> bool:
+        """True if the frame or one of its DamageInfos changed since the last mark_clean()."""
+        return self._is_dirty or any(damage_info.is_dirty for damage_info in self.data_coordinates)
+
+    def mark_dirty(self):
+        self._is_dirty = True
+
+    def mark_clean(self):
+        self._is_dirty = False
+        for damage_info in self.data_coordinates:
+            damage_info.is_dirty = False
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._image is not None
+
     @property
     def img_size(self) -> tuple:
-        return self.image.size if self.image else (-1, -1)
+        """Size of the full image. Only the file header is read, if the image is not loaded."""
+        if self._img_size is None:
+            self._img_size = self.__read_img_size()
+        return self._img_size
 
     def load_image(self):
         try:
             if self.image_path:
-                temp_image = Image.open(self.image_path)
-                self.image = temp_image.copy()
-                self.drawn_image = temp_image.copy()
-                temp_image.close()
+                self.image = self.read_image()
             else:
                 raise ValueError("Image path must be set before loading an image.")
         except FileNotFoundError:
             raise FileNotFoundError(f"Image file not found: {self.image_path}")
 
+    def read_image(self, draft_size: tuple = None) -> Image.Image:
+        """
+        Returns the image without keeping it in this ImageInfo.
+        If a draft_size is given, JPEGs are decoded at the smallest scale that is still at least that large.
+        """
+        # Use the frame, if it is still decoded in the frame store. Else the file is read, so a thumbnail is decoded at a
+        # small scale and the full frame is not put back into the store. Only a frame, whose file is not written yet, is
+        # read through the store
+        if self.frame_store is not None:
+            stored_image = self.frame_store.get_image_by_path(self.image_path, load=not os.path.exists(self.image_path))
+            if stored_image is not None:
+                return stored_image
+
+        with Image.open(self.image_path) as temp_image:
+            if draft_size:
+                temp_image.draft("RGB", draft_size)
+            return temp_image.copy()
+
+    def unload(self):
+        """Releases the full image and its overlays, they are loaded again on the next access."""
+        self._image = None
+        self._drawn_image = None
+
     def reset_drawn_image(self):
         if self.image:
-            self.drawn_image = self.image.copy()
+            self._drawn_image = self.image.copy()
         else:
             raise ValueError("Original image is not loaded.")
 
+    def __read_img_size(self) -> tuple:
+        if self._image is not None:
+            return self._image.size
+        if self.frame_store is not None:
+            frame_number = FrameStore.frame_number_from_path(self.image_path)
+            # A frame, which is not decoded anymore, is not read for its size, the file header has it
+            frame = self.frame_store.get_frame(frame_number, load=False) if frame_number is not None else None
+            if frame is not None:
+                return (frame.shape[1], frame.shape[0])
+        try:
+            with Image.open(self.image_path) as image:
+                return image.size
+        except Exception:
+            return (-1, -1)
+
     def set_damage_info_attribute(self, observation: str, attribute: str, value) -> bool:
         """
         Sets a boolean attribute (e.g., 'start_intervall', 'end_intervall', 'is_shown', 'is_selected')
@@ -75,6 +163,7 @@ class ImageInfo:
                 return False
 
         self.data_coordinates.append(DamageInfo(observation))
+        self._is_dirty = True
         return True
 
     def remove_observation(self, observation: str) -> bool:
@@ -82,6 +171,7 @@ class ImageInfo:
         for damage_info in self.data_coordinates:
             if observation == damage_info.damage_name:
                 self.data_coordinates.remove(damage_info)
+                self._is_dirty = True
                 return True
 
         print("Error: Observation not added yet!")
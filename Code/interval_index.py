@@ -0,0 +1,106 @@
+from bisect import bisect_left, bisect_right
+
+
+class FrameIndex:
+    """
+    Frame numbers of the loaded frames, sorted like the grid. Answers frame number -> grid index and
+    moves intervals onto the loaded frames with binary searches.
+    """
+    def __init__(self, frame_nums: list):
+        self.frame_nums = [int(frame_num) for frame_num in frame_nums]
+
+    def __len__(self) -> int:
+        return len(self.frame_nums)
+
+    def get_index(self, frame_num: int):
+        """Grid index of the frame, or None if it is not loaded."""
+        index = bisect_left(self.frame_nums, int(frame_num))
+        if index < len(self.frame_nums) and self.frame_nums[index] == int(frame_num):
+            return index
+        return None
+
+    def get_index_range(self, start_frame_num: int, end_frame_num: int):
+        """First and last grid index of the loaded frames inside the intervall, or None if there are none."""
+        start_index = bisect_left(self.frame_nums, int(start_frame_num))
+        end_index = bisect_right(self.frame_nums, int(end_frame_num)) - 1
+        if start_index > end_index:
+            return None
+        return start_index, end_index
+
+    def snap(self, start_frame_num: int, end_frame_num: int):
+        """
+        Grid indexes of the frames the intervall starts and ends on, when frames between them were skipped:
+        the last loaded frame at or before its start and end, or the first loaded frame if it starts before it.
+        None if the intervall ends before the first or starts after the last loaded frame.
+        """
+        if len(self.frame_nums) == 0 or int(end_frame_num) < self.frame_nums[0] or int(start_frame_num) > self.frame_nums[-1]:
+            return None
+        start_index = max(bisect_right(self.frame_nums, int(start_frame_num)) - 1, 0)
+        end_index = bisect_right(self.frame_nums, int(end_frame_num)) - 1
+        return start_index, end_index
+
+
+class IntervalIndex:
+    """
+    The intervals of one observation as (start, end) frame numbers, sorted by their start. Together with the largest
+    end up to every position, containment and overlap are found with a binary search.
+    """
+    def __init__(self, intervals=()):
+        self.__intervals = sorted((int(start), int(end)) for start, end in intervals)
+        self.__update_max_ends()
+
+    def __len__(self) -> int:
+        return len(self.__intervals)
+
+    def __iter__(self):
+        return iter(self.__intervals)
+
+    def __contains__(self, intervall) -> bool:
+        index = bisect_left(self.__intervals, intervall)
+        return index < len(self.__intervals) and self.__intervals[index] == intervall
+
+    def __repr__(self) -> str:
+        return f"IntervalIndex({self.__intervals})"
+
+    def to_list(self) -> list:
+        """The intervals as they are saved in the JSON."""
+        return list(self.__intervals)
+
+    def add(self, start_frame_num: int, end_frame_num: int):
+        intervall = (int(start_frame_num), int(end_frame_num))
+        self.__intervals.insert(bisect_right(self.__intervals, intervall), intervall)
+        self.__update_max_ends()
+
+    def remove(self, start_frame_num: int, end_frame_num: int) -> bool:
+        intervall = (int(start_frame_num), int(end_frame_num))
+        if intervall not in self:
+            return False
+        self.__intervals.pop(bisect_left(self.__intervals, intervall))
+        self.__update_max_ends()
+        return True
+
+    def find(self, frame_num: int):
+        """Returns the intervall, which contains the frame and starts last, or None."""
+        index = bisect_right(self.__starts, frame_num) - 1
+        # Intervals before the last one, which could reach the frame, are only searched while one of them ends after it
+        while index >= 0 and self.__max_ends[index] >= frame_num:
+            if self.__intervals[index][1] >= frame_num:
+                return self.__intervals[index]
+            index -= 1
+        return None
+
+    def contains(self, frame_num: int) -> bool:
+        return self.find(frame_num) is not None
+
+    def overlaps(self, start_frame_num: int, end_frame_num: int) -> bool:
+        """True, if any intervall shares a frame with the given one."""
+        index = bisect_right(self.__starts, end_frame_num) - 1
+        return index >= 0 and self.__max_ends[index] >= start_frame_num
+
+    def __update_max_ends(self):
+        self.__starts = [start for start, _ in self.__intervals]
+        self.__max_ends = []
+        max_end = None
+        for _, end in self.__intervals:
+            max_end = end if max_end is None else max(max_end, end)
+            self.__max_ends.append(max_end)
@@ -0,0 +1,164 @@
+import queue
+import threading
+import traceback
+
+
+class JobCancelled(Exception):
+    """Raised inside a job, when it checks for cancellation and was cancelled."""
+
+
+class Job:
+    """
+    A function, which runs on a worker thread of the JobRunner.
+    The function gets the job as its first argument, to report its progress, check for cancellation and hand work to the Tk thread.
+    """
+    def __init__(self, name: str, text: str):
+        self.name = name
+        self.text = text
+        self.done = 0
+        self.total = 0
+        self.result = None
+        self.error = None
+        self.thread = None
+        self.is_superseded = False     # Cancelled by a newer job, which takes over its on_done
+        self.__cancel_event = threading.Event()
+        self.__finished_event = threading.Event()
+        self.__messages = None
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self.__cancel_event.is_set()
+
+    @property
+    def is_finished(self) -> bool:
+        return self.__finished_event.is_set()
+
+    def cancel(self):
+        self.__cancel_event.set()
+
+    def wait(self, timeout: float = None) -> bool:
+        return self.__finished_event.wait(timeout)
+
+    def check_cancelled(self):
+        """Raises JobCancelled if the job was cancelled. Call it between the steps of a job."""
+        if self.is_cancelled:
+            raise JobCancelled()
+
+    def set_progress(self, done: int, total: int, text: str = None) -> bool:
+        """
+        Sets the progress, which the status bar shows at its next update. Returns False, if the job was cancelled.
+        """
+        self.done = done
+        self.total = total
+        if text is not None:
+            self.text = text
+        return not self.is_cancelled
+
+    def post(self, callback, *args):
+        """Runs the callback with the args on the Tk thread, e.g. to show a result while the job keeps running."""
+        self.__messages.put((callback, args))
+
+    def _attach(self, messages: queue.Queue):
+        self.__messages = messages
+
+    def _finish(self):
+        self.__finished_event.set()
+
+
+class JobRunner:
+    """
+    This class runs long operations of the MainWindow on worker threads, so the window stays responsive.
+    Tk may only be used from its own thread, so the runner polls the jobs with root.after: it shows the progress of the
+    running job in the status bar, runs the callbacks the jobs posted and calls on_done or on_error once a job is finished.
+    Starting a job cancels the running jobs it supersedes, and the new job waits until they stopped.
+    """
+    POLL_INTERVAL = 100     # ms between the updates of the status bar
+    MAX_CALLBACKS_PER_POLL = 200
+
+    def __init__(self, root, status_callback=None):
+        self.root = root
+        self.status_callback = status_callback      # Gets the running job or None, when no job is running anymore
+        self.__jobs = []
+        self.__messages = queue.Queue()
+        self.__poll_job = None
+
+    def is_running(self, name: str = None) -> bool:
+        return any(not job.is_finished and (name is None or job.name == name) for job in self.__jobs)
+
+    def submit(self, name: str, function, *args, text: str = None, on_done=None, on_error=None, supersedes: list = None) -> Job:
+        """
+        Runs function(job, *args) on a new worker thread.
+        Running jobs whose name is in supersedes, by default only the ones with the same name, are cancelled first.
+        on_done gets the result and on_error the exception of the function, both on the Tk thread.
+        A job that returns after it was cancelled still gets on_done, unless a newer job superseded it.
+        """
+        superseded_jobs = []
+        for job in self.__jobs:
+            if not job.is_finished and job.name in (supersedes if supersedes is not None else [name]):
+                job.is_superseded = True
+                job.cancel()
+                superseded_jobs.append(job)
+
+        job = Job(name, text or name)
+        job._attach(self.__messages)
+        job.thread = threading.Thread(target=self.__run, args=(job, superseded_jobs, function, args, on_done, on_error), daemon=True)
+        self.__jobs.append(job)
+        job.thread.start()
+
+        if self.__poll_job is None:
+            self.__poll_job = self.root.after(self.POLL_INTERVAL, self.__poll)
+        return job
+
+    def cancel(self, name: str = None):
+        """Cancels all running jobs, or the ones with the given name."""
+        for job in self.__jobs:
+            if name is None or job.name == name:
+                job.cancel()
+
+    def shutdown(self, timeout: float = 10):
+        """Cancels all jobs and waits for them, e.g. before the window is closed."""
+        self.cancel()
+        for job in self.__jobs:
+            job.wait(timeout)
+        if self.__poll_job is not None:
+            self.root.after_cancel(self.__poll_job)
+            self.__poll_job = None
+
+    def __run(self, job: Job, superseded_jobs: list, function, args: tuple, on_done, on_error):
+        try:
+            for superseded_job in superseded_jobs:
+                superseded_job.wait()
+            job.check_cancelled()
+            job.result = function(job, *args)
+            if on_done is not None and not job.is_superseded:
+                job.post(on_done, job.result)
+        except JobCancelled:
+            print(f"Cancelled: {job.text}")
+        except Exception as e:
+            job.error = e
+            traceback.print_exc()
+            if on_error is not None:
+                job.post(on_error, e)
+        finally:
+            job._finish()
+
+    def __poll(self):
+        # Callbacks are run in order, only a limited number per poll, so the window keeps handling its events
+        for _ in range(self.MAX_CALLBACKS_PER_POLL):
+            try:
+                callback, args = self.__messages.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback(*args)
+            except Exception:
+                traceback.print_exc()
+
+        self.__jobs = [job for job in self.__jobs if not job.is_finished]
+        if self.status_callback is not None:
+            self.status_callback(self.__jobs[-1] if self.__jobs else None)
+
+        if self.__jobs or not self.__messages.empty():
+            self.__poll_job = self.root.after(self.POLL_INTERVAL, self.__poll)
+        else:
+            self.__poll_job = None
@@ -1,76 +1,149 @@
 import json
 import os
+import threading
+import time
+from annotation_session import AnnotationSession
 from image_info import ImageInfo
 
 
 class JsonAnnotationManager:
-    def __init__(self):
+    """
+    This class keeps the session JSON in memory. Every change is applied in memory and appended to a journal file
+    next to the JSON, so saving only writes what changed. A background thread writes the whole JSON, once no change
+    came in for snapshot_delay seconds, to a temporary file and replaces the old one at once, then empties the journal.
+    If the tool crashes, load() replays the journal on top of the last written JSON.
+    """
+    def __init__(self, snapshot_delay: float = 2.0):
+        self.snapshot_delay = snapshot_delay
         self.__json_data = dict()
         self.__json_filepath = ""
+        self.__journal = None
+        self.__lock = threading.RLock()
+        self.__write_lock = threading.Lock()  # One snapshot is written at a time, held from the dump until the journal is trimmed
+        self.__changed = threading.Condition(self.__lock)
+        self.__is_changed = False       # Changes, which are only in the journal and not in the JSON file yet
+        self.__last_change_time = 0.0
+        self.__session = None           # AnnotationSession of the JSON data, created again after changes
+        self.__is_closed = False
+        self.__snapshot_thread = None
 
     def load(self, json_filepath: str) -> bool:
+        if self.__json_filepath:
+            self.close()
+
         self.__json_filepath = json_filepath
+        self.__is_closed = False
         if not os.path.exists(json_filepath):
             print("json does not exist")
-            self.save()
+            self.__json_data = dict()
+            if not self.__write_snapshot(force=True):
+                return False
 
         try:
-            with open(json_filepath, "r") as file:
-                self.__json_data = json.load(file)
-                print("JSON loaded Successfully")
-                return True
+            self.__json_data = read_json(json_filepath)
+            self.__session = None
+            print("JSON loaded Successfully")
         except Exception as error_message:
             print(f"Error opening JSON file \"{json_filepath}\": {error_message}")
             return False
-        
+
+        replayed_count = _replay_journal(get_journal_path(json_filepath), self.__json_data)
+        if replayed_count > 0:
+            print(f"Recovered {replayed_count} unsaved changes from the journal")
+            self.__is_changed = True
+            if self.__write_snapshot():
+                os.remove(get_journal_path(json_filepath))
+
+        self.__journal = open(get_journal_path(json_filepath), "a")
+        self.__snapshot_thread = threading.Thread(target=self.__run_snapshots, daemon=True)
+        self.__snapshot_thread.start()
+        return True
+
     def save(self) -> bool:
+        """Writes the journal to the disk, the JSON itself is written in the background."""
         try:
-            with open(self.__json_filepath, "w") as outfile:
-                json.dump(self.__json_data, outfile, indent=4)
-                return True
+            with self.__lock:
+                if self.__journal is None:
+                    return self.__write_snapshot(force=True)
+                self.__journal.flush()
+                os.fsync(self.__journal.fileno())
+                self.__changed.notify()
+            return True
         except Exception as e:
             print(f"File could not be saved! Error: {e}")
             return False
-        
+
+    def flush(self) -> bool:
+        """Writes the JSON at once, e.g. before another program reads it."""
+        return self.__write_snapshot()
+
+    def close(self) -> bool:
+        """Writes the JSON, stops the background thread and removes the journal."""
+        if not self.__json_filepath:
+            return True
+        with self.__lock:
+            self.__is_closed = True
+            self.__changed.notify()
+        if self.__snapshot_thread is not None and self.__snapshot_thread is not threading.current_thread():
+            self.__snapshot_thread.join()
+        self.__snapshot_thread = None
+
+        is_saved = self.__write_snapshot()
+        with self.__lock:
+            if self.__journal is not None:
+                self.__journal.close()
+                self.__journal = None
+                if is_saved:
+                    os.remove(get_journal_path(self.__json_filepath))
+        return is_saved
+
     def get_json(self):
         return self.__json_data.copy()
 
+    def get_session(self) -> AnnotationSession:
+        """Returns the typed session of the JSON data. It is only created again, when the data changed since the last call."""
+        with self.__lock:
+            if self.__session is None:
+                self.__session = AnnotationSession.from_json(self.__json_data)
+            return self.__session
+
     def set_info(self, damage_info: dict) -> bool:
         if not self.__is_loaded:
             print("Cannot add damage info, because no JSON file is openend")
             return False
-        
+
         if damage_info == {}:
             return
-        
+
         observation_name_and_time = f"{damage_info['Label']}, at {damage_info['Videozeitpunkt (h:min:sec)']}"
-        
+
         # Create a list of relevant keys from config.yaml
         info_already_existing = "Info" in self.__json_data
         if info_already_existing:
-            observation_already_documented = observation_name_and_time in self.__json_data["Info"]["Documented Observations"]
+            documented_observations = self.__json_data["Info"]["Documented Observations"]
+            observation_already_documented = observation_name_and_time in documented_observations
             if not observation_already_documented:
-                self.__json_data["Info"]["Documented Observations"].append(observation_name_and_time)
+                self.__set(["Info", "Documented Observations"], documented_observations + [observation_name_and_time])
             self.save()
             return True
-        
+
         # Initialize the "Info" dictionary
-        self.__json_data["Info"] = {}
+        info = {}
         for key in damage_info.keys():
             if not damage_info[key]:
-                 self.__json_data["Info"][key] = 0
+                 info[key] = 0
             else:
-                self.__json_data["Info"][key] = damage_info[key]
-        self.__json_data["Info"]["Documented Observations"] = [observation_name_and_time]
-        # self.save()
+                info[key] = damage_info[key]
+        info["Documented Observations"] = [observation_name_and_time]
+        self.__set(["Info"], info)
 
     def get_marked_frame_list(self) -> list:
         return self.__json_data["Info"].get("Marked Frames", [])
-    
+
     def get_intervalls(self, observation=None):
         """
         Gets the Intervalls from the Info part of the json.
-        observation (str): if an observation is given a list containing the start- and endpoints of the intervalls will be returned, 
+        observation (str): if an observation is given a list containing the start- and endpoints of the intervalls will be returned,
         else an dict with all observations as keys, and their respective lists as values will be returned.
         """
         if observation == None:
@@ -84,33 +157,181 @@ class JsonAnnotationManager:
             return
 
         if "Info" not in self.__json_data:
-            self.__json_data["Info"] = {}
+            self.__set(["Info"], {})
 
-        self.__json_data["Info"][key] = value
+        self.__set(["Info", key], value)
         self.save()
-        
+
     def add_to_frame(self, image_info: ImageInfo):
         """
             This function adds an element to the dictionairy which will be saved as a json.
             Depending on which parameters are given the json structure will be created.
+            Only observations, which changed since they were added the last time, are written to the journal.
         """
         if image_info is None:
             print("Error: image_info not set!")
 
-        # If that key doesnt exist yet, create it
-        frame_num = image_info.frame_num
-        if frame_num not in self.__json_data.keys():
-            self.__json_data[frame_num] = {
+        # If that key doesnt exist yet, create it. The keys are strings, as they are in the loaded JSON
+        frame_key = str(image_info.frame_num)
+        if frame_key not in self.__json_data.keys():
+            self.__set([frame_key], {
                 "File Name": image_info.image_name,
                 "Observations": {}
-            }
-        
+            })
+
+        observations = self.__json_data[frame_key]["Observations"]
         for damage_info in image_info.data_coordinates:
-            self.__json_data[frame_num]["Observations"][damage_info.damage_name] = damage_info.get_dict()
+            # DamageInfos mark themselves as unsaved whenever a field changes
+            if not getattr(damage_info, "is_unsaved", True) and damage_info.damage_name in observations:
+                continue
+            self.__set([frame_key, "Observations", damage_info.damage_name], damage_info.get_dict())
+            if hasattr(damage_info, "is_unsaved"):
+                damage_info.is_unsaved = False
 
     def reset(self) -> None:
+        if self.__json_filepath:
+            self.close()
         self.__json_data = dict()
         self.__json_filepath = ""
+        self.__session = None
 
     def __is_loaded(self) -> bool:
-        return self.__json_data and self.__json_filepath
\ No newline at end of file
+        return self.__json_data and self.__json_filepath
+
+    def __set(self, path: list, value):
+        """Sets the value at the path of keys and appends the change to the journal, if the value is different."""
+        entry = json.dumps({"path": path, "value": value})
+        # The stored value is a copy as it is read from the journal, so later changes of the given lists do not change it
+        value = json.loads(entry)["value"]
+        with self.__lock:
+            parent = self.__json_data
+            for key in path[:-1]:
+                parent = parent.setdefault(key, {})
+            if parent.get(path[-1]) == value:
+                return
+            parent[path[-1]] = value
+            self.__session = None
+
+            if self.__journal is not None:
+                self.__journal.write(entry + "\n")
+            self.__is_changed = True
+            self.__last_change_time = time.monotonic()
+            self.__changed.notify()
+
+    def __run_snapshots(self):
+        while True:
+            with self.__lock:
+                if self.__is_closed:
+                    return
+                if not self.__is_changed:
+                    self.__changed.wait()
+                    continue
+                # Waits until no change came in for snapshot_delay seconds, so a series of changes is written once
+                remaining_delay = self.__last_change_time + self.snapshot_delay - time.monotonic()
+                if remaining_delay > 0:
+                    self.__changed.wait(remaining_delay)
+                    continue
+            self.__write_snapshot()
+
+    def __write_snapshot(self, force: bool = False) -> bool:
+        # flush() on the window thread and the background thread may write at the same time. Without the write lock an
+        # older snapshot could replace a newer one, and then trim changes from the journal, which the JSON does not contain
+        with self.__write_lock:
+            with self.__lock:
+                if not self.__is_changed and not force:
+                    return True
+                text = json.dumps(self.__json_data, indent=4)
+                journal_size = None
+                if self.__journal is not None:
+                    self.__journal.flush()
+                    journal_size = self.__journal.tell()
+                self.__is_changed = False
+
+            # Changes coming in meanwhile only need the lock of the data, so the window does not wait for the disk
+            try:
+                write_text_atomic(self.__json_filepath, text)
+            except Exception as e:
+                print(f"File could not be saved! Error: {e}")
+                with self.__lock:
+                    self.__is_changed = True
+                return False
+
+            if journal_size is not None:
+                with self.__lock:
+                    self.__remove_journal_start(journal_size)
+            return True
+
+    def __remove_journal_start(self, size: int):
+        # Changes up to size are in the written JSON, the ones that came in while it was written stay in the journal
+        if self.__journal is None:
+            return
+        journal_path = get_journal_path(self.__json_filepath)
+        self.__journal.flush()
+        if self.__journal.tell() == size:
+            self.__journal.seek(0)
+            self.__journal.truncate()
+            return
+
+        self.__journal.close()
+        with open(journal_path, "r") as file:
+            file.seek(size)
+            remaining_changes = file.read()
+        write_text_atomic(journal_path, remaining_changes)
+        self.__journal = open(journal_path, "a")
+
+
+def get_journal_path(json_filepath: str) -> str:
+    return f"{json_filepath}.journal"
+
+
+def read_json(json_filepath: str) -> dict:
+    with open(json_filepath, "r") as file:
+        return json.load(file)
+
+
+def recover_journal(json_filepath: str) -> int:
+    """
+    Replays the journal of a session, which was not closed, into its JSON and removes the journal.
+    For programs, which read the JSON file without a JsonAnnotationManager. Returns the number of recovered changes.
+    """
+    journal_path = get_journal_path(json_filepath)
+    if not os.path.exists(journal_path):
+        return 0
+    json_data = read_json(json_filepath) if os.path.exists(json_filepath) else {}
+    replayed_count = _replay_journal(journal_path, json_data)
+    if replayed_count > 0:
+        write_text_atomic(json_filepath, json.dumps(json_data, indent=4))
+    os.remove(journal_path)
+    return replayed_count
+
+
+def write_text_atomic(path: str, text: str):
+    """Writes to a temporary file and replaces the old file at once, so a crash never leaves a half written file."""
+    # Every process and thread writes its own temporary file
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, "w") as outfile:
+        outfile.write(text)
+        outfile.flush()
+        os.fsync(outfile.fileno())
+    os.replace(temp_path, path)
+
+
+def _replay_journal(journal_path: str, json_data: dict) -> int:
+    if not os.path.exists(journal_path):
+        return 0
+
+    replayed_count = 0
+    with open(journal_path, "r") as file:
+        for line in file:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # The last line is cut off, if the tool crashed while it was written
+                print(f"Journal \"{journal_path}\" ends with an incomplete change, which is ignored")
+                break
+            parent = json_data
+            for key in entry["path"][:-1]:
+                parent = parent.setdefault(key, {})
+            parent[entry["path"][-1]] = entry["value"]
+            replayed_count += 1
+    return replayed_count
@@ -1,14 +1,20 @@
 from main_window import MainWindow
 from table_and_index import TableAndIndex
 from frame_extraction import FrameExtraction
-from sam2_class import Sam2Class
+from frame_store import FrameStore
+from frame_similarity import create_similarity_backend
+from sam2_service import Sam2Service
+from segmentation_predictor import VideoPredictor
+from stub_predictor import StubVideoPredictor
 import yaml
 import os
 from tkinter import filedialog
 from deinterlace_video import DeinterlaceVideo
 from small_dataclasses import Setup
+from session_prefetcher import PreparedSession, SessionPrefetcher
+from thumbnail_cache import ThumbnailCache
+from image_info import ImageInfo
 import shutil
-import threading
 
 
 def load_config() -> dict:
@@ -26,57 +32,182 @@ def calculate_time_bounds(video_time: str, config: dict) -> tuple:
     end_time = timestamp + config["settings"].get("frame_extraction_puffer_after", 10)
     return start_time, end_time
 
-def try_deinterlacing_get_video_path(video_path, deinterlaced_video_dir):
-        print("Deinterlacing Video...")
-        output_path = os.path.join(deinterlaced_video_dir, os.path.basename(video_path))
+def create_frame_extraction(config: dict, video_path, frame_dir, video_hash=None) -> FrameExtraction:
+    """Create the FrameExtraction with the extraction and encoding settings from the config."""
+    settings = config["settings"]
+    similarity_backend = create_similarity_backend(settings.get("similarity_backend", "ssim"), settings.get("similarity_thumbnail_width", 320))
+
+    # A calibrated backend threshold replaces the SSIM threshold, if it is set
+    similarity_threshold = settings.get("similarity_backend_threshold") or settings["image_similarity_threshold"]
+    if settings.get("similarity_backend", "ssim") != "ssim" and not settings.get("similarity_backend_threshold"):
+        print(f"Warning: similarity_backend {settings.get('similarity_backend')} uses the ssim threshold {similarity_threshold}, calibrate similarity_backend_threshold for it")
+
+    signature_index_dir = None
+    if settings.get("frame_signature_index") and config.get("default_paths", {}).get("output_path"):
+        signature_index_dir = os.path.join(config["default_paths"]["output_path"], "frame signatures")
+
+    # Keep the frames decoded in memory for SAM2 and the grid, the files are written in the background
+    frame_store = None
+    if settings.get("in_memory_frames", True):
+        frame_store = FrameStore(frame_dir, settings.get("frame_output_format", "jpg"), settings.get("frame_output_quality", 95), settings.get("frame_encoder_threads", 4), settings.get("frame_store_size_mb", 2048))
+
+    return FrameExtraction(
+        video_path=video_path,
+        output_dir=frame_dir,
+        similarity_threshold=similarity_threshold,
+        sequential_decoding=settings.get("sequential_frame_decoding", True),
+        output_format=settings.get("frame_output_format", "jpg"),
+        output_quality=settings.get("frame_output_quality", 95),
+        encoder_threads=settings.get("frame_encoder_threads", 4),
+        similarity_backend=similarity_backend,
+        signature_index_dir=signature_index_dir,
+        video_hash=video_hash,
+        frame_store=frame_store
+    )
+
+def create_sam_model(config: dict) -> VideoPredictor:
+    """Create the SAM2 model, in this process or as client of the SAM2 service, if it is enabled in the config."""
+    settings = config["settings"]
+    if settings.get("sam2_service", False):
+        return Sam2Service(config, address=settings.get("sam2_service_address"))
+    return create_local_sam_model(config)
+
+def create_local_sam_model(config: dict) -> VideoPredictor:
+    """Create the Sam2Class with the model paths and the memory settings from the config."""
+    settings = config["settings"]
+    if settings.get("predictor_backend", "sam2") == "stub":
+        return create_stub_model(config)
+
+    # Imported here, so the stub backend runs without torch and the sam2 package
+    from sam2_class import Sam2Class
+    return Sam2Class(
+        checkpoint_filepath=config["sam_model_paths"]["sam2_checkpoint"],
+        model_filepath=config["sam_model_paths"]["model_cfg"],
+        offload_video_to_cpu=settings.get("offload_video_to_cpu", False),
+        offload_state_to_cpu=settings.get("offload_state_to_cpu", False),
+        prune_tracking_memory=settings.get("prune_tracking_memory", True),
+        embedding_cache=create_embedding_cache(config),
+        device=settings.get("device", "auto"),
+        onnx_encoder_filepath=settings.get("onnx_image_encoder"),
+        onnx_threads=settings.get("onnx_threads", 0)
+    )
+
+def create_stub_model(config: dict) -> StubVideoPredictor:
+    """Create the predictor without a model, which draws moving ellipses around the points, e.g. for benchmarks without a GPU."""
+    settings = config["settings"]
+    return StubVideoPredictor(
+        click_latency=settings.get("stub_click_latency", 0.0),
+        frame_latency=settings.get("stub_frame_latency", 0.0)
+    )
+
+def create_embedding_cache(config: dict):
+    """Create the disk cache of the SAM2 image features, if it is enabled in the config."""
+    settings = config["settings"]
+    if not settings.get("embedding_cache", False):
+        return None
+
+    from embedding_cache import EmbeddingCache
+
+    cache_dir = settings.get("embedding_cache_dir")
+    if not cache_dir:
+        cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "sam2 embeddings")
+    return EmbeddingCache(
+        cache_dir=cache_dir,
+        checkpoint_filepath=config["sam_model_paths"]["sam2_checkpoint"],
+        model_filepath=config["sam_model_paths"]["model_cfg"],
+        max_size_mb=settings.get("embedding_cache_size_mb", 20000),
+        # Features of the ONNX encoder differ slightly, especially quantized, so they are kept apart
+        variant=os.path.basename(settings.get("onnx_image_encoder") or "")
+    )
+
+def try_deinterlacing_get_video_path(video_path, deinterlaced_video_dir) -> str:
+    """Returns the path of the deinterlaced video, or the given path if it could not be deinterlaced."""
+    print("Deinterlacing Video...")
+    output_path = os.path.join(deinterlaced_video_dir, os.path.basename(video_path))
+    try:
         DeinterlaceVideo(video_path, output_path)
-        video_path = output_path
+    except Exception as e:
+        print(f"Error: Could not deinterlace {video_path}: {e}")
+        return video_path
+    return output_path if os.path.exists(output_path) else video_path
+
+def prepare_list_mode_session(config: dict, damage_table_row: dict, frame_dir: str, sam_model: VideoPredictor, deinterlaced_video_dir: str, get_canvas_size=None, is_cancelled=None) -> PreparedSession:
+    """
+    Prepares the session of a table row: deinterlaces the video with auto_deinterlacing and extracts the frames. If the
+    size of the grid is known, the thumbnails are created as well, and with prefetch_embeddings the SAM2 image features.
+    """
+    settings = config["settings"]
+    video_path = damage_table_row["Videopfad"]
+    if settings.get("auto_deinterlacing") == True:
+        video_path = try_deinterlacing_get_video_path(video_path, deinterlaced_video_dir)
+
+    os.makedirs(frame_dir, exist_ok=True)
+    frame_extraction = create_frame_extraction(config, video_path, frame_dir, damage_table_row.get("Videohash"))
+    start_time, end_time = calculate_time_bounds(damage_table_row["Videozeitpunkt (h:min:sec)"], config)
+    frame_extraction.extract_frames_by_damage_time(start_time, end_time, settings.get("extraction_frame_per_frames", 25), settings.get("auto_histogram"))
+    session = PreparedSession(damage_table_row, video_path, frame_dir, frame_extraction, frame_extraction.frame_store)
+
+    frame_store = session.frame_store
+    if frame_store is not None and len(frame_store) > 0:
+        frame_paths = frame_store.get_frame_paths()
+    else:
+        frame_paths = [os.path.join(frame_dir, file) for file in sorted(os.listdir(frame_dir)) if file.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.webp'))]
+
+    # The size is read once the frames are extracted, so the window of the current session is laid out by then
+    canvas_size = get_canvas_size() if get_canvas_size is not None else None
+    if canvas_size and frame_paths and not (is_cancelled is not None and is_cancelled()):
+        session.thumbnail_cache = create_thumbnails(settings, frame_paths, frame_store, canvas_size)
+
+    if settings.get("prefetch_embeddings", False) and hasattr(sam_model, "prefetch_embeddings") and not (is_cancelled is not None and is_cancelled()):
+        encoded_count = sam_model.prefetch_embeddings(frame_paths, frame_store, is_cancelled)
+        print(f"Computed the image features of {encoded_count} frames of {damage_table_row.get('Videoname')}")
+    return session
+
+def create_thumbnails(settings: dict, frame_paths: list, frame_store: FrameStore, canvas_size: tuple) -> ThumbnailCache:
+    """Creates the thumbnails of the first frames in the size the grid will show them, on a canvas of canvas_size."""
+    canvas_width, canvas_height = canvas_size
+    grid_size = MainWindow.get_default_grid_size(settings, len(frame_paths))
+    cell_size = MainWindow.get_cell_size(canvas_width, grid_size, ImageInfo(frame_paths[0], frame_store=frame_store).img_size)
+    thumbnail_cache = ThumbnailCache(MainWindow.get_thumbnail_count(settings.get("thumbnail_cache_screens", 3), canvas_height, grid_size, cell_size))
+    image_infos = [ImageInfo(frame_path, frame_store=frame_store) for frame_path in frame_paths[:thumbnail_cache.max_entries]]
+    for image_info in image_infos:
+        thumbnail_cache.get(image_info, cell_size)
+    return thumbnail_cache
 
 def list_mode(config, mode):
     table_and_index = TableAndIndex(output_path=config["default_paths"]["output_path"], table_path=config["default_paths"]["table_path"])
-    damage_table_row = table_and_index.get_damage_table_row()
-
-    sam_model = Sam2Class(checkpoint_filepath=config["sam_model_paths"]["sam2_checkpoint"], model_filepath=config["sam_model_paths"]["model_cfg"])
+    sam_model = create_sam_model(config)
 
     deinterlaced_video_dir = os.path.join(table_and_index.get_output_dir(), "deinterlaced videos")
     os.makedirs(deinterlaced_video_dir, exist_ok=True)
 
-    video_path = damage_table_row["Videopfad"]
-    deinterlacing_thread = None
-
-    if config["settings"].get("auto_deinterlacing") == True:
-        try_deinterlacing_get_video_path(video_path, deinterlaced_video_dir)
-
-    while damage_table_row:
-        working_dir = os.path.join(table_and_index.get_output_dir(), "results", damage_table_row["Videoname"])
-        frame_dir = os.path.join(working_dir, "source images")
-        os.makedirs(frame_dir, exist_ok=True)
+    # The next rows are prepared while the current one is labeled, their thumbnails fit the grid of the current window
+    main_window = None
+    def prepare_session(damage_table_row, frame_dir, is_cancelled):
+        get_canvas_size = (lambda: main_window.canvas_size) if main_window is not None else None
+        return prepare_list_mode_session(config, damage_table_row, frame_dir, sam_model, deinterlaced_video_dir, get_canvas_size, is_cancelled)
 
-        frame_extraction = FrameExtraction(video_path=video_path, output_dir=frame_dir, similarity_threshold=config["settings"]["image_similarity_threshold"])
-        start_time, end_time = calculate_time_bounds(damage_table_row["Videozeitpunkt (h:min:sec)"], config)
-        frame_extraction.extract_frames_by_damage_time(start_time, end_time, config["settings"].get("extraction_frame_per_frames", 25), config["settings"].get("auto_histogram"))
-        
-        setup = Setup(config, frame_dir, sam_model, frame_extraction, damage_table_row)
+    prefetcher = SessionPrefetcher(table_and_index, prepare_session, config["settings"].get("list_mode_look_ahead", 1))
+    try:
+        session = prefetcher.get_next()
+        while session:
+            setup = Setup(config, session.frame_dir, sam_model, session.frame_extraction, session.damage_table_row, session.frame_store, session.thumbnail_cache)
 
-        damage_table_row = table_and_index.get_damage_table_row()
-        video_path = damage_table_row["Videopfad"]
+            main_window = MainWindow()
+            main_window.setup(setup, mode)
+            prefetcher.prefetch()
 
-        main_window = MainWindow()
-        main_window.setup(setup, mode)
+            main_window.open()
 
-        if config["settings"].get("auto_deinterlacing") == True:
-            deinterlacing_thread = threading.Thread(target=try_deinterlacing_get_video_path, args=(video_path, deinterlaced_video_dir))
-            deinterlacing_thread.start()
+            main_window.save_to_json(close=True)
+            if main_window.run_next_loop == False:
+                break
 
-        main_window.open()
+            session = prefetcher.get_next()
+    finally:
+        prefetcher.shutdown()
+        print(f"{prefetcher.prefetched_count} sessions were prepared in the background")
 
-        main_window.save_to_json()
-        if main_window.run_next_loop == False:
-            break
-        
-        if deinterlacing_thread:
-            deinterlacing_thread.join()
-        
 def test_mode(config, mode):
     """
     Test mode function to simulate the behavior of the application using predefined test configurations.
@@ -93,17 +224,14 @@ def test_mode(config, mode):
         os.makedirs(frame_dir, exist_ok=True)
 
         # Initialize the FrameExtraction and extract framess
-        frame_extraction = FrameExtraction(video_path=video_path, output_dir=frame_dir, similarity_threshold=config["settings"]["image_similarity_threshold"])
+        frame_extraction = create_frame_extraction(config, video_path, frame_dir, test_mode_table.get("Videohash"))
 
         # Set up the SAM model
-        sam_model = Sam2Class(
-            checkpoint_filepath=config["sam_model_paths"]["sam2_checkpoint"],
-            model_filepath=config["sam_model_paths"]["model_cfg"]
-        )
+        sam_model = create_sam_model(config)
         
         # Prepare the Setup dataclass for the main window
         damage_table_row = test_mode_table
-        setup = Setup(config=config, frame_dir=frame_dir, sam_model=sam_model, frame_extraction=frame_extraction, damage_table_row=damage_table_row)
+        setup = Setup(config=config, frame_dir=frame_dir, sam_model=sam_model, frame_extraction=frame_extraction, damage_table_row=damage_table_row, frame_store=frame_extraction.frame_store)
         
         # Initialize and open the main window
         main_window = MainWindow()
@@ -112,7 +240,7 @@ def test_mode(config, mode):
         
         # Save to JSON after running
         print("Test mode completed. Saving data to JSON.")
-        main_window.save_to_json()
+        main_window.save_to_json(close=True)
 
     except Exception as e:
         print(f"Error in test_mode: {e}")
@@ -129,10 +257,7 @@ def eval_mode(config, mode):
     )
 
     # Initialize SAM model
-    sam_model = Sam2Class(
-        checkpoint_filepath=config["sam_model_paths"]["sam2_checkpoint"],
-        model_filepath=config["sam_model_paths"]["model_cfg"]
-    )
+    sam_model = create_sam_model(config)
 
     if not results_dir:
         print("No folder selected. Exiting folder mode.")
@@ -151,10 +276,10 @@ def eval_mode(config, mode):
             print(f"Skipping {folder_path}: Required files (frames or JSON) not found.")
             continue
         
-        frame_extraction = FrameExtraction(video_path=None, output_dir=frame_dir, similarity_threshold=config["settings"]["image_similarity_threshold"])
+        frame_extraction = create_frame_extraction(config, None, frame_dir)
 
         # Prepare the Setup dataclass for the main window
-        setup = Setup(config=config, frame_dir=frame_dir, sam_model=sam_model, frame_extraction=frame_extraction, damage_table_row={})
+        setup = Setup(config=config, frame_dir=frame_dir, sam_model=sam_model, frame_extraction=frame_extraction, damage_table_row={}, frame_store=frame_extraction.frame_store)
 
         # Initialize and open the main window
         main_window = MainWindow()
@@ -163,7 +288,7 @@ def eval_mode(config, mode):
 
         # Save JSON after running
         print(f"Completed processing for {folder_path}. Saving data to JSON.")
-        main_window.save_to_json()
+        main_window.save_to_json(close=True)
 
         # If the user exits or cancels, break the loop
         if not main_window.run_next_loop:
@@ -178,10 +303,7 @@ def single_folder_mode(config, mode):
     """
 
     # Initialize SAM model
-    sam_model = Sam2Class(
-        checkpoint_filepath=config["sam_model_paths"]["sam2_checkpoint"],
-        model_filepath=config["sam_model_paths"]["model_cfg"]
-    )
+    sam_model = create_sam_model(config)
 
     while True:
         folder_path = filedialog.askdirectory(
@@ -205,10 +327,10 @@ def single_folder_mode(config, mode):
             print(f"Skipping {folder_path}: Required files (frames or JSON) not found.")
             continue
         
-        frame_extraction = FrameExtraction(video_path=None, output_dir=frame_dir, similarity_threshold=config["settings"]["image_similarity_threshold"])
+        frame_extraction = create_frame_extraction(config, None, frame_dir)
 
         # Prepare the Setup dataclass for the main window
-        setup = Setup(config=config, frame_dir=frame_dir, sam_model=sam_model, frame_extraction=frame_extraction, damage_table_row={})
+        setup = Setup(config=config, frame_dir=frame_dir, sam_model=sam_model, frame_extraction=frame_extraction, damage_table_row={}, frame_store=frame_extraction.frame_store)
 
         # Initialize and open the main window
         main_window = MainWindow()
@@ -217,7 +339,7 @@ def single_folder_mode(config, mode):
 
         # Save JSON after running
         print(f"Completed processing for {folder_path}. Saving data to JSON.")
-        main_window.save_to_json()
+        main_window.save_to_json(close=True)
 
         # If the user exits or cancels, break the loop
         if not main_window.run_next_loop:
@@ -227,7 +349,7 @@ def single_folder_mode(config, mode):
 
 def close_window(app):
     """Close the Tkinter window and save the JSON data."""
-    app.save_to_json()
+    app.save_to_json(close=True)
     app.root.destroy()
     app.remove_image_view()
     print("Window closed and data saved to JSON")
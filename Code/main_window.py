@@ -4,22 +4,28 @@ from PIL import Image, ImageTk
 import os
 from image_info import ImageInfo
 from draw_image_info import DrawImageInfo
+from thumbnail_cache import ThumbnailCache
 from damage_info import DamageInfo
 from annotation_window import AnnotationWindow
-from math import sqrt
+from math import sqrt, ceil
+from interval_index import FrameIndex, IntervalIndex
 from json_annotation_manager import JsonAnnotationManager
 from frame_extraction import FrameExtraction
 from video_player_window import VideoPlayerWindow
-from sam2_class import Sam2Class
-import cv2
-import numpy as np
+from segmentation_predictor import VideoPredictor
 from deinterlace_video import DeinterlaceVideo
-from small_dataclasses import Setup, ButtonState
+from small_dataclasses import Setup, ButtonState, GridCell
+from job_runner import JobRunner
+from mask_conversion import MaskConverter
 
 class MainWindow:
     """
     This Window shows an Grid of Images.
+    Only the rows, which are visible on the canvas, are drawn.
     """
+    GRID_SPACING = 9            # Pixels between the frames of the grid
+    FAST_REDRAW_DELAY = 30      # ms, redraws while resizing are combined within this time
+    SETTLE_REDRAW_DELAY = 300   # ms after the last resize, until the grid is drawn in full quality
     def __init__(self):
         super().__init__()
 
@@ -31,6 +37,14 @@ class MainWindow:
 
         self.image_infos = []
         self.frame_dir = None
+        self.frame_store = None
+        self.thumbnail_cache = ThumbnailCache()
+        self.grid_cells = {}        # image index: GridCell of the frames currently drawn on the canvas
+        self.photo_pool = []        # Unused PhotoImages of the current cell size
+        self.cell_size = None
+        self.canvas_size = None     # (width, height) of the canvas at the last layout, read by the prefetching of the next session
+        self.fast_redraw_job = None
+        self.settle_redraw_job = None
         self.video_path = None
         self.frame_extractor = None
         self.video_start_second = None
@@ -39,6 +53,9 @@ class MainWindow:
 
         self.root.bind("<Escape>", self.__reset_left_click_modes)
 
+        # Extraction, reloading the frames and tracking run on worker threads, so the window stays responsive
+        self.job_runner = JobRunner(self.root, self.__show_job_status)
+
         self.sam_model = None
         self.annotation_window = None
 
@@ -53,12 +70,21 @@ class MainWindow:
         self.selected_observation = None
         self.last_clicked_intervall = None
 
-        self.split_intervals = {}
+        self.split_intervals = {}       # observation: IntervalIndex of its intervals
+        self.frame_index = None         # FrameIndex of the frame numbers of image_infos, see __get_frame_index
+        self.frame_index_source = None  # The image_infos list the frame index was created from
         self.marked_frames = []
         self.split_start = None
 
         self.left_click_mode = None
         self.is_deinterlaced = False
+        self.incremental_frame_extraction = False
+        self.track_all_observations = False
+        self.thumbnail_cache_screens = 3
+        self.tracking_fingerprints = {}     # (observation, start frame, end frame): prompt fingerprint of the last tracking of that intervall
+        self.mask_storage = "rle"
+        self.json_snapshot_delay = 2.0     # Seconds without changes, before the json is written in the background
+        self.mask_converter = MaskConverter(output=self.mask_storage)
 
         self.left_click_mode_colors = {
             "Splitting" : "blue",
@@ -75,7 +101,10 @@ class MainWindow:
     def setup(self, setup: Setup, mode: str):
         self.setup_var = setup
         self.mode_var = mode
+        self.frame_store = setup.frame_store
         self.__set_frames(setup.frame_dir)
+        if setup.thumbnail_cache is not None:
+            self.thumbnail_cache = setup.thumbnail_cache
         self.__set_settings(setup.config["settings"])
         self.__set_segmenter(setup.sam_model)
         self.__set_predefined_object_classes(setup.config["object_add_buttons"])
@@ -100,17 +129,21 @@ class MainWindow:
         self.root.protocol("WM_DELETE_WINDOW", lambda: self.__close_window())
         self.root.mainloop()
 
-    def save_to_json(self):
+    def save_to_json(self, close: bool = False):
         """
-        Saves the mask and point data saved in every frame to the json
+        Saves the mask and point data saved in every frame to the json.
+        Only the changes are written to the journal, the json itself is written in the background.
+        close: True when the session ends, then the json is written at once and the journal removed
         """
         for image_info in self.image_infos:
             self.json_annotation_manager.add_to_frame(image_info)
         
         self.json_annotation_manager.add_to_info("Marked Frames", self.marked_frames)
-        self.json_annotation_manager.add_to_info("Instance Intervals", self.split_intervals)
+        self.json_annotation_manager.add_to_info("Instance Intervals", {observation: intervals.to_list() for observation, intervals in self.split_intervals.items()})
 
         self.json_annotation_manager.save()
+        if close:
+            self.json_annotation_manager.close()
 
     def __set_frames(self, frame_dir:str):
         """
@@ -119,16 +152,19 @@ class MainWindow:
         try:
             self.image_infos = []
             self.frame_dir = frame_dir
+            # The frame files may have been extracted again under the same names
+            self.thumbnail_cache.clear()
             if not frame_dir:
                 print("Error: can not init frames, frame dir empty")
-            
-            for file in sorted(os.listdir(frame_dir)):
-                if file.lower().endswith(('.png', '.jpg', '.jpeg', '.gif')):
-                    file_path = os.path.join(frame_dir, file)
-                    image_info = ImageInfo(file_path)
-                    image_info.image_index = len(self.image_infos)
-                    image_info.load_image()
-                    self.image_infos.append(image_info)
+
+            # Frames which were not extracted in this session are decoded once, here
+            if self.frame_store is not None and len(self.frame_store) == 0:
+                self.frame_store.load_directory()
+
+            for file_path in self.__list_frame_files():
+                image_info = ImageInfo(file_path, frame_store=self.frame_store)
+                image_info.image_index = len(self.image_infos)
+                self.image_infos.append(image_info)
         
         except Exception as e:
             print(f"failed setting frames! \nError: {e}")
@@ -152,12 +188,17 @@ class MainWindow:
             else:  
                 self.root.geometry(f"{window_width}x{window_height}")
 
-            grid_size = settings.get("default_grid_size", 0)
-            if grid_size == 0:
-                self.grid_size = int(sqrt(len(self.image_infos))) + 1
-            else:
-                self.grid_size = grid_size
+            self.grid_size = self.get_default_grid_size(settings, len(self.image_infos))
             self.max_grid_size = int(sqrt(len(self.image_infos))) + 3
+
+            self.incremental_frame_extraction = settings.get("incremental_frame_extraction", True)
+            self.track_all_observations = settings.get("track_all_observations", False)
+            # The thumbnail cache holds this many screens full of grid cells, it is sized whenever the grid is laid out
+            self.thumbnail_cache_screens = settings.get("thumbnail_cache_screens", 3)
+            self.json_snapshot_delay = settings.get("json_snapshot_delay", 2.0)
+            # rle stores the masks run length encoded, which is smaller and exact, polygon stores only their contours
+            self.mask_storage = settings.get("mask_storage", "rle")
+            self.mask_converter = MaskConverter(num_workers=settings.get("mask_conversion_workers", 0), keep_holes=settings.get("keep_mask_holes", False), output=self.mask_storage)
         
         except Exception as e:
             print(f"failed setting settings! \nError: {e}")
@@ -170,17 +211,17 @@ class MainWindow:
             json_dir = os.path.dirname(self.frame_dir)
             json_path = os.path.join(json_dir, f"{os.path.basename(json_dir)}.json")
 
-            self.json_annotation_manager = JsonAnnotationManager()
+            self.json_annotation_manager = JsonAnnotationManager(snapshot_delay=self.json_snapshot_delay)
             self.json_annotation_manager.load(json_path)
             self.json_annotation_manager.set_info(info_dict)
             self.__load_data_from_json()
         except Exception as e:
             print(f"failed setting json! \nError: {e}")
 
-    def __set_segmenter(self, sam_model: Sam2Class):
+    def __set_segmenter(self, sam_model: VideoPredictor):
         try:
             self.sam_model = sam_model
-            self.sam_model.load(self.frame_dir)
+            self.sam_model.load(self.frame_dir, self.frame_store)
         except Exception as e:
             print(f"failed setting segmenter! \nError: {e}")
 
@@ -224,229 +265,191 @@ class MainWindow:
         self.quick_extraction_buttons = quick_extraction_buttons
 
     def __switch_deinterlaced_video(self):
-        # First deinterlace video
-        self.status_bar.config(text="Status: Switching to/from deinterlaced mode", bg="yellow", fg="black")
-        self.root.update()
-
         if self.is_deinterlaced == False:
             output_dir = os.path.join(self.frame_dir, "..", "..", "..", "deinterlaced videos")
-            os.makedirs(output_dir, exist_ok=True)
             output_path = os.path.join(output_dir, os.path.basename(self.video_path))
-            DeinterlaceVideo(self.video_path, output_path)
             text = "de-interlaced video"
-            self.is_deinterlaced = True
         else:
-            text = "original video"
+            output_dir = None
             output_path = self.video_path
-            self.is_deinterlaced = False
+            text = "original video"
 
-        self.interlace_status.config(text=text)
-        
-        # Delete images
-        for file in os.listdir(self.frame_dir):
-            file_path = os.path.join(self.frame_dir, file)
-            try:
-                if os.path.isfile(file_path):  # Check if it's a file
-                    os.remove(file_path)
-            except Exception as e:
-                print(f"Error deleting file {file_path}: {e}")
+        def switch_video(job):
+            # First deinterlace video
+            if output_dir is not None:
+                os.makedirs(output_dir, exist_ok=True)
+                DeinterlaceVideo(self.video_path, output_path)
+                job.check_cancelled()
 
-        print(f"Extracting from Video: {output_path}")
-        self.frame_extractor.video_path = output_path
+            self.__delete_frame_files()
+            print(f"Extracting from Video: {output_path}")
+            self.frame_extractor.video_path = output_path
+            self.is_deinterlaced = output_dir is not None
+            job.post(lambda: self.interlace_status.config(text=text))
+            self.frame_extractor.extract_frames_by_damage_time(self.video_start_second, self.video_end_second, self.frame_extractor.extraction_rate)
 
-        self.frame_extractor.extract_frames_by_damage_time(self.video_start_second, self.video_end_second, self.frame_extractor.extraction_rate)
-        self.__reinit_frames()
-        self.__reset_video_second()
-        self.__draw_overlays()
-        self.status_bar.config(text="Status: Ready", bg="lightgrey", fg="black")
+        self.__run_frame_job("Switching to/from deinterlaced mode", switch_video)
 
     def __switch_histogram_equalization(self):
-        self.status_bar.config(text="Status: Switching to/from histogram mode", bg="yellow", fg="black")
-        self.root.update()
+        def switch_histogram(job):
+            self.__delete_frame_files()
+            self.frame_extractor.do_histogram = not self.frame_extractor.do_histogram
+            self.frame_extractor.extract_frames_by_damage_time(self.video_start_second, self.video_end_second, self.frame_extractor.extraction_rate)
+
+        self.__run_frame_job("Switching to/from histogram mode", switch_histogram)
+
+    def __run_frame_job(self, text: str, function, incremental: bool = False):
+        """
+        Runs a function, which replaces the frames in frame_dir, as a job. SAM2 loads the new frames on the worker thread as well,
+        afterwards the window is updated on the Tk thread. A new frame job cancels the running one.
+        If the job is cancelled, the window is still updated to the frames, which were extracted until then.
+        Args:
+            incremental: The existing frames are kept, so their ImageInfos are kept as well
+        """
+        def run(job):
+            self.frame_extractor.job = job
+            try:
+                function(job)
+            finally:
+                self.frame_extractor.job = None
 
-        # Delete images
+            job.set_progress(0, 0, "Loading frames into SAM2")
+            if incremental:
+                self.sam_model.update_frames(self.__list_frame_files())
+            else:
+                self.sam_model.load(self.frame_dir)
+
+        def update_window(result):
+            if incremental:
+                self.__update_frames(update_segmenter=False)
+            else:
+                self.__reinit_frames(load_segmenter=False)
+            self.__reset_video_second()
+            self.__draw_overlays()
+
+        self.job_runner.submit("frames", run, text=text, on_done=update_window, supersedes=["frames", "tracking"])
+
+    def __delete_frame_files(self):
+        # Wait for the background writes, before the frame files are deleted
+        self.__clear_frame_store()
+        removed_count = 0
         for file in os.listdir(self.frame_dir):
             file_path = os.path.join(self.frame_dir, file)
             try:
                 if os.path.isfile(file_path):  # Check if it's a file
                     os.remove(file_path)
+                    removed_count += 1
             except Exception as e:
                 print(f"Error deleting file {file_path}: {e}")
+        print(f"removed {removed_count} images!")
 
-        self.frame_extractor.do_histogram = not self.frame_extractor.do_histogram
-        self.frame_extractor.extract_frames_by_damage_time(self.video_start_second, self.video_end_second, self.frame_extractor.extraction_rate)
+    def __reset_segmenter(self):
+        # A running job uses the predictor state and resets it itself, once it is done
+        if not self.job_runner.is_running():
+            self.sam_model.reset_predictor_state()
 
-        self.__reinit_frames()
-        self.__reset_video_second()
-        self.__draw_overlays()
-        self.status_bar.config(text="Status: Ready", bg="lightgrey", fg="black")
+    def __is_busy(self) -> bool:
+        """Returns True and tells the user, if a job is running, which must finish before the frames or SAM2 can be used."""
+        if not self.job_runner.is_running():
+            return False
+        messagebox.showinfo("Please wait", "Frames are still being extracted or tracked. Wait for it to finish or cancel it first.")
+        return True
+
+    def __show_job_status(self, job):
+        """Shows the progress of the running job in the status bar, or resets it once all jobs finished."""
+        if job is None:
+            self.cancel_button.grid_remove()
+            self.status_bar.config(text="Status: Ready", bg="lightgrey", fg="black")
+            return
+
+        progress = f" ({job.done} / {job.total})" if job.total else ""
+        cancelled = " - cancelling" if job.is_cancelled else ""
+        self.status_bar.config(text=f"Status: {job.text}{progress}{cancelled}", bg="lightgreen", fg="black")
+        self.cancel_button.grid()
+
+        # Frames, which got new masks meanwhile, are drawn again
+        if job.name == "tracking":
+            self.__draw_visible_frames()
 
     def __load_data_from_json(self):
         """
         Loads masks and points for every frame and loads marked frames and instance interval from the Info.
         """
-        json_data = self.json_annotation_manager.get_json()
-        
-        self.marked_frames = json_data["Info"].get("Marked Frames", [])
-        self.split_intervals = json_data["Info"].get("Instance Intervals", {})
+        session = self.json_annotation_manager.get_session()
+
+        self.marked_frames = list(session.marked_frames)
+        self.split_intervals = {observation: IntervalIndex(intervals) for observation, intervals in session.intervals.items()}
 
         # Check which Observations already in Json
-        for value in json_data.values():
-            if "Observations" in value:
-                for observation in value["Observations"].keys():
-                    if observation not in self.observations:
-                        self.observations.append(observation)
+        for observation in session.observation_names:
+            if observation not in self.observations:
+                self.observations.append(observation)
 
         for i, image_info in enumerate(self.image_infos):
-            frame_num = image_info.frame_num
-
-            if i < len(self.image_infos) -1:
-                next_frame_num = self.image_infos[i+1].frame_num
-            elif i == len(self.image_infos) -1:
-                next_frame_num = self.image_infos[i].frame_num + 1
-
-            frame_data = json_data.get(str(frame_num)) or json_data.get(frame_num)
             image_info.image_index = i
-
-
-            if frame_data == None:
-                for observation in self.observations:
-                    damage_info = DamageInfo(observation)
-                    image_info.data_coordinates.append(damage_info)
-                continue
-
-            if frame_num in self.marked_frames:
+            if session.is_marked(image_info.frame_num):
                 image_info.is_marked = True
 
+            frame = session.get_frame(image_info.frame_num)
             for observation in self.observations:
-                new_intervalls = []
-                coordinate_dict = frame_data["Observations"].get(observation, dict())
-                
                 damage_info = DamageInfo(observation)
-
-                if coordinate_dict == dict():
-                    image_info.data_coordinates.append(damage_info)
-                    continue
-                
-                damage_info.mask_polygon = coordinate_dict.get("Mask Polygon")
-                if "Points" in coordinate_dict:
-                    damage_info.positive_point_coordinates = coordinate_dict["Points"].get("1")
-                    damage_info.negative_point_coordinates = coordinate_dict["Points"].get("0")
-
-                # When frames are skipped due to similarity, we have to adjust the split intervals
-                for begin_frame_num, end_frame_num in self.split_intervals[observation]:
-                    val1 = begin_frame_num
-                    val2 = end_frame_num
-                    print(f"current frame num: {frame_num}, next_frame_num: {next_frame_num}, begin: {begin_frame_num}, end: {end_frame_num}")
-
-                    if frame_num <= begin_frame_num and begin_frame_num < next_frame_num:
-                        val1 = frame_num
-                        damage_info.is_start_of_intervall = True
-
-                    if frame_num <= end_frame_num and end_frame_num < next_frame_num:
-                        val2 = frame_num
-                        damage_info.is_end_of_intervall = True
-
-                    new_intervalls.append(val1, val2)
-
-                self.split_intervals[observation] = new_intervalls
+                if frame is not None and observation in frame.observations:
+                    frame.observations[observation].apply_to(damage_info)
                 image_info.data_coordinates.append(damage_info)
 
-        # Move start and end of intervall into shown bounds
-        smallest_frame_num = self.image_infos[0].frame_num
-        largest_frame_num = self.image_infos[-1].frame_num
-        
-        for index, observation in enumerate(self.observations):
-            new_intervalls = []
-            for begin_frame_num, end_frame_num in self.split_intervals[observation]:
-                val1 = begin_frame_num
-                val2 = end_frame_num
-                if begin_frame_num <= smallest_frame_num <= end_frame_num:
-                    val1 = smallest_frame_num
-                    self.image_infos[0].data_coordinates[index].is_start_of_intervall = True
-                if begin_frame_num <= largest_frame_num <= end_frame_num:
-                    val2 = largest_frame_num
-                    self.image_infos[-1].data_coordinates[index].is_end_of_intervall = True
-                new_intervalls.append((val1, val2))
-            self.split_intervals[observation] = new_intervalls
+        self.__snap_intervals_to_frames()
 
     def __reload_from_json(self):
-        json_data = self.json_annotation_manager.get_json()
-        
-        self.marked_frames = json_data["Info"].get("Marked Frames", [])
-        self.split_intervals = json_data["Info"].get("Instance Intervals", {})
+        session = self.json_annotation_manager.get_session()
 
-        for i, image_info in enumerate(self.image_infos):
-            frame_data = None
-            frame_num = image_info.frame_num
+        self.marked_frames = list(session.marked_frames)
+        self.split_intervals = {observation: IntervalIndex(intervals) for observation, intervals in session.intervals.items()}
 
-            if i < len(self.image_infos) -1:
-                next_frame_num = self.image_infos[i+1].frame_num
-            elif i == len(self.image_infos) -1:
-                next_frame_num = self.image_infos[i].frame_num + 1
-
-            if json_data.get(str(frame_num)):
-                frame_data = json_data.get(str(frame_num))
-            elif json_data.get(frame_num):
-                frame_data = json_data.get(frame_num)
-            else: continue
+        for i, image_info in enumerate(self.image_infos):
+            frame = session.get_frame(image_info.frame_num)
+            if frame is None:
+                continue
 
             image_info.image_index = i
-
-            if frame_num in self.marked_frames:
+            if session.is_marked(image_info.frame_num):
                 image_info.is_marked = True
 
             for data_index, observation in enumerate(self.observations):
-                new_intervalls = []
-                coordinate_dict = frame_data["Observations"].get(observation)
-                
-                if coordinate_dict is None:
-                    continue
-                
-                damage_info = image_info.data_coordinates[data_index]
-
-                if coordinate_dict.get("Mask Polygon"):
-                    damage_info.mask_polygon = coordinate_dict.get("Mask Polygon")
-
-                if "Points" in coordinate_dict:
-                    damage_info.positive_point_coordinates = coordinate_dict["Points"].get("1")
-                    damage_info.negative_point_coordinates = coordinate_dict["Points"].get("0")
-
-                # When frames are skipped due to similarity, we have to adjust the split intervals
-                for begin_frame_num, end_frame_num in self.split_intervals[observation]:
-                    val1 = begin_frame_num
-                    val2 = end_frame_num
+                observation_annotation = frame.observations.get(observation)
+                if observation_annotation is not None:
+                    observation_annotation.apply_to(image_info.data_coordinates[data_index])
 
-                    if frame_num <= begin_frame_num and begin_frame_num < next_frame_num:
-                        val1 = frame_num
-                        damage_info.is_start_of_intervall = True
+        self.__snap_intervals_to_frames()
 
-                    if frame_num <= end_frame_num and end_frame_num < next_frame_num:
-                        val2 = frame_num
-                        damage_info.is_end_of_intervall = True
-
-                    new_intervalls.append((val1, val2))
-
-                self.split_intervals[observation] = new_intervalls
-
-        # Move start and end of intervall into shown bounds
-        smallest_frame_num = self.image_infos[0].frame_num
-        largest_frame_num = self.image_infos[-1].frame_num
-        
+    def __snap_intervals_to_frames(self):
+        """
+        When frames are skipped due to similarity, intervals start and end between the shown frames.
+        Their start and end are moved onto the last frame at or before them, or onto the first shown frame,
+        and these frames are marked as start and end of the intervall.
+        """
+        frame_index = self.__get_frame_index()
         for index, observation in enumerate(self.observations):
+            if observation not in self.split_intervals:
+                continue
             new_intervalls = []
             for begin_frame_num, end_frame_num in self.split_intervals[observation]:
-                val1 = begin_frame_num
-                val2 = end_frame_num
-                if begin_frame_num <= smallest_frame_num <= end_frame_num:
-                    val1 = smallest_frame_num
-                    self.image_infos[0].data_coordinates[index].is_start_of_intervall = True
-                if begin_frame_num <= largest_frame_num <= end_frame_num:
-                    val2 = largest_frame_num
-                    self.image_infos[-1].data_coordinates[index].is_end_of_intervall = True
-                new_intervalls.append((val1, val2))
-            self.split_intervals[observation] = new_intervalls
-        
+                frame_indexes = frame_index.snap(begin_frame_num, end_frame_num)
+                if frame_indexes is None:
+                    new_intervalls.append((begin_frame_num, end_frame_num))
+                    continue
+                start_index, end_index = frame_indexes
+                self.image_infos[start_index].data_coordinates[index].is_start_of_intervall = True
+                self.image_infos[end_index].data_coordinates[index].is_end_of_intervall = True
+                new_intervalls.append((frame_index.frame_nums[start_index], frame_index.frame_nums[end_index]))
+            self.split_intervals[observation] = IntervalIndex(new_intervalls)
+
+    def __get_frame_index(self) -> FrameIndex:
+        # Created again, whenever image_infos was replaced or frames were added to it
+        if self.frame_index is None or self.frame_index_source is not self.image_infos or len(self.frame_index) != len(self.image_infos):
+            self.frame_index = FrameIndex([image_info.frame_num for image_info in self.image_infos])
+            self.frame_index_source = self.image_infos
+        return self.frame_index
+
     def __create_window(self):
         self.__create_layout()
 
@@ -481,7 +484,7 @@ class MainWindow:
 
         # Canvas and scrollbar setup
         self.canvas = tk.Canvas(self.middle_frame, highlightthickness=0)
-        self.scrollbar = ttk.Scrollbar(self.middle_frame, orient="vertical", command=self.canvas.yview)
+        self.scrollbar = ttk.Scrollbar(self.middle_frame, orient="vertical", command=self.__on_scroll)
 
         # Place canvas to fill the width of the window
         self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
@@ -489,12 +492,10 @@ class MainWindow:
         # Place scrollbar to the right of the canvas without overlapping
         self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
-        # Scrollable frame within canvas
-        self.scrollable_frame = tk.Frame(self.canvas)
-        self.scrollable_frame.bind("<Configure>", lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all")))
-
-        self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
+        # The frames are drawn directly on the canvas
         self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        self.canvas.bind("<Button-1>", self.__on_image_left_click)
+        self.canvas.bind("<Button-3>", lambda event: self.__set_left_click_mode("Splitting"))
 
         # Bind mouse wheel scrolling
         self.canvas.bind_all("<MouseWheel>", self.__on_mousewheel)
@@ -515,13 +516,19 @@ class MainWindow:
         else:
             text = "original video"
 
+        # Only shown while a job runs
+        self.cancel_button = tk.Button(self.status_bar_frame, text="Cancel", command=lambda: self.job_runner.cancel())
+        self.cancel_button.grid(row=0, column=1, sticky="e", padx=10)
+        self.cancel_button.grid_remove()
+
         # Right-aligned label
         self.interlace_status = tk.Label(self.status_bar_frame, text=text, anchor=tk.E)
-        self.interlace_status.grid(row=0, column=1, sticky="e", padx=10)
+        self.interlace_status.grid(row=0, column=2, sticky="e", padx=10)
 
         # Configure grid weights to make the left label expand
         self.status_bar_frame.columnconfigure(0, weight=1)  # Left label stretches
-        self.status_bar_frame.columnconfigure(1, weight=0)  # Right label stays fixed
+        self.status_bar_frame.columnconfigure(1, weight=0)
+        self.status_bar_frame.columnconfigure(2, weight=0)  # Right label stays fixed
 
     def __create_menubar(self):
         # Create a menu
@@ -625,37 +632,158 @@ class MainWindow:
             self.extract_backwards = tk.Button(self.second_frame, text="+10 Frames <", command=lambda: self.__on_extract_frames(10, "backward"), height=2, width=10).pack(side="right", padx=5, pady=5)           
 
     def __create_image_grid(self):
-        """Puts the images on the grid."""
-        self.image_references = []
+        """Lays out the grid for the current window and grid size and draws the visible frames."""
+        if self.settle_redraw_job is not None:
+            self.root.after_cancel(self.settle_redraw_job)
+            self.settle_redraw_job = None
 
-        orig_width, orig_height = self.image_infos[0].img_size
-        ratio = orig_height/orig_width
+        if not self.__layout_image_grid():
+            return
+        self.__draw_visible_frames()
+
+    def __layout_image_grid(self) -> bool:
+        if len(self.image_infos) == 0:
+            return False
 
         canvas_width = self.canvas.winfo_width()
-        cell_width = max((canvas_width - self.grid_size*9)//self.grid_size, 1)
+        self.canvas_size = (canvas_width, self.canvas.winfo_height())
+        cell_size = self.get_cell_size(canvas_width, self.grid_size, self.image_infos[0].img_size)
+        self.thumbnail_cache.max_entries = self.get_thumbnail_count(self.thumbnail_cache_screens, self.canvas_size[1], self.grid_size, cell_size)
+
+        # PhotoImages can only be reused for frames of the same size
+        if cell_size != self.cell_size:
+            for index in list(self.grid_cells):
+                self.__release_grid_cell(index)
+            self.photo_pool = []
+            self.cell_size = cell_size
+
+        row_count = ceil(len(self.image_infos) / self.grid_size)
+        self.canvas.configure(scrollregion=(0, 0, canvas_width, row_count * (cell_size[1] + self.GRID_SPACING)))
+        return True
+
+    @staticmethod
+    def get_default_grid_size(settings: dict, frame_count: int) -> int:
+        """Number of columns a session with frame_count frames opens with."""
+        grid_size = settings.get("default_grid_size", 0)
+        if grid_size == 0:
+            return int(sqrt(frame_count)) + 1
+        return grid_size
+
+    @classmethod
+    def get_cell_size(cls, canvas_width: int, grid_size: int, image_size: tuple) -> tuple:
+        """(width, height) of the grid cells for frames of image_size on a canvas of canvas_width."""
+        orig_width, orig_height = image_size
+        ratio = orig_height/orig_width
+        cell_width = max((canvas_width - grid_size*cls.GRID_SPACING)//grid_size, 1)
+        return (cell_width, max(int(cell_width*ratio), 1))
 
-        # Clear the scrollable_frame before adding new labels
-        for widget in self.scrollable_frame.winfo_children():
-            widget.destroy()
+    @classmethod
+    def get_thumbnail_count(cls, screens: int, canvas_height: int, grid_size: int, cell_size: tuple) -> int:
+        """Number of thumbnails in screens screens full of grid cells, with the extra rows drawn above and below."""
+        visible_rows = ceil(canvas_height / (cell_size[1] + cls.GRID_SPACING)) + 2
+        return max(grid_size * visible_rows * max(int(screens), 1), 1)
 
-        for i, image_info in enumerate(self.image_infos):
-            image = image_info.drawn_image.copy()
+    def __draw_visible_frames(self, fast=False) -> int:
+        """
+        Draws the frames in the visible rows, and releases the ones that were scrolled out of view.
+        Frames which are already shown are only drawn again, if they changed.
+        Returns the number of frames drawn.
+        """
+        if self.cell_size is None or len(self.image_infos) == 0:
+            return 0
+
+        cell_width, cell_height = self.cell_size
+        step_x = cell_width + self.GRID_SPACING
+        step_y = cell_height + self.GRID_SPACING
+
+        # One extra row above and below, so scrolling a little does not show empty cells
+        top = self.canvas.canvasy(0)
+        first_row = max(int(top // step_y) - 1, 0)
+        last_row = int((top + self.canvas.winfo_height()) // step_y) + 1
+        visible_indexes = range(first_row * self.grid_size, min((last_row + 1) * self.grid_size, len(self.image_infos)))
+
+        for index in list(self.grid_cells):
+            if index not in visible_indexes:
+                self.__release_grid_cell(index)
+
+        offset = self.GRID_SPACING // 2
+        redrawn_count = 0
+        for index in visible_indexes:
+            image_info = self.image_infos[index]
+            x = (index % self.grid_size) * step_x + offset
+            y = (index // self.grid_size) * step_y + offset
+
+            grid_cell = self.grid_cells.get(index)
+            if grid_cell is None:
+                photo = self.photo_pool.pop() if self.photo_pool else ImageTk.PhotoImage("RGB", self.cell_size)
+                grid_cell = GridCell(self.canvas.create_image(x, y, anchor=tk.NW, image=photo), photo)
+                self.grid_cells[index] = grid_cell
+            else:
+                self.canvas.coords(grid_cell.item_id, x, y)
+
+            if grid_cell.image_path == image_info.image_path and not image_info.is_dirty and not (grid_cell.is_fast and not fast):
+                continue
+
+            # The overlays are drawn onto the cached thumbnail, the full image is not needed for the grid
             try:
-                image = image.resize((cell_width, int(cell_width*ratio)), Image.Resampling.LANCZOS)
-            except:
-                return
-            
-            photo = ImageTk.PhotoImage(image)
+                thumbnail = self.thumbnail_cache.get(image_info, self.cell_size, fast=fast)
+            except Exception as e:
+                print(f"Error loading thumbnail of {image_info.image_path}: {e}")
+                continue
+            grid_cell.photo.paste(DrawImageInfo(image_info, thumbnail).drawn_image)
+            grid_cell.image_path = image_info.image_path
+            grid_cell.is_fast = fast
+            image_info.mark_clean()
+            redrawn_count += 1
+
+        return redrawn_count
+
+    def __release_grid_cell(self, index):
+        grid_cell = self.grid_cells.pop(index)
+        self.canvas.delete(grid_cell.item_id)
+        if (grid_cell.photo.width(), grid_cell.photo.height()) == self.cell_size:
+            self.photo_pool.append(grid_cell.photo)
+
+    def __get_image_index_at(self, event):
+        """Returns the index of the frame below the mouse, or None if there is none."""
+        if self.cell_size is None:
+            return None
+
+        x = self.canvas.canvasx(event.x) - self.GRID_SPACING // 2
+        y = self.canvas.canvasy(event.y) - self.GRID_SPACING // 2
+        step_x = self.cell_size[0] + self.GRID_SPACING
+        step_y = self.cell_size[1] + self.GRID_SPACING
+        col, x_in_cell = divmod(int(x), step_x)
+        row, y_in_cell = divmod(int(y), step_y)
+
+        if x < 0 or y < 0 or col >= self.grid_size or x_in_cell >= self.cell_size[0] or y_in_cell >= self.cell_size[1]:
+            return None
+
+        img_index = col + row * self.grid_size
+        if img_index >= len(self.image_infos):
+            return None
+        return img_index
+
+    def __schedule_grid_redraw(self):
+        """
+        While the window or grid size changes, the grid is redrawn at most every FAST_REDRAW_DELAY ms with a fast filter,
+        and once it has settled for SETTLE_REDRAW_DELAY ms, in full quality.
+        """
+        if self.fast_redraw_job is None:
+            self.fast_redraw_job = self.root.after(self.FAST_REDRAW_DELAY, self.__fast_redraw)
 
-            # Store the reference to the image
-            self.image_references.append(photo)
+        if self.settle_redraw_job is not None:
+            self.root.after_cancel(self.settle_redraw_job)
+        self.settle_redraw_job = self.root.after(self.SETTLE_REDRAW_DELAY, self.__create_image_grid)
 
-            label = tk.Label(self.scrollable_frame, image=photo)
-            label.grid(row=i // self.grid_size, column=i % self.grid_size, padx=2, pady=2, sticky="nsew")
-            label.bind("<Button-1>", self.__on_image_left_click)  # Bind click event
-            label.bind("<Button-3>", lambda event: self.__set_left_click_mode("Splitting"))
+    def __fast_redraw(self):
+        self.fast_redraw_job = None
+        if self.__layout_image_grid():
+            self.__draw_visible_frames(fast=True)
 
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+    def __on_scroll(self, *args):
+        self.canvas.yview(*args)
+        self.__draw_visible_frames()
 
     def __open_frames_dir(self):
         os.startfile(self.frame_dir)
@@ -665,9 +793,7 @@ class MainWindow:
         for every image: Draws their masks and Borders on the shown image.
         """
         try:
-            for image_info in self.image_infos:
-                DrawImageInfo(image_info)
-            
+            # The overlays are drawn onto the thumbnails while the grid is created
             self.root.after(200, self.__create_image_grid)
         except Exception as e:
             print(f"Error: Cant draw Overlay: {e}")
@@ -698,7 +824,7 @@ class MainWindow:
             image_info.data_coordinates.append(damage_info)
         
         if skip_reset == False:
-            self.sam_model.reset_predictor_state()
+            self.__reset_segmenter()
             self.__create_observation_widgets()
 
     def __mark_up_mode(self, img_index):
@@ -708,7 +834,6 @@ class MainWindow:
         
         image_info = self.image_infos[img_index]
         image_info.is_marked = not image_info.is_marked
-        DrawImageInfo(image_info)
 
     def __splitting_mode(self, img_index):
         if img_index is None:
@@ -721,17 +846,11 @@ class MainWindow:
         
         # If click is in an other intervall
         frame_num = image_info.frame_num
-        split_intervals = self.split_intervals.get(self.selected_observation, [])
-
-        for (start_frame_num, end_frame_num) in split_intervals:
-            if frame_num < start_frame_num:
-                continue
-            if frame_num > end_frame_num:
-                continue
+        split_intervals = self.split_intervals.get(self.selected_observation, IntervalIndex())
 
+        if split_intervals.contains(frame_num):
             if self.split_start:
                 self.image_infos[self.split_start].data_coordinates[observation_index].is_start_of_intervall = False
-                DrawImageInfo(self.image_infos[self.split_start])
             self.__reset_left_click_modes()
             return
 
@@ -739,21 +858,19 @@ class MainWindow:
         if self.split_start is None:
             self.split_start = img_index
             damage_info.is_start_of_intervall = True
-            DrawImageInfo(self.image_infos[img_index])
             
         else:
-            if img_index < self.split_start:
+            start_frame_num = self.image_infos[self.split_start].frame_num
+            # An intervall must not end before its start or enclose an other intervall of the observation
+            if img_index < self.split_start or split_intervals.overlaps(start_frame_num, frame_num):
                 self.image_infos[self.split_start].data_coordinates[observation_index].is_start_of_intervall = False
-                DrawImageInfo(self.image_infos[self.split_start])
                 self.__reset_left_click_modes()
                 return
 
             damage_info.is_end_of_intervall = True
-            DrawImageInfo(self.image_infos[img_index])
 
-            interval_list = self.split_intervals.get(self.selected_observation, [])
-            interval_list.append((self.image_infos[self.split_start].frame_num, self.image_infos[img_index].frame_num))
-            self.split_intervals[self.selected_observation] = interval_list   
+            interval_list = self.split_intervals.setdefault(self.selected_observation, IntervalIndex())
+            interval_list.add(start_frame_num, frame_num)
             self.__reset_left_click_modes()
 
     def __delete_observation(self, event = None, observation = None):
@@ -761,6 +878,10 @@ class MainWindow:
             print("Error: No observation given!")
             return
 
+        # The tracking addresses the observations by their index
+        if self.__is_busy():
+            return
+
         response = messagebox.askyesno("Confirm deletion", f"Are you sure you want to delete '{observation}'?")
         if response:  # If the user clicked "Yes"
             for image_info in self.image_infos:
@@ -777,7 +898,7 @@ class MainWindow:
                         self.selected_observation = None
                     break
 
-            self.sam_model.reset_predictor_state()
+            self.__reset_segmenter()
             self.__create_observation_widgets()
             self.__draw_overlays()
             
@@ -791,41 +912,20 @@ class MainWindow:
 
         # If click is in an intervall
         frame_num = image_info.frame_num
-        split_intervals = self.split_intervals.get(self.selected_observation, [])
-        intervall = None
-
-        for (start_frame_num, end_frame_num) in split_intervals:
-            if frame_num < start_frame_num:
-                continue
-            if frame_num > end_frame_num:
-                continue
-
-            start_frame_index = None
-            end_frame_index = None
-
-            for i, image_info in enumerate(self.image_infos):
-                if image_info.frame_num == start_frame_num:
-                    start_frame_index = i
-                elif image_info.frame_num == end_frame_num:
-                    end_frame_index = i
-
-                if start_frame_index and end_frame_index:
-                    break
-
-
-            intervall = (start_frame_index, end_frame_index)
-            break
-        
-        if intervall is None:
+        split_intervals = self.split_intervals.get(self.selected_observation, IntervalIndex())
+        clicked_intervall = split_intervals.find(frame_num)
+        if clicked_intervall is None:
             return
 
+        # The loaded frames inside the intervall, the clicked one is always among them
+        intervall = self.__get_frame_index().get_index_range(*clicked_intervall)
+
         for i in range(intervall[0], intervall[1] +1):
             new_damage_info = DamageInfo(self.selected_observation)
             new_damage_info.is_selected = True
             self.image_infos[i].data_coordinates[observation_index]  = new_damage_info
-            DrawImageInfo(self.image_infos[i])
 
-        self.split_intervals[self.selected_observation].remove((self.image_infos[intervall[0]].frame_num,self.image_infos[intervall[1]].frame_num))
+        split_intervals.remove(*clicked_intervall)
         self.__reset_left_click_modes()
         
     def __delete_mode(self, img_index):
@@ -842,9 +942,12 @@ class MainWindow:
 
         damage_info.positive_point_coordinates = []
         damage_info.negative_point_coordinates = []
-        damage_info.mask_polygons = []
+        damage_info.set_mask()
 
-        DrawImageInfo(image_info)
+        # The fingerprints only cover the points, so the intervalls of the deleted mask have to be tracked again
+        frame_num = image_info.frame_num
+        for key in [key for key in self.tracking_fingerprints if key[0] == self.selected_observation and key[1] <= frame_num <= key[2]]:
+            del self.tracking_fingerprints[key]
 
     def __on_image_left_click(self, event):
         """
@@ -867,11 +970,9 @@ class MainWindow:
             simpledialog.messagebox.showinfo("no observation selected", "please select or create Observation first")
             return
 
-        row = event.widget.grid_info()["row"]
-        col = event.widget.grid_info()["column"]
-
-        # Rest of the function code
-        img_index = (col) + (row * self.grid_size)
+        img_index = self.__get_image_index_at(event)
+        if img_index is None:
+            return
         print(f"Clicked Image Index: {img_index}")
 
         if self.left_click_mode == "Marking Up":
@@ -883,21 +984,22 @@ class MainWindow:
         elif self.left_click_mode == "Deleting":
             self.__delete_mode(img_index)
         else:
-            interval_list = self.split_intervals.get(self.selected_observation, [])
+            # The annotation window uses SAM2, which is busy while a job runs
+            if self.__is_busy():
+                return
+
+            interval_list = self.split_intervals.get(self.selected_observation, IntervalIndex())
             if len(interval_list) == 0:
                 self.__splitting_mode(0)
                 self.__splitting_mode(len(self.image_infos) - 1)
                 self.__create_image_grid()
 
-            for start, end in self.split_intervals[self.selected_observation]:
-                if start <= self.image_infos[img_index].frame_num <= end:
-                    clicked_intervall = (start, end)
-            try:
-                if clicked_intervall != self.last_clicked_intervall:   
-                    self.sam_model.reset_predictor_state()
-            except:
+            clicked_intervall = self.split_intervals.get(self.selected_observation, IntervalIndex()).find(self.image_infos[img_index].frame_num)
+            if clicked_intervall is None:
                 print("Clicked Image is in no Intervall!")
                 return
+            if clicked_intervall != self.last_clicked_intervall:
+                self.sam_model.reset_predictor_state()
             
             try:
                 self.next_button.config(state=tk.DISABLED)
@@ -919,10 +1021,11 @@ class MainWindow:
             else:
                 if self.grid_size > 1:
                     self.grid_size -= 1
-            self.__create_image_grid()
+            self.__schedule_grid_redraw()
         else:
             # Enable mousewheel scrolling
             self.canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
+            self.__draw_visible_frames()
         
     def __on_observation_button_pressed(self, observation):
         button_exists = False
@@ -950,7 +1053,7 @@ class MainWindow:
                     damage_info.is_selected = False
 
         self.selected_observation = observation
-        self.sam_model.reset_predictor_state()
+        self.__reset_segmenter()
         self.__reset_left_click_modes()
         self.__draw_overlays()
 
@@ -980,25 +1083,19 @@ class MainWindow:
                         This determines, if the extra frames are cut from the end going to the end or from the beginning and going to the start of the video
             
         """
-        self.status_bar.config(text="Status: Extracting Frames", bg="lightgreen", fg="black")
-        self.root.update()
-        i = 0
-        for i, filename in enumerate(os.listdir(self.frame_dir)):
-            file_path = os.path.join(self.frame_dir, filename)  # Get full file path
-            try:
-                if os.path.isfile(file_path):  # Check if it's a file
-                    os.remove(file_path)  # Delete the file
-            except Exception as e:
-                print(f"Error deleting {file_path}: {e}")
-
-        print(f"removed {i} images!")
+        if self.incremental_frame_extraction:
+            # Only extract the frames beyond the current first or last frame and keep everything else
+            first_frame = self.image_infos[0].frame_num
+            last_frame = self.image_infos[-1].frame_num
+            extend_frames = lambda job: self.frame_extractor.extend_frames(first_frame, last_frame, to_extract_frames, 25, direction)
+            self.__run_frame_job("Extracting Frames", extend_frames, incremental=True)
+            return
 
-        self.frame_extractor.extract_video_segment_by_similarity(self.video_start_second, self.video_end_second, to_extract_frames, 25, direction)
+        def extract_segment(job):
+            self.__delete_frame_files()
+            self.frame_extractor.extract_video_segment_by_similarity(self.video_start_second, self.video_end_second, to_extract_frames, 25, direction)
 
-        self.__reinit_frames()
-        self.__reset_video_second()
-        self.__draw_overlays()
-        self.status_bar.config(text="Status: Ready", bg="lightgrey", fg="black")
+        self.__run_frame_job("Extracting Frames", extract_segment)
 
     def __open_extraction_window(self):
         self.status_bar.config(text="Status: Extracting Frames", bg="lightgreen", fg="black")
@@ -1009,22 +1106,123 @@ class MainWindow:
         if start_second is None or end_second is None:
             self.status_bar.config(text="Status: Ready", bg="lightgrey", fg="black")
             return
-        
-        # Delete images
-        for file in os.listdir(self.frame_dir):
-            file_path = os.path.join(self.frame_dir, file)
+
+        if self.incremental_frame_extraction and self.frame_extractor.get_fps():
+            # The ImageInfos of the kept frames are read on the worker thread, so they are taken before
+            image_infos = list(self.image_infos)
+            extract_missing_frames = lambda job: self.__extract_missing_frames(image_infos, start_second, end_second, extraction_rate=25)
+            self.__run_frame_job("Extracting Frames", extract_missing_frames, incremental=True)
+            return
+
+        def extract_frames(job):
+            self.__delete_frame_files()
+            self.frame_extractor.extract_frames_by_damage_time(start_second, end_second, extraction_rate=25)
+
+        self.__run_frame_job("Extracting Frames", extract_frames)
+                    
+    def __extract_missing_frames(self, image_infos: list, start_second: int, end_second: int, extraction_rate: int):
+        """
+        Deletes the frames outside of the new range and only extracts the frames missing at its start and end.
+        """
+        fps = self.frame_extractor.get_fps()
+        start_frame = int(start_second * fps)
+        end_frame = int(end_second * fps)
+
+        if self.frame_store is not None:
+            self.frame_store.flush()
+
+        kept_frame_nums = []
+        for image_info in image_infos:
+            if start_frame <= image_info.frame_num <= end_frame:
+                kept_frame_nums.append(image_info.frame_num)
+                continue
+            if self.frame_store is not None:
+                self.frame_store.remove(image_info.frame_num)
             try:
-                if os.path.isfile(file_path):  # Check if it's a file
-                    os.remove(file_path)
+                os.remove(image_info.image_path)
             except Exception as e:
-                print(f"Error deleting file {file_path}: {e}")
+                print(f"Error deleting file {image_info.image_path}: {e}")
+
+        if len(kept_frame_nums) == 0:
+            self.frame_extractor.extract_frames_by_frame_range(start_frame, end_frame, extraction_rate)
+            return
+
+        first_frame = kept_frame_nums[0]
+        last_frame = kept_frame_nums[-1]
+
+        # Stay on the same extraction grid as the existing frames
+        if start_frame < first_frame:
+            self.frame_extractor.extract_frames_by_frame_range(first_frame - extraction_rate * ((first_frame - start_frame) // extraction_rate), first_frame - 1, extraction_rate)
+        if end_frame > last_frame:
+            self.frame_extractor.extract_frames_by_frame_range(last_frame + extraction_rate, end_frame, extraction_rate)
+
+    def __update_frames(self, update_segmenter: bool = True):
+        """
+        Brings self.image_infos in line with the frames in frame_dir.
+        Existing ImageInfos and their DamageInfos are kept, only new frames are loaded and SAM2 only loads the new frames as well.
+        Args:
+            update_segmenter: False, if SAM2 already loaded the new frames, e.g. on the worker thread of a job
+        """
+        session = self.json_annotation_manager.get_session()
+        existing_image_infos = {image_info.image_name: image_info for image_info in self.image_infos}
+        visible_observations = {button_state.button_name for button_state in self.button_states if button_state.is_visible}
+
+        image_infos = []
+        new_frame_count = 0
+        for file_path in self.__list_frame_files():
+            image_info = existing_image_infos.get(os.path.basename(file_path))
+            if image_info is None:
+                image_info = ImageInfo(file_path, frame_store=self.frame_store)
+                frame = session.get_frame(image_info.frame_num)
+
+                for observation in self.observations:
+                    damage_info = DamageInfo(observation)
+                    damage_info.is_selected = observation == self.selected_observation
+                    damage_info.is_shown = observation in visible_observations or not self.button_states
+
+                    if frame is not None and observation in frame.observations:
+                        frame.observations[observation].apply_to(damage_info)
+
+                    image_info.data_coordinates.append(damage_info)
+                new_frame_count += 1
+
+            image_info.image_index = len(image_infos)
+            image_infos.append(image_info)
+
+        if len(image_infos) == 0:
+            print("Error: No frames found after extraction!")
+            return
+
+        self.image_infos = image_infos
+        self.max_grid_size = int(sqrt(len(self.image_infos))) + 3
+
+        # Frames an intervall started or ended on may be deleted or new frames lie closer to it, so it is snapped again
+        for image_info in self.image_infos:
+            for damage_info in image_info.data_coordinates:
+                damage_info.is_start_of_intervall = False
+                damage_info.is_end_of_intervall = False
+        self.__snap_intervals_to_frames()
+
+        if update_segmenter:
+            self.sam_model.update_frames([image_info.image_path for image_info in self.image_infos])
+
+        print(f"Added {new_frame_count} new frames, {len(self.image_infos)} frames in total.")
+
+    def __list_frame_files(self) -> list:
+        """
+        Returns the paths of the current frames sorted by name. With a frame store these are the stored frames,
+        since their files may still be written in the background.
+        """
+        if self.frame_store is not None and len(self.frame_store) > 0:
+            return self.frame_store.get_frame_paths()
+
+        return [os.path.join(self.frame_dir, file) for file in sorted(os.listdir(self.frame_dir)) if file.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.webp'))]
+
+    def __clear_frame_store(self):
+        # Wait for the background writes, before the frame files are deleted
+        if self.frame_store is not None:
+            self.frame_store.clear()
 
-        self.frame_extractor.extract_frames_by_damage_time(start_second, end_second, extraction_rate=25)
-        self.__reinit_frames()
-        self.__reset_video_second()
-        self.root.after(200, self.__draw_overlays())
-        self.status_bar.config(text="Status: Ready", bg="lightgrey", fg="black")
-                    
     def __open_annotation_window(self, index):
         if index is None:
             print("Error: Can not open annotation window, no index is given!")
@@ -1033,16 +1231,25 @@ class MainWindow:
         image_info = self.image_infos[index]
         self.status_bar.config(text="Status: Labeling Frames", bg="lightgreen", fg="black")
 
+        # The annotation window shows the full image with the overlays of all observations
+        DrawImageInfo(image_info)
+
         annotation_window = AnnotationWindow()
         annotation_window.set_settings(self.annotation_window_geometry, self.annotation_window_maximized)
         annotation_window.set_image_info(image_info)
         annotation_window.set_segmenter(self.sam_model, index)
+        annotation_window.keep_mask_holes = self.mask_converter.keep_holes
+        annotation_window.mask_storage = self.mask_storage
 
         annotation_window.open()
 
         self.status_bar.config(text="Status: Ready", bg="lightgrey", fg="black")
         self.annotation_window_maximized, self.annotation_window_geometry = annotation_window.get_geometry()
-        self.__create_image_grid
+        # The full image is only needed while annotating
+        image_info.unload()
+        # Points may have been removed in place, without replacing the lists of the DamageInfo,
+        # so the frame is marked dirty and __on_image_left_click redraws it with the grid afterwards
+        image_info.mark_dirty()
 
     def __set_left_click_mode(self, mode):
         """Sets the currently active mode using a status bar and changes its color."""
@@ -1071,7 +1278,7 @@ class MainWindow:
             self.__create_image_grid()
 
     def __resize_images(self, event=None):
-        self.__create_image_grid()
+        self.__schedule_grid_redraw()
 
     # def __reinit_frames(self):
     #     """
@@ -1114,9 +1321,11 @@ class MainWindow:
     #         print(f"Error during frame reinitialization: {e}")
 
 
-    def __reinit_frames(self):
+    def __reinit_frames(self, load_segmenter: bool = True):
         """
         Reinitialize the frames and reload all associated data.
+        Args:
+            load_segmenter: False, if SAM2 already loaded the new frames, e.g. on the worker thread of a job
         """
         try:
             # Save observations before clearing
@@ -1126,8 +1335,9 @@ class MainWindow:
             # Save current data to JSON
             self.save_to_json()
 
-            # Reinitialize frames
+            # Reinitialize frames, the polygons the mask converter kept belong to the old frame indexes
             self.__set_frames(self.frame_dir)
+            self.mask_converter.clear()
 
             # Re-add observations
             self.observations = []
@@ -1135,7 +1345,8 @@ class MainWindow:
                     self.__add_observation(observation, skip_reset = True, skip_counting = True)
 
             # Ensure the segmenter state is reset
-            self.sam_model.load(self.frame_dir)
+            if load_segmenter:
+                self.sam_model.load(self.frame_dir)
 
             self.__reload_from_json()
 
@@ -1159,75 +1370,136 @@ class MainWindow:
         Tracks Objects based on their given Points in their intervalls.
         """
 
-        # Initialize a dictionary to store all tracked segments
-        all_video_segments = dict()
-        self.status_bar.config(text="Status: Tracking Object", bg="lightgreen", fg="black")
-        self.root.update()
+        if self.job_runner.is_running("frames") and self.__is_busy():
+            return
 
         try:
             self.next_button.config(state=tk.NORMAL)
         except:
             pass
 
-        if self.selected_observation not in self.split_intervals.keys() or len(self.split_intervals[self.selected_observation]) == 0:
+        # Either every observation is tracked, or only the selected one
+        if self.track_all_observations:
+            observations = [observation for observation in self.observations if len(self.split_intervals.get(observation, [])) > 0]
+        elif len(self.split_intervals.get(self.selected_observation, [])) > 0:
+            observations = [self.selected_observation]
+        else:
+            observations = []
+
+        if len(observations) == 0:
             print("Error: No splits available!")
             return
 
-        # If the selected observation has intervals
-        for (start_frame_num, end_frame_num) in self.split_intervals[self.selected_observation]:
-            print(f"\nTracking Object {self.selected_observation} form frame {start_frame_num} to frame {end_frame_num}")
-
-            # Get Index first:
-            start_frame_index = None
-            end_frame_index = None
-            for index, image_info in enumerate(self.image_infos):
-                frame_num = int(image_info.frame_num)
-                if int(start_frame_num) == frame_num:
-                    start_frame_index = index
-                elif int(end_frame_num) == frame_num:
-                    end_frame_index = index
-                
-                if start_frame_index and end_frame_index:
-                    break
+        # Every intervall of every observation becomes its own object, which are all tracked in one pass
+        intervals = []
+        keys = []
+        fingerprints = {}
+        for observation in observations:
+            observation_index = self.observations.index(observation)
+            for (start_frame_num, end_frame_num) in self.split_intervals[observation]:
+                print(f"Tracking Object {observation} form frame {start_frame_num} to frame {end_frame_num}")
+
+                start_frame_index, end_frame_index = self.__get_intervall_indexes(start_frame_num, end_frame_num)
+                if start_frame_index is None or end_frame_index is None:
+                    print(f"Error: Frame indices for start ({start_frame_num}) or end ({end_frame_num}) could not be found.")
+                    print(f"found ones are: {start_frame_index} and {end_frame_index}")
+                    continue
 
-            # Check if start_frame_index and end_frame_num are valid
-            if start_frame_index is None or end_frame_index is None:
-                print(f"Error: Frame indices for start ({start_frame_num}) or end ({end_frame_num}) could not be found.")
-                print(f"found ones are: {start_frame_index} and {end_frame_index}")
-                continue
+                key = (observation, start_frame_num, end_frame_num)
+                intervals.append((observation_index, start_frame_index, end_frame_index))
+                keys.append(key)
+                fingerprints[key] = self.sam_model.get_prompt_fingerprint(self.image_infos, observation_index, start_frame_index, end_frame_index)
 
-            # Call propagate_through_interval for each interval and accumulate results
-            video_segments = self.sam_model.track_objects(self.image_infos, start_frame_index, end_frame_index)
+        # Intervalls whose points did not change since the last tracking keep their masks
+        changed = self.__get_changed_intervals(intervals, [fingerprints[key] for key in keys], keys)
+        changed_intervals = [intervall for intervall, is_changed in zip(intervals, changed) if is_changed]
+        print(f"Tracking {len(changed_intervals)} of {len(intervals)} intervalls, the others did not change")
 
-            if video_segments:
-                all_video_segments.update(video_segments)  # Merge results
+        # The masks of these intervalls are overwritten now, so their old fingerprints are not valid anymore, even if the tracking is cancelled
+        for key, is_changed in zip(keys, changed):
+            if is_changed:
+                self.tracking_fingerprints.pop(key, None)
+
+        def on_done(is_complete):
+            if not is_complete:
+                return
+            for observation in observations:
+                for key in [key for key in self.tracking_fingerprints if key[0] == observation]:
+                    del self.tracking_fingerprints[key]
+            self.tracking_fingerprints.update(fingerprints)
+            self.__draw_overlays()
 
+        if changed_intervals:
+            # The grid stays usable while tracking, the tracked frames are drawn as their masks come in
+            self.job_runner.submit("tracking", self.__run_tracking, changed_intervals, text="Tracking Object", on_done=on_done)
+        else:
+            on_done(True)
+
+    def __run_tracking(self, job, intervals: list) -> bool:
+        """
+        Tracks the intervals on the worker thread of a job. Returns False if the tracking was cancelled.
+        """
+        frame_count = len({index for _, start_frame_index, end_frame_index in intervals for index in range(start_frame_index, end_frame_index + 1)})
+        tracked_count = 0
+        job.set_progress(0, frame_count)
+
+        # The masks are encoded or converted into polygons on the workers of the mask converter while the tracking continues,
+        # so they are never all kept at once
+        tracking = self.sam_model.track_all_objects_iter(self.image_infos, intervals)
+        conversion = self.mask_converter.convert_iter(tracking)
+        try:
+            for out_frame_idx, masks in conversion:
+                job.post(self.__set_tracked_masks, out_frame_idx, masks)
+
+                tracked_count += 1
+                if not job.set_progress(min(tracked_count, frame_count), frame_count):
+                    print("Tracking cancelled.")
+                    return False
+        finally:
+            conversion.close()
+            tracking.close()
             self.sam_model.reset_predictor_state()
+        return True
+
+    def __set_tracked_masks(self, frame_index: int, masks: dict):
+        # Runs on the Tk thread, the grid draws the frame again at its next update. The masks are polygons or run length encodings
+        image_info = self.image_infos[frame_index]
+        for observation_index, mask in masks.items():
+            if self.mask_storage == "rle":
+                image_info.data_coordinates[observation_index].set_mask(mask_rle=mask)
+            else:
+                image_info.data_coordinates[observation_index].set_mask(mask)
 
-        self.status_bar.config(text="Status: Ready", bg="lightgray", fg="black")
-        
-        selected_observation_index = self.observations.index(self.selected_observation)
-        # Process each frame in all_video_segments
-        for out_frame_idx, masks in all_video_segments.items():
-            image_info = self.image_infos[out_frame_idx]
-            polygons = []
-
-            for mask in masks.values():
-                mask = np.squeeze(mask)  # Squeeze to remove dimensions of size 1
-                
-                # Extract contours using OpenCV
-                contours, _ = cv2.findContours(mask.astype(np.uint8), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-                for contour in contours:
-                    # Simplify the contour using approxPolyDP
-                    epsilon = 0.0005 * cv2.arcLength(contour, True)  # Adjust epsilon for simplification level
-                    simplified_contour = cv2.approxPolyDP(contour, epsilon, True)
-
-                    # Convert contour points to a list of tuples
-                    simplified_contour = [(int(point[0][0]), int(point[0][1])) for point in simplified_contour]
-                    polygons.append(simplified_contour)
-            image_info.data_coordinates[selected_observation_index].mask_polygon = polygons
-        self.__draw_overlays()
+    def __get_changed_intervals(self, intervals: list, fingerprints: list, keys: list) -> list:
+        """
+        Returns for every intervall, if its fingerprint differs from the last tracking.
+        An unchanged intervall, which overlaps a changed one of the same observation, is tracked again as well,
+        because the changed one overwrites the masks of the shared frames.
+        """
+        changed = [self.tracking_fingerprints.get(key) != fingerprint for key, fingerprint in zip(keys, fingerprints)]
+
+        # Repeated until nothing is added, as an intervall tracked again can overlap further ones
+        added = [i for i, is_changed in enumerate(changed) if is_changed]
+        while added:
+            changed_intervals = {}      # observation index: IntervalIndex of its changed intervals
+            for i, (observation_index, start_frame_index, end_frame_index) in enumerate(intervals):
+                if changed[i]:
+                    changed_intervals.setdefault(observation_index, []).append((start_frame_index, end_frame_index))
+            changed_intervals = {observation_index: IntervalIndex(observation_intervals) for observation_index, observation_intervals in changed_intervals.items()}
+
+            added = []
+            for i, (observation_index, start_frame_index, end_frame_index) in enumerate(intervals):
+                if not changed[i] and observation_index in changed_intervals and changed_intervals[observation_index].overlaps(start_frame_index, end_frame_index):
+                    added.append(i)
+            for i in added:
+                changed[i] = True
+
+        return changed
+
+    def __get_intervall_indexes(self, start_frame_num: int, end_frame_num: int) -> tuple:
+        """Returns the indexes of the first and last frame of an intervall, or None for frames which are not loaded."""
+        frame_index = self.__get_frame_index()
+        return frame_index.get_index(start_frame_num), frame_index.get_index(end_frame_num)
 
     def __eval_video_tracking(self, state = True):
         """state -> if the video tracking result is good (= True) or bad (= False)"""
@@ -1243,6 +1515,13 @@ class MainWindow:
             self.json_annotation_manager.add_to_info(key="Skipped", value="True")
 
         self.run_next_loop = run_next_loop
+
+        # Running jobs may still write frames or use SAM2
+        self.job_runner.shutdown()
+        self.mask_converter.shutdown()
+
+        if self.frame_store is not None:
+            self.frame_store.close()
         
         self.sam_model.cleanup()
         self.root.quit()
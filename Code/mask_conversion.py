@@ -0,0 +1,185 @@
+import hashlib
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import cv2
+import numpy as np
+from mask_rle import encode_mask
+
+
+EPSILON_FACTOR = 0.0005     # Simplification of the contours, relative to their length
+
+
+def mask_to_polygons(mask, keep_holes: bool = False, epsilon_factor: float = EPSILON_FACTOR) -> list:
+    """
+    Returns the simplified contours of a mask as int32 arrays of shape (points, 2).
+    With keep_holes, the holes are returned as well. OpenCV orients them the other way around than the outer contours,
+    which is how DrawImageInfo tells them apart.
+    """
+    mask = np.squeeze(mask)
+    bounding_box = _get_bounding_box(mask)
+    if bounding_box is None:
+        return []
+    return _find_polygons(mask, bounding_box, keep_holes, epsilon_factor)
+
+
+def polygons_to_lists(polygons: list) -> list:
+    """Converts polygon arrays into lists of [x, y] lists, as they are stored in the JSON."""
+    return [polygon.tolist() if isinstance(polygon, np.ndarray) else polygon for polygon in polygons]
+
+
+def _get_bounding_box(mask: np.ndarray):
+    # Only the rows and columns with mask pixels are searched for contours
+    rows = np.flatnonzero(mask.any(axis=1))
+    if len(rows) == 0:
+        return None
+    columns = np.flatnonzero(mask[rows[0]:rows[-1] + 1].any(axis=0))
+    return rows[0], rows[-1] + 1, columns[0], columns[-1] + 1
+
+
+def _find_polygons(mask: np.ndarray, bounding_box: tuple, keep_holes: bool, epsilon_factor: float) -> list:
+    top, bottom, left, right = bounding_box
+    cropped_mask = mask[top:bottom, left:right]
+    # A bool mask is used as uint8 without copying it
+    cropped_mask = np.ascontiguousarray(cropped_mask.view(np.uint8) if cropped_mask.dtype == bool else cropped_mask.astype(np.uint8))
+
+    mode = cv2.RETR_CCOMP if keep_holes else cv2.RETR_EXTERNAL
+    contours, _ = cv2.findContours(cropped_mask, mode, cv2.CHAIN_APPROX_SIMPLE, offset=(int(left), int(top)))
+    polygons = []
+    for contour in contours:
+        epsilon = epsilon_factor * cv2.arcLength(contour, True)
+        polygons.append(cv2.approxPolyDP(contour, epsilon, True).reshape(-1, 2).astype(np.int32))
+    return polygons
+
+
+class MaskConverter:
+    """
+    This class converts the masks of the tracking into polygons on a pool of workers, while the tracking continues.
+    OpenCV releases the GIL while it searches contours, so threads convert in parallel without copying the masks.
+    use_processes runs the conversion in worker processes instead, which copies every mask once.
+    Masks, whose pixels did not change since the last conversion of the same frame and object, keep their polygons.
+    With output "rle", the masks are run length encoded instead (None for empty masks), the polygons are derived when they are drawn.
+    """
+    def __init__(self, num_workers: int = 0, keep_holes: bool = False, use_processes: bool = False, max_pending_frames: int = 64, epsilon_factor: float = EPSILON_FACTOR, output: str = "polygon"):
+        self.num_workers = num_workers if num_workers > 0 else (os.cpu_count() or 1)
+        self.output = output
+        self.keep_holes = keep_holes
+        self.use_processes = use_processes
+        self.max_pending_frames = max_pending_frames      # Tracked frames, whose conversion is not finished, before the tracking waits
+        self.epsilon_factor = epsilon_factor
+        self.converted_count = 0
+        self.reused_count = 0
+        self.__executor = None
+        self.__polygons = {}        # (frame index, object index): (hash of the mask, polygons)
+
+    def convert(self, mask, key=None) -> list:
+        """Converts one mask on the calling thread. With a key, the polygons of an unchanged mask are reused."""
+        mask = np.squeeze(mask)
+        bounding_box = _get_bounding_box(mask)
+        mask_hash = self.__hash_mask(mask, bounding_box) if key is not None else None
+        if key is not None and self.__polygons.get(key, (None,))[0] == mask_hash:
+            self.reused_count += 1
+            return self.__polygons[key][1]
+
+        if self.output == "rle":
+            polygons = None if bounding_box is None else encode_mask(mask)
+        else:
+            polygons = [] if bounding_box is None else _find_polygons(mask, bounding_box, self.keep_holes, self.epsilon_factor)
+        self.converted_count += 1
+        if key is not None:
+            self.__polygons[key] = (mask_hash, polygons)
+        return polygons
+
+    def convert_iter(self, tracking):
+        """
+        Converts the masks of a tracking generator, which yields (frame index, {object index: mask}), on the workers.
+        Yields (frame index, {object index: polygons}) in the order of the tracking. When the consumer stops early,
+        the pending conversions are cancelled, the tracking generator itself has to be closed by the caller.
+        """
+        pending = deque()
+        try:
+            for frame_index, masks in tracking:
+                pending.append((frame_index, {object_index: self.__submit(mask, (frame_index, object_index)) for object_index, mask in masks.items()}))
+
+                # Finished frames are handed on at once, the tracking only waits if too many frames are pending
+                while pending and (len(pending) > self.max_pending_frames or all(conversion[0].done() for conversion in pending[0][1].values())):
+                    yield self.__collect(*pending.popleft())
+
+            while pending:
+                yield self.__collect(*pending.popleft())
+        finally:
+            for _, conversions in pending:
+                for conversion in conversions.values():
+                    conversion[0].cancel()
+
+    def clear(self):
+        """Forgets the converted polygons, e.g. when other frames are loaded."""
+        self.__polygons = {}
+
+    def shutdown(self):
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=True, cancel_futures=True)
+            self.__executor = None
+
+    def __submit(self, mask, key: tuple) -> tuple:
+        """Returns (future, key, hash of the mask, offset of the polygons) of the conversion. Unchanged masks are not converted again."""
+        mask = np.squeeze(mask)
+        bounding_box = _get_bounding_box(mask)
+        mask_hash = self.__hash_mask(mask, bounding_box)
+        cached = self.__polygons.get(key)
+        if cached is not None and cached[0] == mask_hash:
+            self.reused_count += 1
+            return _DoneFuture(cached[1]), key, mask_hash, None
+
+        self.converted_count += 1
+        if bounding_box is None:
+            return _DoneFuture(None if self.output == "rle" else []), key, mask_hash, None
+        if self.output == "rle":
+            return self.__get_executor().submit(encode_mask, mask), key, mask_hash, None
+        if self.use_processes:
+            # Only the part with mask pixels is sent to the worker process
+            top, bottom, left, right = bounding_box
+            cropped_mask = np.ascontiguousarray(mask[top:bottom, left:right])
+            future = self.__get_executor().submit(_find_polygons, cropped_mask, (0, bottom - top, 0, right - left), self.keep_holes, self.epsilon_factor)
+            return future, key, mask_hash, np.array((left, top), dtype=np.int32)
+        return self.__get_executor().submit(_find_polygons, mask, bounding_box, self.keep_holes, self.epsilon_factor), key, mask_hash, None
+
+    def __collect(self, frame_index: int, conversions: dict) -> tuple:
+        polygons = {}
+        for object_index, (future, key, mask_hash, offset) in conversions.items():
+            object_polygons = future.result()
+            if offset is not None:
+                object_polygons = [polygon + offset for polygon in object_polygons]
+            self.__polygons[key] = (mask_hash, object_polygons)
+            polygons[object_index] = object_polygons
+        return frame_index, polygons
+
+    def __get_executor(self):
+        if self.__executor is None:
+            executor_class = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+            self.__executor = executor_class(max_workers=self.num_workers)
+        return self.__executor
+
+    def __hash_mask(self, mask: np.ndarray, bounding_box) -> bytes:
+        # Only the part with mask pixels is hashed, together with its position. Packed into bits first, which is faster than hashing every byte
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(f"{mask.shape}{bounding_box}".encode())
+        if bounding_box is not None:
+            top, bottom, left, right = bounding_box
+            hasher.update(np.packbits(mask[top:bottom, left:right]).tobytes())
+        return hasher.digest()
+
+
+class _DoneFuture:
+    """Result of a conversion, which was not needed, because the mask is empty or did not change."""
+    def __init__(self, result):
+        self.__result = result
+
+    def done(self) -> bool:
+        return True
+
+    def result(self):
+        return self.__result
+
+    def cancel(self) -> bool:
+        return False
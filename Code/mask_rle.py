@@ -0,0 +1,114 @@
+import numpy as np
+
+
+def encode_mask(mask) -> dict:
+    """
+    Encodes a mask as COCO run length encoding: {"size": [height, width], "counts": string}.
+    The runs go column by column, starting with a run of 0, and are compressed into a string like pycocotools does it,
+    so the result can be used as segmentation in COCO annotations.
+    """
+    mask = np.asarray(mask)
+    # Masks of SAM2 have the shape (1, height, width)
+    height, width = mask.shape[-2:]
+    mask = mask.reshape(height, width)
+
+    rows = np.flatnonzero(mask.any(axis=1))
+    if len(rows) == 0:
+        return {"size": [int(height), int(width)], "counts": _counts_to_string([height * width])}
+
+    # Only the bounding box of the mask is searched for runs. With a row of 0 above and below, no run continues
+    # into the next column, so the runs are found in one pass over the box
+    top, bottom = rows[0], rows[-1] + 1
+    columns = np.flatnonzero(mask[top:bottom].any(axis=0))
+    left, right = columns[0], columns[-1] + 1
+    padded_height = bottom - top + 2
+    padded_mask = np.zeros((padded_height, right - left), dtype=bool)
+    padded_mask[1:-1] = mask[top:bottom, left:right]
+    pixels = padded_mask.ravel(order="F")
+    changes = np.flatnonzero(pixels[1:] != pixels[:-1]) + 1
+
+    # Positions in the box to positions in the whole mask, column by column
+    changes = (left + changes // padded_height) * height + top + changes % padded_height - 1
+    run_starts, run_ends = changes[0::2], changes[1::2]
+    # Runs, which end at the bottom of a column and go on at the top of the next one, are one run in the whole mask
+    is_continued = run_starts[1:] == run_ends[:-1]
+    run_starts = run_starts[np.concatenate(([True], ~is_continued))]
+    run_ends = run_ends[np.concatenate((~is_continued, [True]))]
+
+    boundaries = np.empty(2 * len(run_starts) + 2, dtype=np.int64)
+    boundaries[0], boundaries[-1] = 0, height * width
+    boundaries[1:-1:2], boundaries[2:-1:2] = run_starts, run_ends
+    counts = np.diff(boundaries)
+    if counts[-1] == 0:
+        counts = counts[:-1]
+    return {"size": [int(height), int(width)], "counts": _counts_to_string(counts.tolist())}
+
+
+def decode_mask(mask_rle: dict) -> np.ndarray:
+    """Decodes a COCO run length encoding, compressed or as list of counts, into a boolean mask."""
+    height, width = mask_rle["size"]
+    counts = mask_rle["counts"]
+    if isinstance(counts, str):
+        counts = _string_to_counts(counts)
+
+    values = np.zeros(len(counts), dtype=bool)
+    values[1::2] = True
+    pixels = np.repeat(values, counts)
+    if len(pixels) != height * width:
+        raise ValueError(f"Run length encoding has {len(pixels)} pixels, but the size is {height}x{width}")
+    return pixels.reshape((height, width), order="F")
+
+
+def get_area(mask_rle: dict) -> int:
+    """Number of mask pixels, without decoding the mask."""
+    counts = mask_rle["counts"]
+    if isinstance(counts, str):
+        counts = _string_to_counts(counts)
+    return int(sum(counts[1::2]))
+
+
+def get_bounding_box(mask_rle: dict) -> list:
+    """[x, y, width, height] of the mask pixels, as in COCO annotations."""
+    mask = decode_mask(mask_rle)
+    rows = np.flatnonzero(mask.any(axis=1))
+    if len(rows) == 0:
+        return [0, 0, 0, 0]
+    columns = np.flatnonzero(mask.any(axis=0))
+    return [int(columns[0]), int(rows[0]), int(columns[-1] - columns[0] + 1), int(rows[-1] - rows[0] + 1)]
+
+
+def _counts_to_string(counts: list) -> str:
+    # Every count is stored as the difference to the count two runs before, in 5 bit chunks with a continuation bit
+    characters = []
+    for i, count in enumerate(counts):
+        value = count - counts[i - 2] if i > 2 else count
+        more = True
+        while more:
+            chunk = value & 0x1f
+            value >>= 5
+            more = value != -1 if chunk & 0x10 else value != 0
+            if more:
+                chunk |= 0x20
+            characters.append(chr(chunk + 48))
+    return "".join(characters)
+
+
+def _string_to_counts(string: str) -> list:
+    counts = []
+    position = 0
+    while position < len(string):
+        value = 0
+        shift = 0
+        more = True
+        while more:
+            chunk = ord(string[position]) - 48
+            value |= (chunk & 0x1f) << shift
+            more = chunk & 0x20
+            position += 1
+            shift += 5
+            if not more and chunk & 0x10:
+                value |= -1 << shift
+        if len(counts) > 2:
+            value += counts[-2]
+        counts.append(value)
+    return counts
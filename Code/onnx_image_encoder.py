@@ -0,0 +1,107 @@
+import argparse
+import os
+import time
+import numpy as np
+import torch
+
+
+class OnnxImageEncoder:
+    """
+    This class runs the SAM2 image encoder with ONNX Runtime on the CPU, instead of PyTorch.
+    It replaces forward_image of the SAM2 model, which the video and the image predictor both call for every new image,
+    and returns the same backbone outputs, so everything after the image encoder stays unchanged.
+    The ONNX file is created from the checkpoint with export_image_encoder, optionally quantized to int8 with quantize_image_encoder.
+    """
+    def __init__(self, onnx_filepath: str, device="cpu", num_threads: int = 0):
+        # Only needed, if an ONNX image encoder is set in the config
+        import onnxruntime # type: ignore
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+
+        self.session = onnxruntime.InferenceSession(onnx_filepath, options, providers=["CPUExecutionProvider"])
+        self.device = torch.device(device)
+        self.input_name = self.session.get_inputs()[0].name
+        output_names = [output.name for output in self.session.get_outputs()]
+        self.level_count = len(output_names) // 2
+        print(f"Loaded ONNX image encoder {onnx_filepath} with {self.level_count} feature levels")
+
+    def attach(self, model):
+        """Lets the SAM2 model use this encoder from now on."""
+        model.forward_image = self.forward_image
+
+    def forward_image(self, img_batch: torch.Tensor) -> dict:
+        # The encoder is exported for one image, a batch is encoded image by image
+        outputs = [self.session.run(None, {self.input_name: image[None].detach().cpu().float().numpy()}) for image in img_batch]
+        levels = [torch.from_numpy(np.concatenate([output[i] for output in outputs])).to(self.device) for i in range(2 * self.level_count)]
+
+        backbone_fpn = levels[:self.level_count]
+        return {
+            "vision_features": backbone_fpn[-1],
+            "vision_pos_enc": levels[self.level_count:],
+            "backbone_fpn": backbone_fpn,
+        }
+
+
+class _ImageEncoderExport(torch.nn.Module):
+    # forward_image returns a dict, ONNX needs the outputs as flat tuple: first the feature levels, then their position encodings
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, image):
+        backbone_out = self.model.forward_image(image)
+        return tuple(backbone_out["backbone_fpn"]) + tuple(backbone_out["vision_pos_enc"])
+
+
+def export_image_encoder(checkpoint_filepath: str, model_filepath: str, onnx_filepath: str, opset_version: int = 17):
+    """Exports forward_image of the SAM2 model, the image encoder with its feature pyramid, from the checkpoint to an ONNX file."""
+    from sam2.build_sam import build_sam2 # type: ignore
+
+    model = build_sam2(model_filepath, checkpoint_filepath, device="cpu")
+    model.eval()
+    image = torch.randn(1, 3, model.image_size, model.image_size)
+
+    export_module = _ImageEncoderExport(model)
+    with torch.no_grad():
+        level_count = len(export_module(image)) // 2
+        output_names = [f"backbone_fpn_{i}" for i in range(level_count)] + [f"vision_pos_enc_{i}" for i in range(level_count)]
+        torch.onnx.export(export_module, (image,), onnx_filepath, input_names=["image"], output_names=output_names, opset_version=opset_version)
+    print(f"Exported image encoder to {onnx_filepath}")
+
+
+def quantize_image_encoder(onnx_filepath: str, quantized_filepath: str):
+    """Quantizes the weights of the exported image encoder to int8. The activations are quantized at runtime."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic # type: ignore
+
+    quantize_dynamic(onnx_filepath, quantized_filepath, weight_type=QuantType.QInt8)
+    print(f"Quantized image encoder to {quantized_filepath}")
+
+
+def main():
+    # Imported here, so the encoder can be used without the labeling tool
+    from main import load_config
+
+    parser = argparse.ArgumentParser(description="Exports the image encoder of the SAM2 checkpoint in the config to ONNX.")
+    parser.add_argument("output", nargs="?", help="Path of the ONNX file, by default onnx_image_encoder of the config")
+    parser.add_argument("--quantize", action="store_true", help="Also write an int8 quantized version next to it")
+    args = parser.parse_args()
+
+    config = load_config()
+    onnx_filepath = args.output or config["settings"].get("onnx_image_encoder")
+    if not onnx_filepath:
+        print("Error: Pass the output path, or set onnx_image_encoder in the config!")
+        return
+
+    start = time.perf_counter()
+    export_image_encoder(config["sam_model_paths"]["sam2_checkpoint"], config["sam_model_paths"]["model_cfg"], onnx_filepath)
+    if args.quantize:
+        root, extension = os.path.splitext(onnx_filepath)
+        quantize_image_encoder(onnx_filepath, f"{root}_int8{extension}")
+    print(f"Done in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,17 @@
 import os
+import sys
 import json
 import numpy as np
 from skimage import measure
 from PIL import Image
 import cv2
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from mask_rle import encode_mask, get_area, get_bounding_box
+
+# Store every mask as one COCO run length encoding, which is exact, instead of the polygons of its contours
+USE_RLE = False
+
 # Initialize COCO format dictionary
 coco = {
     "info": {
@@ -110,6 +117,20 @@ def process_masks(frame_dir, mask_dir):
             # Process mask
             mask_path = os.path.join(masks_dir, mask_filename)
             mask = np.array(Image.open(mask_path).convert('1'))  # Convert to binary
+
+            if USE_RLE:
+                mask_rle = encode_mask(mask)
+                coco['annotations'].append({
+                    "id": annotation_id,
+                    "image_id": image_id,
+                    "category_id": get_category_id(category_name),
+                    "segmentation": mask_rle,
+                    "bbox": get_bounding_box(mask_rle),
+                    "area": get_area(mask_rle),
+                    "iscrowd": 0
+                })
+                annotation_id += 1
+                continue
             
             # Find contours (bounding polygons)
             contours = measure.find_contours(mask, 0.5)
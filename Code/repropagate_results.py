@@ -0,0 +1,290 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from image_info import ImageInfo
+from interval_index import FrameIndex
+from json_annotation_manager import recover_journal
+from damage_info import DamageInfo
+from mask_conversion import MaskConverter, polygons_to_lists
+
+
+FRAME_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp')
+STATE_FILE_NAME = "repropagation state.json"
+
+
+class RepropagationState:
+    """
+    Remembers which sessions were already re-propagated with which checkpoint, so an interrupted run continues where it stopped.
+    A session is done, if it was propagated with the same checkpoint and its JSON was not changed since then.
+    """
+    def __init__(self, state_path: str, checkpoint_key: str):
+        self.state_path = state_path
+        self.checkpoint_key = checkpoint_key
+        self.__sessions = {}
+
+        if os.path.exists(state_path):
+            try:
+                with open(state_path, "r") as file:
+                    self.__sessions = json.load(file)
+            except Exception as e:
+                print(f"Error: Could not read {state_path}, all sessions are propagated again: {e}")
+
+    def is_done(self, json_path: str) -> bool:
+        entry = self.__sessions.get(self.__get_session_name(json_path))
+        return entry is not None and entry["checkpoint"] == self.checkpoint_key and entry["json_hash"] == hash_file(json_path)
+
+    def mark_done(self, json_path: str):
+        self.__sessions[self.__get_session_name(json_path)] = {"checkpoint": self.checkpoint_key, "json_hash": hash_file(json_path)}
+        write_json_atomic(self.state_path, self.__sessions)
+
+    def __get_session_name(self, json_path: str) -> str:
+        return os.path.basename(os.path.dirname(json_path))
+
+
+class SessionRepropagator:
+    """
+    This class tracks all observations of a labeled session again, from the points and instance intervals in its JSON,
+    and replaces the masks of the tracked frames. It works on the JSON and the frame files only, without a window.
+    The masks are stored the way the mask converter outputs them, as run length encoding or as polygons.
+    """
+    def __init__(self, sam_model, mask_converter: MaskConverter = None):
+        self.sam_model = sam_model
+        self.mask_converter = mask_converter or MaskConverter()
+
+    def repropagate(self, folder_path: str) -> dict:
+        """
+        Re-propagates one session folder, which contains the "source images" and the JSON named like the folder.
+        Returns the number of frames, tracked objects and tracked frames.
+        """
+        frame_dir = os.path.join(folder_path, "source images")
+        json_path = get_json_path(folder_path)
+        # Changes of a session, which crashed, are only in its journal
+        recover_journal(json_path)
+        with open(json_path, "r") as file:
+            json_data = json.load(file)
+
+        image_infos = self.__create_image_infos(frame_dir, json_data)
+        observations = self.__get_observations(json_data)
+        intervals = self.__get_interval_indexes(image_infos, observations, json_data["Info"].get("Instance Intervals", {}))
+        stats = {"frames": len(image_infos), "objects": len(intervals), "tracked_frames": 0}
+        if not intervals:
+            return stats
+
+        self.sam_model.load(frame_dir)
+        # The polygons the converter kept are of the frames of the last session
+        self.mask_converter.clear()
+        tracking = self.sam_model.track_all_objects_iter(image_infos, intervals)
+        conversion = self.mask_converter.convert_iter(tracking)
+        try:
+            for out_frame_idx, masks in conversion:
+                frame_data = self.__get_frame_data(json_data, image_infos[out_frame_idx])
+                for observation_index, mask in masks.items():
+                    coordinate_dict = frame_data["Observations"].setdefault(observations[observation_index], {})
+                    # The old mask is replaced, in whichever format it was stored
+                    coordinate_dict.pop("Mask Polygon", None)
+                    coordinate_dict.pop("Mask RLE", None)
+                    if not mask:
+                        continue
+                    if self.mask_converter.output == "rle":
+                        coordinate_dict["Mask RLE"] = mask
+                    else:
+                        coordinate_dict["Mask Polygon"] = polygons_to_lists(mask)
+                stats["tracked_frames"] += 1
+        finally:
+            conversion.close()
+            tracking.close()
+            self.sam_model.reset_predictor_state()
+
+        write_json_atomic(json_path, json_data)
+        return stats
+
+    def __create_image_infos(self, frame_dir: str, json_data: dict) -> list:
+        """Rebuilds the ImageInfos with the points of every observation, the same way the MainWindow loads a session."""
+        observations = self.__get_observations(json_data)
+        image_infos = []
+        for file in sorted(os.listdir(frame_dir)):
+            if not file.lower().endswith(FRAME_EXTENSIONS):
+                continue
+            image_info = ImageInfo(os.path.join(frame_dir, file))
+            image_info.image_index = len(image_infos)
+
+            frame_data = json_data.get(str(image_info.frame_num)) or {}
+            for observation in observations:
+                damage_info = DamageInfo(observation)
+                points = frame_data.get("Observations", {}).get(observation, {}).get("Points", {})
+                damage_info.positive_point_coordinates = points.get("1") or []
+                damage_info.negative_point_coordinates = points.get("0") or []
+                image_info.data_coordinates.append(damage_info)
+            image_infos.append(image_info)
+        return image_infos
+
+    def __get_observations(self, json_data: dict) -> list:
+        # In the order the MainWindow shows them, so the indexes match the DamageInfos of every frame
+        observations = list(json_data["Info"].get("Instance Intervals", {}).keys())
+        for key, value in json_data.items():
+            if key == "Info":
+                continue
+            for observation in value.get("Observations", {}):
+                if observation not in observations:
+                    observations.append(observation)
+        return observations
+
+    def __get_interval_indexes(self, image_infos: list, observations: list, split_intervals: dict) -> list:
+        """
+        Converts the intervalls from frame numbers into frame indexes. Intervall bounds of frames which were not extracted
+        are snapped onto the extracted frames like the MainWindow does, so both track the same frames.
+        """
+        frame_index = FrameIndex([image_info.frame_num for image_info in image_infos])
+        intervals = []
+        for observation, observation_intervals in split_intervals.items():
+            observation_index = observations.index(observation)
+            for start_frame_num, end_frame_num in observation_intervals:
+                frame_indexes = frame_index.snap(start_frame_num, end_frame_num)
+                if frame_indexes is None:
+                    print(f"Skipping intervall {start_frame_num} - {end_frame_num} of {observation}: it lies outside of the extracted frames")
+                    continue
+                intervals.append((observation_index, *frame_indexes))
+        return intervals
+
+    def __get_frame_data(self, json_data: dict, image_info: ImageInfo) -> dict:
+        key = str(image_info.frame_num)
+        if key not in json_data:
+            json_data[key] = {"File Name": image_info.image_name, "Observations": {}}
+        json_data[key].setdefault("Observations", {})
+        return json_data[key]
+
+
+def get_json_path(folder_path: str) -> str:
+    return os.path.join(folder_path, f"{os.path.basename(folder_path)}.json")
+
+
+def find_sessions(results_dir: str) -> list:
+    """Returns the session folders in the results directory, which have frames and a JSON and were not skipped while labeling."""
+    sessions = []
+    for folder_name in sorted(os.listdir(results_dir)):
+        folder_path = os.path.join(results_dir, folder_name)
+        if not os.path.isdir(os.path.join(folder_path, "source images")) or not os.path.exists(get_json_path(folder_path)):
+            continue
+        sessions.append(folder_path)
+    return sessions
+
+
+def hash_file(path: str) -> str:
+    hasher = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def get_checkpoint_key(config: dict) -> str:
+    """Identifies the checkpoint, a retrained checkpoint at the same path has another size or modification time."""
+    checkpoint_filepath = config["sam_model_paths"]["sam2_checkpoint"]
+    key = f"{os.path.abspath(checkpoint_filepath)}|{os.path.basename(config['sam_model_paths']['model_cfg'])}"
+    if os.path.exists(checkpoint_filepath):
+        key += f"|{os.path.getsize(checkpoint_filepath)}|{os.path.getmtime(checkpoint_filepath)}"
+    return key
+
+
+def write_json_atomic(path: str, data):
+    """Writes the JSON to a temporary file and replaces the old file at once, so an interruption never leaves a half written file."""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as outfile:
+        json.dump(data, outfile, indent=4)
+    os.replace(temp_path, path)
+
+
+_worker_repropagator = None
+
+
+def create_mask_converter(config: dict, num_workers: int = 0) -> MaskConverter:
+    settings = config["settings"]
+    return MaskConverter(num_workers=num_workers or settings.get("mask_conversion_workers", 0), keep_holes=settings.get("keep_mask_holes", False), output=settings.get("mask_storage", "rle"))
+
+
+def _init_worker(config: dict):
+    # Every worker process loads its own model once, and converts the masks on a single thread, as the other processes use the other cores
+    global _worker_repropagator
+    from main import create_local_sam_model
+    _worker_repropagator = SessionRepropagator(create_local_sam_model(config), create_mask_converter(config, num_workers=1))
+
+
+def _repropagate_in_worker(folder_path: str) -> dict:
+    return _worker_repropagator.repropagate(folder_path)
+
+
+def run(config: dict, results_dir: str, num_workers: int = 1, force: bool = False):
+    """Re-propagates all sessions in the results directory, which are not done with the current checkpoint yet."""
+    state = RepropagationState(os.path.join(results_dir, STATE_FILE_NAME), get_checkpoint_key(config))
+    sessions = []
+    for folder_path in find_sessions(results_dir):
+        recover_journal(get_json_path(folder_path))
+        with open(get_json_path(folder_path), "r") as file:
+            is_skipped = json.load(file).get("Info", {}).get("Skipped") == "True"
+        if is_skipped:
+            continue
+        if not force and state.is_done(get_json_path(folder_path)):
+            continue
+        sessions.append(folder_path)
+
+    if not sessions:
+        print("All sessions are already re-propagated with this checkpoint.")
+        return
+    print(f"Re-propagating {len(sessions)} sessions with {num_workers} worker(s)")
+
+    start = time.perf_counter()
+    done_count = 0
+
+    def report(folder_path, stats):
+        nonlocal done_count
+        done_count += 1
+        state.mark_done(get_json_path(folder_path))
+        hours = (time.perf_counter() - start) / 3600
+        print(f"[{done_count}/{len(sessions)}] {os.path.basename(folder_path)}: {stats['objects']} objects, "
+              f"{stats['tracked_frames']} of {stats['frames']} frames tracked | {done_count / max(hours, 1e-9):.1f} sessions/hour")
+
+    if num_workers <= 1:
+        from main import create_local_sam_model
+        repropagator = SessionRepropagator(create_local_sam_model(config), create_mask_converter(config))
+        for folder_path in sessions:
+            try:
+                report(folder_path, repropagator.repropagate(folder_path))
+            except Exception as e:
+                print(f"Error: Could not re-propagate {folder_path}: {e}")
+    else:
+        # Spawn, so no worker inherits a CUDA context of this process
+        with ProcessPoolExecutor(max_workers=num_workers, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker, initargs=(config,)) as executor:
+            futures = {executor.submit(_repropagate_in_worker, folder_path): folder_path for folder_path in sessions}
+            for future in as_completed(futures):
+                try:
+                    report(futures[future], future.result())
+                except Exception as e:
+                    print(f"Error: Could not re-propagate {futures[future]}: {e}")
+
+    hours = (time.perf_counter() - start) / 3600
+    print(f"Re-propagated {done_count} of {len(sessions)} sessions in {hours * 60:.1f} min, {done_count / max(hours, 1e-9):.1f} sessions/hour")
+
+
+def main():
+    from main import load_config
+
+    parser = argparse.ArgumentParser(description="Tracks all labeled sessions in a results directory again with the checkpoint of the config, without opening a window.")
+    parser.add_argument("results_dir", nargs="?", help="Directory with one folder per session, by default the results folder in output_path of the config")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes, each loads its own model")
+    parser.add_argument("--force", action="store_true", help="Also propagate sessions, which were already propagated with this checkpoint")
+    args = parser.parse_args()
+
+    config = load_config()
+    results_dir = args.results_dir or os.path.join(config["default_paths"]["output_path"], "results")
+    if not os.path.isdir(results_dir):
+        print(f"Error: Results directory {results_dir} does not exist!")
+        return
+    run(config, results_dir, args.workers, args.force)
+
+
+if __name__ == "__main__":
+    main()
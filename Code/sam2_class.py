@@ -2,30 +2,66 @@ import torch
 from sam2.build_sam import build_sam2_video_predictor # type: ignore
 import numpy as np
 import gc
+import os
+import tempfile
+from contextlib import nullcontext
+from PIL import Image
 from image_info import ImageInfo
+from frame_store import FrameStore
+from tracking_planner import TrackedObject, TrackingPlanner
+from embedding_cache import EmbeddingCache
+from segmentation_predictor import get_prompt_fingerprint
+from onnx_image_encoder import OnnxImageEncoder
+
 
 class Sam2Class:
     """
     This Class manages the interaction with SAM2.
     Here the given parameters will be formattet correctly and when propagating through the video, will set up SAM according to the intervall it currently tracks.
     """
-    def __init__(self, checkpoint_filepath: str, model_filepath: str):
+    def __init__(self, checkpoint_filepath: str, model_filepath: str, offload_video_to_cpu: bool = False, offload_state_to_cpu: bool = False, prune_tracking_memory: bool = True, embedding_cache: EmbeddingCache = None, device: str = None, onnx_encoder_filepath: str = None, onnx_threads: int = 0):
         # Initialize the predictor as needed
+        # cuda, mps or cpu, by default the fastest one available
+        self.device = self.__select_device(device)
 
         self.frame_dir = None
-        torch.autocast(device_type="cuda", dtype=torch.bfloat16).__enter__()
+        self.frame_paths = []
+        self.frame_store = None
+        self.frames_version = 0             # Counts up every time the frames are loaded, so prompt fingerprints of older frames do not match
+
+        # Keep the frames and / or the tracking outputs in the RAM instead of the GPU memory
+        self.offload_video_to_cpu = offload_video_to_cpu
+        self.offload_state_to_cpu = offload_state_to_cpu
+        # Drop the outputs of tracked frames, which SAM2 does not use as memory anymore, so long intervals do not fill the memory
+        self.prune_tracking_memory = prune_tracking_memory
+        self.tracking_planner = TrackingPlanner()
+        self.last_tracking_plan = None      # Planned and executed sweeps of the last tracking, for benchmarking
+        # Image features of already encoded frames are read from the disk instead of running the image encoder again
+        self.embedding_cache = embedding_cache
+        self.__frame_keys = {}              # frame index: hash of the frame file, for the embedding cache
+        self.__is_cache_paused = False      # Set while init_state runs on a temporary folder, whose frame is not one of the session
+        self.__vision_pos_enc = None
         self.initialized = False
 
         self.__setup_torch()
+        self.model_key = f"{os.path.abspath(checkpoint_filepath)}|{os.path.basename(model_filepath)}"
         self.initialized = self.__load_model(checkpoint_filepath, model_filepath)
 
         if not self.initialized:
             raise Exception("Error: Segmentation Model couldnt be loaded!")
+
+        # The image encoder is the slowest part on the cpu, ONNX Runtime runs it faster, or quantized even more
+        if onnx_encoder_filepath:
+            OnnxImageEncoder(onnx_encoder_filepath, self.device, onnx_threads).attach(self.predictor)
+
+        if self.embedding_cache is not None:
+            self.__use_embedding_cache()
         
-    def load(self, frame_dir=None):
+    def load(self, frame_dir=None, frame_store: FrameStore = None):
         """
             Initialize SAM2:
                 Load the images from the given directory and set inference state to its starting values.
+                If a frame store is given, the already decoded frames are used instead of reading the files again.
             Needed:
                 - When initializing SAM2
                 - When changing the frame_dir, or the images in it.
@@ -37,14 +73,64 @@ class Sam2Class:
         elif frame_dir:
             self.frame_dir = frame_dir
 
-        self.inference_state = self.predictor.init_state(video_path=self.frame_dir)
+        if frame_store is not None:
+            self.frame_store = frame_store
+
+        self.__frame_keys = {}
+        self.frames_version += 1
+
+        if self.frame_store is not None and self.frame_store.frame_dir == self.frame_dir and len(self.frame_store) > 0:
+            self.frame_paths = self.frame_store.get_frame_paths()
+            images, video_height, video_width = self.__load_frames_from_store(self.frame_paths)
+            self.inference_state = self.__init_state_from_frames(images, video_height, video_width)
+        else:
+            # The frame paths are set first, init_state already computes the features of the first frame
+            self.frame_paths = self.__list_frame_paths(self.frame_dir)
+            self.inference_state = self.__init_state()
+        self.reset_predictor_state()
+
+    def update_frames(self, frame_paths: list):
+        """
+            Updates the loaded frames to the given list of frame files, without initializing SAM2 on the whole directory again.
+            Frames which are already loaded are kept, only the new ones are read and preprocessed.
+            Needed:
+                - When frames were added to or removed from the start or end of the frame_dir
+        """
+        if not hasattr(self, "inference_state"):
+            self.load()
+            return
+
+        images = self.inference_state["images"]
+        loaded_indexes = {os.path.normcase(os.path.abspath(path)): index for index, path in enumerate(self.frame_paths)}
+
+        new_images = []
+        new_frame_count = 0
+        for path in frame_paths:
+            index = loaded_indexes.get(os.path.normcase(os.path.abspath(path)))
+            if index is not None:
+                new_images.append(images[index])
+            else:
+                new_images.append(self.__load_frame_tensor(path).to(images.device))
+                new_frame_count += 1
+
+        if len(new_images) == 0:
+            print("Error: No frames given!")
+            return
+
+        self.__set_state_frames(self.inference_state, torch.stack(new_images))
+        self.frame_paths = list(frame_paths)
         self.reset_predictor_state()
 
-    def add_points(self, image_info: ImageInfo):
+        print(f"Updated SAM2 frames: {new_frame_count} new, {len(new_images)} total")
+
+    def add_points(self, image_info: ImageInfo, damage_index: int = None, obj_id: int = None):
         """
             Adds points to a specific frame for a specific object class to SAM2.
             The points describe SAM where the Object is, and where it is not. 
             Depending on these added points the tracking is done.
+            Args:
+                damage_index: Index of the DamageInfo whose points are added, by default the selected one
+                obj_id: Object id in SAM2, by default the index of the DamageInfo
         """
 
         if not image_info:
@@ -57,7 +143,7 @@ class Sam2Class:
         
         points, labels, selected_object_id = None, None, None
         for i, damage_info in enumerate(image_info.data_coordinates):
-            if damage_info.is_selected == True:
+            if (damage_index is None and damage_info.is_selected == True) or i == damage_index:
                 selected_object_id = i
 
                 points = damage_info.positive_point_coordinates + damage_info.negative_point_coordinates
@@ -70,23 +156,27 @@ class Sam2Class:
             print(f"Error: Points {points}, labels {labels} or frame index {frame_index} is None!")
             return
 
+        if obj_id is None:
+            obj_id = selected_object_id
+
         points_np = np.array(points, dtype=np.float32)
         labels_np = np.array(labels, dtype=np.float32)
         
         _, out_obj_ids, out_mask_logits = self.predictor.add_new_points_or_box(
             inference_state=self.inference_state,
             frame_idx=frame_index,
-            obj_id=selected_object_id,
+            obj_id=obj_id,
             points=points_np,
             labels=labels_np,
         )
 
-        mask = (out_mask_logits[0] > 0.0).cpu().numpy()
-        obj_id = out_obj_ids[0]
-
-        if obj_id != selected_object_id:
+        # With several objects, SAM2 returns the masks of all of them
+        out_obj_ids = list(out_obj_ids)
+        if obj_id not in out_obj_ids:
             print("Error: Class object IDs are not the same!")
+            return
 
+        mask = (out_mask_logits[out_obj_ids.index(obj_id)] > 0.0).cpu().numpy()
         return mask
     
     def track_objects(self, frame_infos: list, start_frame_index: int, end_frame_index: int) -> dict:
@@ -100,32 +190,99 @@ class Sam2Class:
         Returns:
             dict: keys are frame indices, values are the masks
         """
-                
+
+        video_segments = dict()
+        for out_frame_idx, masks in self.track_objects_iter(frame_infos, start_frame_index, end_frame_index):
+            video_segments[out_frame_idx] = masks
+
+        if len(video_segments) == 0:
+            return None
+        return video_segments
+
+    def track_objects_iter(self, frame_infos: list, start_frame_index: int, end_frame_index: int):
+        """
+        Same as track_objects, but yields the masks of every frame as soon as it is tracked, instead of collecting the whole intervall.
+        Together with prune_tracking_memory, the memory does not grow with the length of the intervall.
+        Yields:
+            tuple: (frame index, dict with the object ids as keys and the masks as values)
+        """
+        damage_index = self.__get_selected_damage_index(frame_infos)
+        if damage_index is None:
+            return
+
+        yield from self.track_all_objects_iter(frame_infos, [(damage_index, start_frame_index, end_frame_index)])
+
+    def track_all_objects_iter(self, frame_infos: list, intervals: list):
+        """
+        Tracks several observations and intervalls at once.
+        Every intervall of an observation, which contains points, is added to SAM2 as its own object and all objects are
+        propagated together. The TrackingPlanner merges the intervalls on the frame timeline, so every frame is propagated
+        at most once per direction and frames between the intervalls are skipped.
+        Every object only gets the masks of its own intervall, tracked from its own first frame with points.
+        Args:
+            frame_infos (list): List of ImageInfo instances
+            intervals (list): Tuples of (index of the DamageInfo, first frame index, last frame index)
+        Yields:
+            tuple: (frame index, dict with the DamageInfo indexes as keys and the masks as values)
+        """
         if not self.initialized:
             print("Error: SAM not Initialized!")
             return
-        
-        # Reset SAM and add points from the middle frame
-        self.reset_predictor_state()
-        
-        frame_indexes_with_points = self.__get_frame_infos_with_points_from_intervall(frame_infos, start_frame_index, end_frame_index)
 
-        if len(frame_indexes_with_points) < 1:
-            return None
+        # Jobs run the tracking on worker threads, where the autocast of __init__ is not active
+        with self.__autocast():
+            # Reset SAM and add the points of every intervall as its own object
+            self.reset_predictor_state()
 
-        starting_point_index = frame_indexes_with_points[0]
+            tracked_objects = []
+            for damage_index, start_frame_index, end_frame_index in intervals:
+                frame_indexes_with_points = self.__get_frames_with_points(frame_infos, damage_index, start_frame_index, end_frame_index)
+                if not frame_indexes_with_points:
+                    continue
 
-        # Add all points
-        for index in frame_indexes_with_points:
-            self.add_points(frame_infos[index])
+                tracked_object = TrackedObject(len(tracked_objects), damage_index, start_frame_index, end_frame_index, frame_indexes_with_points[0])
+                for index in frame_indexes_with_points:
+                    self.add_points(frame_infos[index], damage_index, tracked_object.obj_id)
+                tracked_objects.append(tracked_object)
 
-        # Calculate max_frame_num_to_track based on interval limits
-        max_frame_num_to_track_forwards = end_frame_index - starting_point_index
-        max_frame_num_to_track_backwards = starting_point_index - start_frame_index
+            if len(tracked_objects) == 0:
+                print("No frames with points found in the specified intervals.")
+                return
 
-        return self.__track(starting_point_index, max_frame_num_to_track_forwards, max_frame_num_to_track_backwards)
+            yield from self.__track_iter(tracked_objects)
     
     
+    def get_prompt_fingerprint(self, frame_infos: list, damage_index: int, start_frame_index: int, end_frame_index: int) -> str:
+        return get_prompt_fingerprint(self.model_key, self.frames_version, frame_infos, damage_index, start_frame_index, end_frame_index)
+
+    def prefetch_embeddings(self, frame_paths: list, frame_store: FrameStore = None, is_cancelled=None) -> int:
+        """
+        Computes the image features of frames, which are not loaded yet, into the embedding cache, e.g. the frames of the
+        next session while the current one is labeled. Loading them later finds their features in the cache.
+        is_cancelled: optional function, which stops the prefetching when it returns True
+        Returns the number of encoded frames.
+        """
+        if self.embedding_cache is None:
+            return 0
+
+        encoded_count = 0
+        with torch.inference_mode(), self.__autocast():
+            for frame_path in frame_paths:
+                if is_cancelled is not None and is_cancelled():
+                    break
+                # Same key as __get_frame_key gives the frame, once it is loaded
+                key = self.__hash_frame_file(frame_path, frame_store)
+                if key in self.embedding_cache:
+                    continue
+
+                image = self.__load_frame_tensor(frame_path, frame_store)
+                backbone_out = self.predictor.forward_image(image.to(self.predictor.device).unsqueeze(0))
+                if "vision_pos_enc" not in self.embedding_cache:
+                    self.embedding_cache.put("vision_pos_enc", backbone_out["vision_pos_enc"])
+                self.embedding_cache.put(key, backbone_out["backbone_fpn"])
+                encoded_count += 1
+        return encoded_count
+
     def reset_predictor_state(self):
         """
             Resets the predictors state:
@@ -140,12 +297,17 @@ class Sam2Class:
         Clean up GPU resources by deleting the predictor and clearing CUDA cache.
         """
         try:
+            # Features, which are still queued, are written before the process may end
+            if self.embedding_cache is not None:
+                self.embedding_cache.flush()
+
             # Delete the predictor to release GPU memory
             self.predictor.reset_state(self.inference_state)
 
             # Clear CUDA cache
             gc.collect()
-            torch.cuda.empty_cache()
+            if self.device.type == "cuda":
+                torch.cuda.empty_cache()
             print("Resources cleaned up successfully.")
         except Exception as e:
             print(f"Error during cleanup: {e}")
@@ -154,7 +316,19 @@ class Sam2Class:
         self.cleanup()
 
     # Better make a private functions all call them in here:
+    def __select_device(self, device: str = None) -> torch.device:
+        if device and device != "auto":
+            return torch.device(device)
+        if torch.cuda.is_available():
+            return torch.device("cuda")
+        if torch.backends.mps.is_available():
+            return torch.device("mps")
+        return torch.device("cpu")
+
     def __setup_torch(self):
+        print(f"using device: {self.device}")
+        if self.device.type != "cuda":
+            return
         torch.autocast(device_type="cuda", dtype=torch.bfloat16).__enter__()
         if torch.cuda.get_device_properties(0).major >= 8:
             torch.backends.cuda.matmul.allow_tf32 = True
@@ -162,79 +336,268 @@ class Sam2Class:
     
     def __load_model(self, checkpoint_filepath: str, model_filepath: str) -> bool:
         # check if both paths are not empty and exist, else print error and return False
-        self.predictor = build_sam2_video_predictor(model_filepath, checkpoint_filepath)
+        self.predictor = build_sam2_video_predictor(model_filepath, checkpoint_filepath, device=self.device)
         return True
 
-    def __track(self, starting_point_index: int, max_frame_num_to_track_forwards: int, max_frame_num_to_track_backwards: int) -> dict:
-        # Track forward and backward from the middle frame within the interval
-        video_segments = dict()
-        
-        if max_frame_num_to_track_forwards > 0:
-            # Forward tracking from the middle frame
-            for out_frame_idx, out_obj_ids, out_mask_logits in self.predictor.propagate_in_video(self.inference_state, start_frame_idx=starting_point_index, max_frame_num_to_track=max_frame_num_to_track_forwards):
-                video_segments[out_frame_idx] = {
-                    out_obj_id: (out_mask_logits[i] > 0.0).cpu().numpy()
-                    for i, out_obj_id in enumerate(out_obj_ids)
-                }
-
-        if max_frame_num_to_track_backwards > 0:
-            # Backward tracking within the interval
-            for out_frame_idx, out_obj_ids, out_mask_logits in self.predictor.propagate_in_video(self.inference_state, start_frame_idx=starting_point_index, max_frame_num_to_track=max_frame_num_to_track_backwards, reverse=True):
-                if out_frame_idx not in video_segments:
-                    video_segments[out_frame_idx] = {}
-                for i, out_obj_id in enumerate(out_obj_ids):
-                    if out_obj_id not in video_segments[out_frame_idx]:
-                        video_segments[out_frame_idx][out_obj_id] = (out_mask_logits[i] > 0.0).cpu().numpy()
+    def __use_embedding_cache(self):
+        """
+        SAM2 computes the features of a frame in _get_image_feature and keeps only the last one.
+        This wraps it, to put the cached features of a frame in place before and to store newly computed features after.
+        """
+        get_image_feature = self.predictor._get_image_feature
+
+        def get_image_feature_cached(inference_state, frame_idx, batch_size):
+            if self.__is_cache_paused:
+                return get_image_feature(inference_state, frame_idx, batch_size)
+            is_computed = frame_idx not in inference_state["cached_features"]
+            if is_computed and self.__load_cached_features(inference_state, frame_idx):
+                is_computed = False
+
+            features = get_image_feature(inference_state, frame_idx, batch_size)
+            if is_computed:
+                self.__store_features(inference_state, frame_idx)
+            return features
+
+        self.predictor._get_image_feature = get_image_feature_cached
+
+    def __get_frame_key(self, inference_state: dict, frame_idx: int) -> str:
+        # The key is the hash of the frame file. Hashing the preprocessed frame would copy it from the device for every frame
+        if frame_idx not in self.__frame_keys:
+            self.__frame_keys[frame_idx] = self.__hash_frame_file(self.frame_paths[frame_idx])
+        return self.__frame_keys[frame_idx]
+
+    def __hash_frame_file(self, frame_path: str, frame_store: FrameStore = None) -> str:
+        frame_store = frame_store if frame_store is not None else self.frame_store
+        if frame_store is not None and not os.path.exists(frame_path):
+            # The file of a frame from the frame store may still be in the writers queue
+            frame_store.flush()
+        return EmbeddingCache.hash_file(frame_path)
+
+    def __load_cached_features(self, inference_state: dict, frame_idx: int) -> bool:
+        device = inference_state["device"]
+        if self.__vision_pos_enc is None:
+            # The position encodings are the same for every frame, so they are stored only once
+            self.__vision_pos_enc = self.embedding_cache.get("vision_pos_enc", device)
+            if self.__vision_pos_enc is None:
+                return False
+
+        backbone_fpn = self.embedding_cache.get(self.__get_frame_key(inference_state, frame_idx), device)
+        if backbone_fpn is None:
+            return False
+
+        image = inference_state["images"][frame_idx].to(device).float().unsqueeze(0)
+        backbone_out = {
+            "vision_features": backbone_fpn[-1],
+            "vision_pos_enc": self.__vision_pos_enc,
+            "backbone_fpn": backbone_fpn,
+        }
+        inference_state["cached_features"] = {frame_idx: (image, backbone_out)}
+        return True
 
-        return video_segments
+    def __store_features(self, inference_state: dict, frame_idx: int):
+        _, backbone_out = inference_state["cached_features"][frame_idx]
+        if self.__vision_pos_enc is None:
+            self.__vision_pos_enc = backbone_out["vision_pos_enc"]
+            self.embedding_cache.put("vision_pos_enc", self.__vision_pos_enc)
+        # The vision features are the last level of the feature pyramid
+        self.embedding_cache.put(self.__get_frame_key(inference_state, frame_idx), backbone_out["backbone_fpn"])
+
+    def __init_state(self, video_path: str = None) -> dict:
+        with self.__autocast():
+            return self.predictor.init_state(video_path=video_path or self.frame_dir, offload_video_to_cpu=self.offload_video_to_cpu, offload_state_to_cpu=self.offload_state_to_cpu)
+
+    def __init_state_from_frames(self, images, video_height: int, video_width: int) -> dict:
+        # init_state only loads frame folders. It gets a folder with just the first frame, whose files may not be written yet,
+        # then the preloaded frames replace it the same way update_frames replaces frames
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.frame_store.get_image_by_path(self.frame_paths[0]).save(os.path.join(temp_dir, "0.jpg"), quality=95)
+            self.__is_cache_paused = True
+            try:
+                inference_state = self.__init_state(temp_dir)
+            finally:
+                self.__is_cache_paused = False
+        self.__set_state_frames(inference_state, images)
+        inference_state["video_height"] = video_height
+        inference_state["video_width"] = video_width
+        return inference_state
+
+    def __set_state_frames(self, inference_state: dict, images):
+        inference_state["images"] = images
+        inference_state["num_frames"] = len(images)
+        # Cached features are stored by frame index, which may have shifted
+        inference_state["cached_features"] = {}
+        self.__frame_keys = {}
+
+    def __autocast(self):
+        # The autocast entered in __init__ only applies to the thread which created the model
+        if self.device.type != "cuda":
+            return nullcontext()
+        return torch.autocast(device_type="cuda", dtype=torch.bfloat16)
+
+    def __track_iter(self, tracked_objects: list):
+        tracking_plan = self.tracking_planner.plan(tracked_objects)
+        self.last_tracking_plan = tracking_plan
+        prompt_indexes = [tracked_object.first_prompt_index for tracked_object in tracked_objects]
+        tracked_frames = set()      # (obj_id, frame index) pairs, which were already yielded
+        forward_outputs = None
+
+        for sweep in tracking_plan.sweeps:
+            if sweep.reverse and forward_outputs is None:
+                # The backward sweeps run after all forward sweeps, the frames tracked forwards keep their masks
+                forward_outputs = self.__get_outputs_after_prompts(tracked_objects)
+
+            tracking_plan.executed_sweeps += 1
+            for out_frame_idx, out_obj_ids, out_mask_logits in self.predictor.propagate_in_video(self.inference_state, start_frame_idx=sweep.start_frame_index, max_frame_num_to_track=sweep.num_frames, reverse=sweep.reverse):
+                tracking_plan.executed_frame_count += 1
+                masks = self.__route_masks(tracked_objects, out_frame_idx, out_obj_ids, out_mask_logits, tracked_frames, reverse=sweep.reverse)
+                if masks:
+                    yield out_frame_idx, masks
+                self.__reset_outputs_outside_intervals(tracked_objects, out_frame_idx, reverse=sweep.reverse, forward_outputs=forward_outputs)
+                self.__prune_tracking_outputs(out_frame_idx, prompt_indexes, reverse=sweep.reverse)
+
+    def __route_masks(self, tracked_objects: list, frame_idx: int, out_obj_ids: list, out_mask_logits, tracked_frames: set, reverse: bool) -> dict:
+        """
+        Returns the masks of the objects, whose intervall contains the frame in the current tracking direction.
+        """
+        masks = {}
+        for i, out_obj_id in enumerate(out_obj_ids):
+            tracked_object = tracked_objects[out_obj_id]
+            if reverse:
+                is_in_intervall = tracked_object.start_frame_index <= frame_idx <= tracked_object.first_prompt_index
+            else:
+                is_in_intervall = tracked_object.first_prompt_index <= frame_idx <= tracked_object.end_frame_index
+
+            if not is_in_intervall or (out_obj_id, frame_idx) in tracked_frames:
+                continue
 
-    def __get_frame_infos_with_points_from_intervall(self, frame_infos: list, start_frame_index: int, end_frame_index: int) -> list[int]:
+            tracked_frames.add((out_obj_id, frame_idx))
+            masks[tracked_object.damage_index] = (out_mask_logits[i] > 0.0).cpu().numpy()
+        return masks
+
+    def __get_object_outputs(self, obj_id: int) -> dict:
+        obj_idx = self.inference_state["obj_id_to_idx"].get(obj_id)
+        if obj_idx is None:
+            return {}
+        return self.inference_state["output_dict_per_obj"][obj_idx]["non_cond_frame_outputs"]
+
+    def __get_outputs_after_prompts(self, tracked_objects: list) -> dict:
+        # The outputs of the forward tracking right after the first frame with points, are the memory of the backward tracking
+        horizon = self.__get_memory_horizon()
+        forward_outputs = {}
+        for tracked_object in tracked_objects:
+            outputs = self.__get_object_outputs(tracked_object.obj_id)
+            forward_outputs[tracked_object.obj_id] = {
+                frame_idx: output for frame_idx, output in outputs.items()
+                if tracked_object.first_prompt_index < frame_idx <= min(tracked_object.first_prompt_index + horizon, tracked_object.end_frame_index)
+            }
+        return forward_outputs
+
+    def __reset_outputs_outside_intervals(self, tracked_objects: list, frame_idx: int, reverse: bool, forward_outputs: dict = None):
         """
-        This goes through the list of all frames and saves the indexes of frames, in which points are saved.
-        Args:
-            frame_infos (list): List of ImageInfo instances
-            start_frame_index (int): First frame to consider in tracking
-            end_frame_index (int): Last frame to consider in tracking
-        Returns:
-            list[int]: List of frame indexes where the selected observation contains points. 
-                    Returns an empty list if no such frames are found.
+        SAM2 propagates all objects through every frame of the sweep, also outside of the intervall of an object or before its
+        first frame with points. Those outputs are dropped again, and in the backward tracking the forward outputs are restored,
+        so every object uses the same memory as if it was tracked on its own.
         """
-        frames_with_points = []
+        for tracked_object in tracked_objects:
+            if reverse and tracked_object.start_frame_index <= frame_idx <= tracked_object.first_prompt_index:
+                continue
+            if not reverse and tracked_object.first_prompt_index <= frame_idx <= tracked_object.end_frame_index:
+                continue
+
+            outputs = self.__get_object_outputs(tracked_object.obj_id)
+            forward_output = forward_outputs.get(tracked_object.obj_id, {}).get(frame_idx) if forward_outputs else None
+            if forward_output is not None:
+                outputs[frame_idx] = forward_output
+            else:
+                outputs.pop(frame_idx, None)
+
+    def __get_memory_horizon(self) -> int:
+        # SAM2 conditions a frame on the masks of the last num_maskmem frames and the object pointers of the last max_obj_ptrs_in_encoder frames
+        num_maskmem = getattr(self.predictor, "num_maskmem", 7)
+        stride = getattr(self.predictor, "memory_temporal_stride_for_eval", 1)
+        max_obj_ptrs = getattr(self.predictor, "max_obj_ptrs_in_encoder", 16)
+        return max(num_maskmem * stride, max_obj_ptrs)
+
+    def __prune_tracking_outputs(self, current_frame_idx: int, prompt_indexes: list, reverse: bool):
+        """
+        Deletes the outputs of frames, that are behind the current frame by more than the memory horizon.
+        The frames with points (conditioning frames) are always kept, and so are the frames next to the first frame with points
+        of every object, because the backward tracking uses them as memory as well.
+        """
+        if not self.prune_tracking_memory:
+            return
 
-        selected_observation = None
-        i = 0
+        horizon = self.__get_memory_horizon()
+        output_dicts = [self.inference_state.get("output_dict")] + list(self.inference_state.get("output_dict_per_obj", {}).values())
 
-        while selected_observation == None:
-            image_info = frame_infos[i]
-            i += 1
+        for output_dict in output_dicts:
+            if not output_dict:
+                continue
+            non_cond_frame_outputs = output_dict["non_cond_frame_outputs"]
+
+            for frame_idx in list(non_cond_frame_outputs.keys()):
+                is_behind = frame_idx > current_frame_idx + horizon if reverse else frame_idx < current_frame_idx - horizon
+                if is_behind and all(abs(frame_idx - prompt_index) > horizon for prompt_index in prompt_indexes):
+                    del non_cond_frame_outputs[frame_idx]
+
+    def __list_frame_paths(self, frame_dir: str) -> list:
+        # Same selection and order SAM2 uses when it loads a frame folder
+        frame_names = [name for name in os.listdir(frame_dir) if os.path.splitext(name)[-1] in [".jpg", ".jpeg", ".JPG", ".JPEG"]]
+        frame_names.sort(key=lambda name: int(os.path.splitext(name)[0]))
+        return [os.path.join(frame_dir, name) for name in frame_names]
+
+    def __load_frames_from_store(self, frame_paths: list):
+        images = torch.stack([self.__load_frame_tensor(path) for path in frame_paths])
+        video_width, video_height = self.frame_store.get_image_by_path(frame_paths[0]).size
+        # SAM2 keeps the frames on its device, unless it offloads them to the cpu
+        if not self.offload_video_to_cpu:
+            images = images.to(self.predictor.device)
+        return images, video_height, video_width
+
+    def __load_frame_tensor(self, frame_path: str, frame_store: FrameStore = None):
+        # Same preprocessing SAM2 applies when it loads a frame folder
+        image_size = self.predictor.image_size
+        frame_store = frame_store if frame_store is not None else self.frame_store
+        image = frame_store.get_image_by_path(frame_path) if frame_store is not None else None
+        if image is None:
+            image = Image.open(frame_path).convert("RGB")
+        image = image.resize((image_size, image_size))
+        image = torch.from_numpy(np.array(image) / 255.0).permute(2, 0, 1).float()
+
+        image_mean = torch.tensor([0.485, 0.456, 0.406], dtype=torch.float32)[:, None, None]
+        image_std = torch.tensor([0.229, 0.224, 0.225], dtype=torch.float32)[:, None, None]
+        return (image - image_mean) / image_std
+
+    def __get_selected_damage_index(self, frame_infos: list) -> int:
+        """
+        Returns the index of the selected observation in the DamageInfos of the frames.
+        """
+        for image_info in frame_infos:
             for index, damage_info in enumerate(image_info.data_coordinates):
                 if damage_info.is_selected == True:
-                    selected_observation = damage_info.damage_name
-                    damage_index = index
+                    print(f"Object to track: {damage_info.damage_name} with index {index}")
+                    return index
 
-        try:
-            print(f"Object to track: {selected_observation} with index {damage_index}")
-        except Exception as e:
-            print(f"{e}")
-            return
+        print("Error: No observation is selected!")
+        return None
+
+    def __get_frames_with_points(self, frame_infos: list, damage_index: int, start_frame_index: int, end_frame_index: int) -> list[int]:
+        """
+        This goes through the frames from start_frame_index to end_frame_index and returns the indexes of the frames,
+        in which the DamageInfo with the given index contains points.
+        """
+        frames_with_points = []
 
-        # Collect frames within the interval and check for points on the selected observation
         for frame_index in range(start_frame_index, end_frame_index +1):
             image_info = frame_infos[frame_index]
 
-            if len(image_info.data_coordinates) < damage_index:
+            if len(image_info.data_coordinates) <= damage_index:
                 print(f"Entries in data coordinates: {len(image_info.data_coordinates)}")
                 continue
 
             damage_info = image_info.data_coordinates[damage_index]
 
-            positive_points = damage_info.positive_point_coordinates
-            negative_points = damage_info.negative_point_coordinates
-
-            if len(positive_points) > 0 or len(negative_points) > 0:
+            if len(damage_info.positive_point_coordinates) > 0 or len(damage_info.negative_point_coordinates) > 0:
                 frames_with_points.append(frame_index)
 
-        if frames_with_points == []:
-            print("No frames with points found in the specified interval.")
-
-        return frames_with_points
\ No newline at end of file
+        return frames_with_points
@@ -0,0 +1,348 @@
+import ipaddress
+import multiprocessing
+import os
+import secrets
+import sys
+import threading
+import traceback
+from dataclasses import dataclass, field
+from multiprocessing.connection import Client, Listener
+import numpy as np
+from damage_info import DamageInfo
+
+
+AUTHKEY_ENVIRONMENT_VARIABLE = "SAM2_SERVICE_AUTHKEY"
+AUTHKEY_PATH = os.path.join(os.path.expanduser("~"), ".config", "sam2 labeling", "service authkey")
+
+
+@dataclass
+class PromptFrame:
+    """The part of an ImageInfo SAM2 needs, which can be sent to the service process."""
+    image_path: str
+    image_index: int
+    data_coordinates: list = field(default_factory=list)
+
+
+class Sam2Server:
+    """
+    This class runs a Sam2Class for the clients of the SAM2 service, one client after another.
+    The model stays loaded between the clients, so every session after the first starts with a warm model.
+    Requests are (method name, args) tuples, the answer is ("ok", result) or ("error", message).
+    Tracking streams a ("mask", frame index, encoded masks) message for every tracked frame before its answer,
+    and stops early, when the client sends ("cancel",) meanwhile.
+    """
+    def __init__(self, sam_model):
+        self.sam_model = sam_model
+
+    def serve(self, connection):
+        """Answers the requests of one client, until it disconnects or sends close."""
+        handlers = {
+            "load": self.__load,
+            "update_frames": self.__update_frames,
+            "add_points": self.__add_points,
+            "get_prompt_fingerprint": self.__get_prompt_fingerprint,
+            "reset_predictor_state": self.__reset_predictor_state,
+            "track_objects_iter": lambda *args: self.__stream_masks(connection, self.sam_model.track_objects_iter(*args)),
+            "track_all_objects_iter": lambda *args: self.__stream_masks(connection, self.sam_model.track_all_objects_iter(*args)),
+        }
+
+        while True:
+            try:
+                method, args = connection.recv()
+            except (EOFError, OSError):
+                break
+
+            if method == "close":
+                break
+            if method == "cancel":
+                # Arrived after the tracking it was meant for had already finished
+                continue
+
+            handler = handlers.get(method)
+            try:
+                if handler is None:
+                    raise ValueError(f"Unknown method {method}")
+                connection.send(("ok", handler(*args)))
+            except Exception:
+                connection.send(("error", traceback.format_exc()))
+
+        # The next client starts with an empty state
+        try:
+            self.sam_model.reset_predictor_state()
+        except Exception:
+            pass
+
+    def __load(self, frame_dir: str) -> list:
+        self.sam_model.load(frame_dir)
+        return self.sam_model.frame_paths
+
+    def __update_frames(self, frame_paths: list) -> list:
+        self.sam_model.update_frames(frame_paths)
+        return self.sam_model.frame_paths
+
+    def __add_points(self, prompt_frame: PromptFrame, damage_index: int, obj_id: int):
+        mask = self.sam_model.add_points(prompt_frame, damage_index, obj_id)
+        return None if mask is None else encode_mask(mask)
+
+    def __get_prompt_fingerprint(self, prompt_frames: list, damage_index: int, start_frame_index: int, end_frame_index: int) -> str:
+        return self.sam_model.get_prompt_fingerprint(prompt_frames, damage_index, start_frame_index, end_frame_index)
+
+    def __reset_predictor_state(self):
+        self.sam_model.reset_predictor_state()
+
+    def __stream_masks(self, connection, tracking):
+        try:
+            for out_frame_idx, masks in tracking:
+                connection.send(("mask", out_frame_idx, {damage_index: encode_mask(mask) for damage_index, mask in masks.items()}))
+                if connection.poll() and connection.recv()[0] == "cancel":
+                    break
+        finally:
+            tracking.close()
+        return self.sam_model.last_tracking_plan
+
+
+class Sam2Service:
+    """
+    This class has the same interface as Sam2Class, but SAM2 runs in a separate process.
+    The window is shown while the model is still being built, a crash of the window does not lose the loaded model,
+    and a standalone service (python sam2_service.py) keeps one warm model for successive sessions.
+    Without an address, a worker process is started for this client. With a sam_factory, the service runs on a thread
+    of this process instead, e.g. with a fake predictor for tests.
+    The frame store of the window is not shared with the service, its frames are read from the frame files.
+    The connection to a standalone service is authenticated with the key of get_authkey, if no authkey is given.
+    """
+    def __init__(self, config: dict, address=None, authkey: bytes = None, sam_factory=None):
+        self.frame_dir = None
+        self.frame_paths = []
+        self.frame_store = None
+        self.last_tracking_plan = None
+        self.initialized = True
+        self.process = None
+        self.__lock = threading.Lock()
+
+        if address:
+            self.__connection = Client(parse_address(address), authkey=authkey or get_authkey(config))
+        elif sam_factory is not None:
+            self.__connection, server_connection = multiprocessing.Pipe()
+            threading.Thread(target=lambda: Sam2Server(sam_factory()).serve(server_connection), daemon=True).start()
+        else:
+            # Spawn works the same on every platform and does not copy the state of Tk or CUDA into the worker
+            context = multiprocessing.get_context("spawn")
+            self.__connection, worker_connection = context.Pipe()
+            self.process = context.Process(target=run_worker, args=(worker_connection, config), daemon=True)
+            self.process.start()
+
+    def load(self, frame_dir=None, frame_store=None):
+        if not frame_dir and not self.frame_dir:
+            print("Error: No frame directory given!")
+            return
+        elif frame_dir:
+            self.frame_dir = frame_dir
+
+        if frame_store is not None:
+            self.frame_store = frame_store
+        # The service reads the frame files, so all of them have to be written first
+        if self.frame_store is not None:
+            self.frame_store.flush()
+
+        frame_paths = self.__request("load", self.frame_dir)
+        if frame_paths is not None:
+            self.frame_paths = frame_paths
+
+    def update_frames(self, frame_paths: list):
+        if self.frame_store is not None:
+            self.frame_store.flush()
+        frame_paths = self.__request("update_frames", list(frame_paths))
+        if frame_paths is not None:
+            self.frame_paths = frame_paths
+
+    def add_points(self, image_info, damage_index: int = None, obj_id: int = None):
+        if not image_info:
+            print("Error: Image Info not set")
+            return
+        encoded_mask = self.__request("add_points", to_prompt_frame(image_info), damage_index, obj_id)
+        return None if encoded_mask is None else decode_mask(encoded_mask)
+
+    def track_objects(self, frame_infos: list, start_frame_index: int, end_frame_index: int) -> dict:
+        video_segments = dict()
+        for out_frame_idx, masks in self.track_objects_iter(frame_infos, start_frame_index, end_frame_index):
+            video_segments[out_frame_idx] = masks
+
+        if len(video_segments) == 0:
+            return None
+        return video_segments
+
+    def track_objects_iter(self, frame_infos: list, start_frame_index: int, end_frame_index: int):
+        yield from self.__stream("track_objects_iter", [to_prompt_frame(image_info) for image_info in frame_infos], start_frame_index, end_frame_index)
+
+    def track_all_objects_iter(self, frame_infos: list, intervals: list):
+        yield from self.__stream("track_all_objects_iter", [to_prompt_frame(image_info) for image_info in frame_infos], list(intervals))
+
+    def get_prompt_fingerprint(self, frame_infos: list, damage_index: int, start_frame_index: int, end_frame_index: int) -> str:
+        # Only the frames of the intervall are sent
+        prompt_frames = [to_prompt_frame(image_info) for image_info in frame_infos[start_frame_index:end_frame_index + 1]]
+        return self.__request("get_prompt_fingerprint", prompt_frames, damage_index, 0, len(prompt_frames) - 1)
+
+    def reset_predictor_state(self):
+        self.__request("reset_predictor_state")
+
+    def cleanup(self):
+        try:
+            self.reset_predictor_state()
+            print("Resources cleaned up successfully.")
+        except Exception as e:
+            print(f"Error during cleanup: {e}")
+
+    def close(self):
+        """Disconnects from the service. A worker process of this client stops, a standalone service waits for the next client."""
+        with self.__lock:
+            try:
+                self.__connection.send(("close", ()))
+                self.__connection.close()
+            except (EOFError, OSError):
+                pass
+        if self.process is not None:
+            self.process.join(timeout=10)
+
+    def __request(self, method: str, *args):
+        with self.__lock:
+            try:
+                self.__connection.send((method, args))
+                status, result = self.__connection.recv()
+            except (EOFError, OSError) as e:
+                print(f"Error: SAM2 service is not reachable: {e}")
+                self.initialized = False
+                return None
+
+        if status == "error":
+            print(f"Error in SAM2 service during {method}:\n{result}")
+            return None
+        return result
+
+    def __stream(self, method: str, *args):
+        with self.__lock:
+            self.__connection.send((method, args))
+            try:
+                while True:
+                    message = self.__connection.recv()
+                    if message[0] == "mask":
+                        _, out_frame_idx, encoded_masks = message
+                        yield out_frame_idx, {damage_index: decode_mask(encoded_mask) for damage_index, encoded_mask in encoded_masks.items()}
+                        continue
+
+                    status, result = message
+                    if status == "error":
+                        print(f"Error in SAM2 service during {method}:\n{result}")
+                    else:
+                        self.last_tracking_plan = result
+                    return
+            except GeneratorExit:
+                # The consumer stopped early: tell the service and read the rest of the answer, so the connection stays in sync
+                self.__connection.send(("cancel", ()))
+                while self.__connection.recv()[0] == "mask":
+                    pass
+                raise
+
+
+def encode_mask(mask: np.ndarray) -> tuple:
+    """Packs a boolean mask into bits, an eighth of its size as bool array."""
+    mask = np.asarray(mask, dtype=bool)
+    return mask.shape, np.packbits(mask, axis=None).tobytes()
+
+
+def decode_mask(encoded_mask: tuple) -> np.ndarray:
+    shape, data = encoded_mask
+    count = int(np.prod(shape))
+    return np.unpackbits(np.frombuffer(data, dtype=np.uint8), count=count).reshape(shape).astype(bool)
+
+
+def to_prompt_frame(image_info) -> PromptFrame:
+    data_coordinates = []
+    for damage_info in image_info.data_coordinates:
+        prompt_damage_info = DamageInfo(damage_info.damage_name)
+        prompt_damage_info.positive_point_coordinates = list(damage_info.positive_point_coordinates or [])
+        prompt_damage_info.negative_point_coordinates = list(damage_info.negative_point_coordinates or [])
+        prompt_damage_info.is_selected = damage_info.is_selected
+        data_coordinates.append(prompt_damage_info)
+    return PromptFrame(image_info.image_path, image_info.image_index, data_coordinates)
+
+
+def parse_address(address):
+    """
+    'host:port' is a TCP address, everything else a named pipe (Windows) or unix socket path.
+    The connection sends pickled requests, which can run code, so only TCP addresses of this computer are accepted.
+    """
+    if isinstance(address, str) and ":" in address and address.rsplit(":", 1)[1].isdigit() and not address.startswith("\\\\"):
+        host, port = address.rsplit(":", 1)
+        host = host.strip("[]")
+        if not is_loopback(host):
+            raise ValueError(f"The SAM2 service only runs on this computer, {host} is not a loopback address (use e.g. localhost:{port})")
+        return host, int(port)
+    return address
+
+
+def is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def get_authkey(config: dict) -> bytes:
+    """
+    Returns the key, which authenticates the clients of the service: from the SAM2_SERVICE_AUTHKEY environment variable,
+    the sam2_service_authkey setting, or else a random key, which is created once per user in AUTHKEY_PATH.
+    """
+    authkey = os.environ.get(AUTHKEY_ENVIRONMENT_VARIABLE) or config.get("settings", {}).get("sam2_service_authkey")
+    if authkey:
+        return str(authkey).encode()
+
+    os.makedirs(os.path.dirname(AUTHKEY_PATH), exist_ok=True)
+    try:
+        # Only readable by the user. The service and its clients may create it at the same time, only one of them succeeds
+        file_descriptor = os.open(AUTHKEY_PATH, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(file_descriptor, "w") as file:
+            file.write(secrets.token_hex(32))
+    except FileExistsError:
+        pass
+    with open(AUTHKEY_PATH, "r") as file:
+        return file.read().strip().encode()
+
+
+def run_worker(connection, config: dict):
+    """Entry point of the worker process of a Sam2Service."""
+    # Imported here, so the window process does not need the model code to start the worker
+    from main import create_local_sam_model
+    Sam2Server(create_local_sam_model(config)).serve(connection)
+
+
+def main():
+    """Runs a standalone SAM2 service on the sam2_service_address of the config, which serves one client after another."""
+    from main import load_config, create_local_sam_model
+
+    config = load_config()
+    address = config["settings"].get("sam2_service_address") or (len(sys.argv) > 1 and sys.argv[1])
+    if not address:
+        print("Error: Set sam2_service_address in the config, or pass the address as argument!")
+        return
+
+    try:
+        address = parse_address(address)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+
+    server = Sam2Server(create_local_sam_model(config))
+    with Listener(address, authkey=get_authkey(config)) as listener:
+        print(f"SAM2 service listening on {address}")
+        while True:
+            with listener.accept() as connection:
+                print(f"Client connected: {listener.last_accepted}")
+                server.serve(connection)
+                print("Client disconnected")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import hashlib
+from typing import Iterator, Protocol, runtime_checkable
+
+
+@runtime_checkable
+class VideoPredictor(Protocol):
+    """
+    Interface of the video segmentation model the MainWindow and the AnnotationWindow use.
+    Implemented by Sam2Class, Sam2Service and StubVideoPredictor.
+    Masks are boolean arrays of shape (1, height, width), frames are given as ImageInfos with their image_index set.
+    """
+    initialized: bool
+    frame_dir: str
+    frame_paths: list
+    last_tracking_plan: object
+
+    def load(self, frame_dir=None, frame_store=None):
+        """Loads the frames of the directory, or the already decoded frames of the frame store, and resets the state."""
+        ...
+
+    def update_frames(self, frame_paths: list):
+        """Loads a changed set of frames of the same directory."""
+        ...
+
+    def add_points(self, image_info, damage_index: int = None, obj_id: int = None):
+        """Adds the points of the DamageInfo, by default the selected one, and returns its mask on that frame."""
+        ...
+
+    def track_objects(self, frame_infos: list, start_frame_index: int, end_frame_index: int) -> dict:
+        ...
+
+    def track_objects_iter(self, frame_infos: list, start_frame_index: int, end_frame_index: int) -> Iterator[tuple]:
+        ...
+
+    def track_all_objects_iter(self, frame_infos: list, intervals: list) -> Iterator[tuple]:
+        """Yields (frame index, {DamageInfo index: mask}) for the (DamageInfo index, first, last frame index) intervals."""
+        ...
+
+    def get_prompt_fingerprint(self, frame_infos: list, damage_index: int, start_frame_index: int, end_frame_index: int) -> str:
+        ...
+
+    def reset_predictor_state(self):
+        ...
+
+    def cleanup(self):
+        ...
+
+
+@runtime_checkable
+class ImagePredictor(Protocol):
+    """
+    Interface of the single image segmentation model. Implemented by Sam2ImagePredictor and StubImagePredictor.
+    """
+    def load_image(self, image_info):
+        ...
+
+    def add_points(self, image_info, multimask_output: bool = True) -> tuple:
+        """Returns the masks for the points of the selected DamageInfo and their scores, best first."""
+        ...
+
+
+def get_prompt_fingerprint(model_key: str, frames_version: int, frame_infos: list, damage_index: int, start_frame_index: int, end_frame_index: int) -> str:
+    """
+    Returns a hash of everything the tracking result of an intervall depends on: the frames in it, the points and labels
+    of the DamageInfo with the given index, the loaded frames and the model.
+    If the fingerprint did not change since the last tracking, tracking the intervall again gives the same masks.
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(f"{model_key}|{frames_version}|{damage_index}".encode())
+    for image_info in frame_infos[start_frame_index:end_frame_index + 1]:
+        hasher.update(f"|{image_info.image_path}".encode())
+        if damage_index < len(image_info.data_coordinates):
+            damage_info = image_info.data_coordinates[damage_index]
+            hasher.update(f"+{damage_info.positive_point_coordinates}-{damage_info.negative_point_coordinates}".encode())
+    return hasher.hexdigest()
@@ -0,0 +1,101 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from frame_extraction import FrameExtraction
+from frame_store import FrameStore
+from table_and_index import TableAndIndex
+from thumbnail_cache import ThumbnailCache
+
+
+@dataclass
+class PreparedSession:
+    """A row of the table, whose frames are extracted and decoded, so its window opens without waiting."""
+    damage_table_row: dict
+    video_path: str
+    frame_dir: str
+    frame_extraction: FrameExtraction
+    frame_store: FrameStore = field(default=None)
+    thumbnail_cache: ThumbnailCache = field(default=None)
+
+
+class SessionPrefetcher:
+    """
+    This class prepares the sessions of the next look_ahead rows of the table in the background, while the current
+    session is labeled. prepare_session(damage_table_row, frame_dir, is_cancelled) returns the PreparedSession of a row,
+    it runs on one worker thread, so the rows are prepared one after another and the current session keeps most of the cpu.
+    Rows, which are not prepared yet when they are opened, are prepared at once. When a row is opened while it is prepared,
+    is_cancelled returns True, so prepare_session skips what is not needed to open it.
+    """
+    def __init__(self, table_and_index: TableAndIndex, prepare_session, look_ahead: int = 1):
+        self.table_and_index = table_and_index
+        self.prepare_session = prepare_session
+        self.look_ahead = max(int(look_ahead), 0)
+        self.prefetched_count = 0       # Opened sessions, which were prepared in the background
+        self.__executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session_prefetch") if self.look_ahead > 0 else None
+        self.__futures = {}             # row index: (frame dir, future of the PreparedSession, event set when the row is opened)
+        self.__current_frame_dir = None
+        self.__is_shut_down = threading.Event()
+
+    def get_next(self) -> PreparedSession:
+        """
+        Moves on to the next row of the table and returns its session, or None after the last row.
+        Waits, if the session of the row is still being prepared in the background.
+        """
+        next_rows = self.table_and_index.peek_damage_table_rows(1)
+        damage_table_row = self.table_and_index.get_damage_table_row()
+        if damage_table_row is None or len(next_rows) == 0:
+            return None
+
+        frame_dir = self.get_frame_dir(damage_table_row)
+        session = None
+        _, future, is_opened = self.__futures.pop(next_rows[0][0], (None, None, None))
+        if future is not None:
+            is_opened.set()
+            try:
+                session = future.result()
+                self.prefetched_count += 1
+            except Exception as e:
+                print(f"Error: Preparing the session of {damage_table_row.get('Videoname')} in the background failed: {e}")
+
+        if session is None:
+            session = self.prepare_session(damage_table_row, frame_dir, self.__is_shut_down.is_set)
+        self.__current_frame_dir = frame_dir
+        return session
+
+    def prefetch(self):
+        """Starts preparing the sessions of the next look_ahead rows, which are not prepared yet."""
+        if self.__executor is None or self.__is_shut_down.is_set():
+            return
+
+        for index, damage_table_row in self.table_and_index.peek_damage_table_rows(self.look_ahead):
+            if index in self.__futures:
+                continue
+            frame_dir = self.get_frame_dir(damage_table_row)
+            # Rows of the same video share the frame folder, such a row is only prepared once the folder is free,
+            # and the rows after it wait as well, so they are still prepared in order
+            used_frame_dirs = {self.__current_frame_dir} | {used_frame_dir for used_frame_dir, _, _ in self.__futures.values()}
+            if frame_dir in used_frame_dirs:
+                break
+            is_opened = threading.Event()
+            is_cancelled = lambda is_opened=is_opened: is_opened.is_set() or self.__is_shut_down.is_set()
+            self.__futures[index] = (frame_dir, self.__executor.submit(self.prepare_session, damage_table_row, frame_dir, is_cancelled), is_opened)
+
+    def get_frame_dir(self, damage_table_row: dict) -> str:
+        return os.path.join(self.table_and_index.get_output_dir(), "results", damage_table_row["Videoname"], "source images")
+
+    def shutdown(self):
+        """Cancels the sessions, which are not started yet, and waits for the running one."""
+        self.__is_shut_down.set()
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=True, cancel_futures=True)
+            self.__executor = None
+
+        # The frames of prepared sessions, which are not opened, are still written to their folder
+        for _, future, _ in self.__futures.values():
+            if future.cancelled() or future.exception() is not None:
+                continue
+            session = future.result()
+            if session.frame_store is not None:
+                session.frame_store.close()
+        self.__futures = {}
@@ -91,8 +91,11 @@ class MainWindow:
         self.root.protocol("WM_DELETE_WINDOW", lambda: self.__close_window())
         self.root.mainloop()
 
-    def save_to_json(self):
-        """Saves the mask and point date saved in every frame to the json"""
+    def save_to_json(self, close: bool = False):
+        """
+        Saves the mask and point date saved in every frame to the json.
+        close: True when the window closes, then the json is written at once and the journal removed
+        """
         for image_info in self.image_infos:
             self.json_annotation_manager.add_to_frame(image_info)
         
@@ -100,6 +103,8 @@ class MainWindow:
         self.json_annotation_manager.add_to_info("Instance Intervals", self.split_intervals)
 
         self.json_annotation_manager.save()
+        if close:
+            self.json_annotation_manager.close()
 
     def __set_frames(self, frame_dir:str):
         """
@@ -159,6 +164,9 @@ class MainWindow:
             json_dir = os.path.dirname(self.frame_dir)
             json_path = os.path.join(json_dir, f"{os.path.basename(json_dir)}.json")
 
+            # The json of the images shown before is written and its journal removed
+            if self.json_annotation_manager is not None:
+                self.json_annotation_manager.close()
             self.json_annotation_manager = JsonAnnotationManager()
             self.json_annotation_manager.load(json_path)
             self.json_annotation_manager.set_info(info_dict)
@@ -1218,6 +1226,8 @@ class MainWindow:
             self.json_annotation_manager.add_to_info(key="Skipped", value="True")
 
         self.run_next_loop = run_next_loop
+        if self.json_annotation_manager is not None:
+            self.json_annotation_manager.close()
         
         self.sam_model.cleanup()
         self.root.quit()
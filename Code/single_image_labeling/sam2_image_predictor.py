@@ -7,7 +7,7 @@ import numpy as np
 
 
 class Sam2ImagePredictor:
-    def __init__(self, model_cfg_path: str, sam2_checkpoint_path: str):
+    def __init__(self, model_cfg_path: str, sam2_checkpoint_path: str, embedding_cache=None, onnx_encoder_path: str = None, onnx_threads: int = 0):
 
         # select the device for computation
         if torch.cuda.is_available():
@@ -30,12 +30,35 @@ class Sam2ImagePredictor:
         self.model_cfg = model_cfg_path
         sam2_model = build_sam2(self.model_cfg, self.sam2_checkpoint, device=device)
         self.predictor = SAM2ImagePredictor(sam2_model)
+        if onnx_encoder_path:
+            # Imported here, onnxruntime is only needed for the ONNX image encoder
+            from onnx_image_encoder import OnnxImageEncoder
+            OnnxImageEncoder(onnx_encoder_path, device, onnx_threads).attach(sam2_model)
+        # Optional EmbeddingCache, so the image encoder runs only once per image
+        self.embedding_cache = embedding_cache
+        self.device = device
 
     def load_image(self, image_info):
         image_path = image_info.image_path
         image = Image.open(image_path)
         image = np.array(image.convert("RGB"))
-        self.predictor.set_image(image)
+
+        if self.embedding_cache is None:
+            self.predictor.set_image(image)
+            return
+
+        # The image predictor stores other features than the video predictor, so they get their own keys
+        key = "image_" + self.embedding_cache.hash_content(image)
+        features = self.embedding_cache.get(key, self.device)
+        if features is not None:
+            self.predictor.reset_predictor()
+            self.predictor._features = features
+            self.predictor._orig_hw = [image.shape[:2]]
+            self.predictor._is_image_set = True
+            self.predictor._is_batch = False
+        else:
+            self.predictor.set_image(image)
+            self.embedding_cache.put(key, self.predictor._features)
 
 
     def add_points(self, image_info, multimask_output=True):
@@ -1,15 +1,19 @@
 from dataclasses import dataclass, field
 import tkinter as tk
-from sam2_class import Sam2Class
+from segmentation_predictor import VideoPredictor
 from frame_extraction import FrameExtraction
+from frame_store import FrameStore
+from thumbnail_cache import ThumbnailCache
 
 @dataclass
 class Setup:
     config: dict
     frame_dir: str
-    sam_model: Sam2Class
+    sam_model: VideoPredictor
     frame_extraction : FrameExtraction
     damage_table_row: dict = field(default_factory=dict)
+    frame_store: FrameStore = field(default=None)
+    thumbnail_cache: ThumbnailCache = field(default=None)     # Thumbnails of the frames, which were created before the session opened
 
 @dataclass
 class ButtonState:
@@ -19,3 +23,11 @@ class ButtonState:
     overlay_color: str
     selection_button: tk.Button = field(default=None)
     visibility_button: tk.Button = field(default=None)
+
+@dataclass
+class GridCell:
+    """A frame shown on the image grid canvas, its canvas item and the PhotoImage drawn into it."""
+    item_id: int
+    photo: object
+    image_path: str = field(default=None)
+    is_fast: bool = field(default=False)    # Drawn with a fast filter while resizing, is drawn again once it settles
@@ -0,0 +1,225 @@
+import os
+import time
+import cv2
+import numpy as np
+from PIL import Image
+from segmentation_predictor import get_prompt_fingerprint
+from tracking_planner import TrackedObject, TrackingPlanner
+
+
+class StubVideoPredictor:
+    """
+    Video predictor without a model, for benchmarks and tests on machines without a GPU or the sam2 package.
+    Every object gets an ellipse around its positive points, which moves by velocity pixels per frame away from the
+    frame with points. The masks only depend on the points, so every run gives the same masks.
+    click_latency and frame_latency (seconds) simulate the time the model needs for a click and a propagated frame.
+    The tracking runs the sweeps of the TrackingPlanner like Sam2Class, so it yields the same frames in the same order.
+    """
+    def __init__(self, click_latency: float = 0.0, frame_latency: float = 0.0, velocity: tuple = (2, 1)):
+        self.click_latency = click_latency
+        self.frame_latency = frame_latency
+        self.velocity = velocity
+
+        self.frame_dir = None
+        self.frame_paths = []
+        self.frame_store = None
+        self.frames_version = 0
+        self.model_key = "stub"
+        self.tracking_planner = TrackingPlanner()
+        self.last_tracking_plan = None
+        self.initialized = True
+        self.__frame_size = None        # (width, height)
+        self.__prompts = {}             # obj_id: {frame index: (center, axes)}
+
+    def load(self, frame_dir=None, frame_store=None):
+        if not frame_dir and not self.frame_dir:
+            print("Error: No frame directory given!")
+            return
+        elif frame_dir:
+            self.frame_dir = frame_dir
+
+        if frame_store is not None:
+            self.frame_store = frame_store
+
+        if self.frame_store is not None and self.frame_store.frame_dir == self.frame_dir and len(self.frame_store) > 0:
+            frame_paths = self.frame_store.get_frame_paths()
+        else:
+            frame_names = [name for name in os.listdir(self.frame_dir) if os.path.splitext(name)[-1] in [".jpg", ".jpeg", ".JPG", ".JPEG"]]
+            frame_names.sort(key=lambda name: int(os.path.splitext(name)[0]))
+            frame_paths = [os.path.join(self.frame_dir, name) for name in frame_names]
+        self.update_frames(frame_paths)
+
+    def update_frames(self, frame_paths: list):
+        self.frame_paths = list(frame_paths)
+        self.frames_version += 1
+        self.__frame_size = self.__read_frame_size(self.frame_paths[0]) if self.frame_paths else None
+        self.reset_predictor_state()
+
+    def add_points(self, image_info, damage_index: int = None, obj_id: int = None):
+        if not image_info:
+            print("Error: Image Info not set")
+            return
+
+        for i, damage_info in enumerate(image_info.data_coordinates):
+            if (damage_index is None and damage_info.is_selected == True) or i == damage_index:
+                break
+        else:
+            print("Error: No observation is selected!")
+            return
+
+        if obj_id is None:
+            obj_id = i
+        time.sleep(self.click_latency)
+
+        positive_points = np.array(damage_info.positive_point_coordinates or [], dtype=np.float32).reshape(-1, 2)
+        width, height = self.__frame_size or image_info.img_size
+        min_axis = max(min(width, height) * 0.05, 1)
+        if len(positive_points) == 0:
+            # Only negative points: no object on this frame
+            self.__prompts.setdefault(obj_id, {})[image_info.image_index] = None
+            return self.__draw_mask(None)
+
+        center = positive_points.mean(axis=0)
+        axes = np.maximum((positive_points.max(axis=0) - positive_points.min(axis=0)) / 2 + min_axis, min_axis)
+        self.__prompts.setdefault(obj_id, {})[image_info.image_index] = (center, axes)
+        return self.__draw_mask((center, axes))
+
+    def track_objects(self, frame_infos: list, start_frame_index: int, end_frame_index: int) -> dict:
+        video_segments = dict()
+        for out_frame_idx, masks in self.track_objects_iter(frame_infos, start_frame_index, end_frame_index):
+            video_segments[out_frame_idx] = masks
+
+        if len(video_segments) == 0:
+            return None
+        return video_segments
+
+    def track_objects_iter(self, frame_infos: list, start_frame_index: int, end_frame_index: int):
+        for damage_index, damage_info in enumerate(frame_infos[start_frame_index].data_coordinates if frame_infos else []):
+            if damage_info.is_selected:
+                yield from self.track_all_objects_iter(frame_infos, [(damage_index, start_frame_index, end_frame_index)])
+                return
+        print("Error: No observation is selected!")
+
+    def track_all_objects_iter(self, frame_infos: list, intervals: list):
+        self.reset_predictor_state()
+
+        tracked_objects = []
+        for damage_index, start_frame_index, end_frame_index in intervals:
+            frame_indexes_with_points = [index for index in range(start_frame_index, end_frame_index + 1)
+                                         if damage_index < len(frame_infos[index].data_coordinates)
+                                         and (frame_infos[index].data_coordinates[damage_index].positive_point_coordinates
+                                              or frame_infos[index].data_coordinates[damage_index].negative_point_coordinates)]
+            if not frame_indexes_with_points:
+                continue
+
+            tracked_object = TrackedObject(len(tracked_objects), damage_index, start_frame_index, end_frame_index, frame_indexes_with_points[0])
+            for index in frame_indexes_with_points:
+                self.add_points(frame_infos[index], damage_index, tracked_object.obj_id)
+            tracked_objects.append(tracked_object)
+
+        if len(tracked_objects) == 0:
+            print("No frames with points found in the specified intervals.")
+            return
+
+        tracking_plan = self.tracking_planner.plan(tracked_objects)
+        self.last_tracking_plan = tracking_plan
+        tracked_frames = set()
+        for sweep in tracking_plan.sweeps:
+            tracking_plan.executed_sweeps += 1
+            step = -1 if sweep.reverse else 1
+            last_frame_index = min(max(sweep.start_frame_index + step * sweep.num_frames, 0), len(self.frame_paths) - 1)
+            for frame_idx in range(sweep.start_frame_index, last_frame_index + step, step):
+                time.sleep(self.frame_latency)
+                tracking_plan.executed_frame_count += 1
+
+                masks = {}
+                for tracked_object in tracked_objects:
+                    if sweep.reverse:
+                        is_in_intervall = tracked_object.start_frame_index <= frame_idx <= tracked_object.first_prompt_index
+                    else:
+                        is_in_intervall = tracked_object.first_prompt_index <= frame_idx <= tracked_object.end_frame_index
+                    if not is_in_intervall or (tracked_object.obj_id, frame_idx) in tracked_frames:
+                        continue
+                    tracked_frames.add((tracked_object.obj_id, frame_idx))
+                    masks[tracked_object.damage_index] = self.__draw_mask(self.__get_ellipse(tracked_object.obj_id, frame_idx))
+                if masks:
+                    yield frame_idx, masks
+
+    def get_prompt_fingerprint(self, frame_infos: list, damage_index: int, start_frame_index: int, end_frame_index: int) -> str:
+        return get_prompt_fingerprint(self.model_key, self.frames_version, frame_infos, damage_index, start_frame_index, end_frame_index)
+
+    def reset_predictor_state(self):
+        self.__prompts = {}
+
+    def cleanup(self):
+        self.reset_predictor_state()
+
+    def __get_ellipse(self, obj_id: int, frame_idx: int):
+        # The ellipse of the nearest frame with points, moved by the frames in between
+        prompts = self.__prompts.get(obj_id)
+        if not prompts:
+            return None
+        prompt_index = min(prompts, key=lambda index: abs(index - frame_idx))
+        if prompts[prompt_index] is None:
+            return None
+        center, axes = prompts[prompt_index]
+        return center + np.array(self.velocity, dtype=np.float32) * (frame_idx - prompt_index), axes
+
+    def __draw_mask(self, ellipse) -> np.ndarray:
+        width, height = self.__frame_size or (1, 1)
+        mask = np.zeros((height, width), dtype=np.uint8)
+        if ellipse is not None:
+            center, axes = ellipse
+            cv2.ellipse(mask, (int(center[0]), int(center[1])), (int(axes[0]), int(axes[1])), 0, 0, 360, 1, -1)
+        # Same shape as the masks of SAM2
+        return mask.astype(bool)[None]
+
+    def __read_frame_size(self, frame_path: str) -> tuple:
+        if self.frame_store is not None:
+            image = self.frame_store.get_image_by_path(frame_path)
+            if image is not None:
+                return image.size
+        with Image.open(frame_path) as image:
+            return image.size
+
+
+class StubImagePredictor:
+    """
+    Single image predictor without a model: an ellipse around the positive points of the selected observation,
+    and a smaller and a larger one as further masks, with fixed scores.
+    """
+    def __init__(self, click_latency: float = 0.0):
+        self.click_latency = click_latency
+        self.__image_size = None
+
+    def load_image(self, image_info):
+        self.__image_size = image_info.img_size
+
+    def add_points(self, image_info, multimask_output=True):
+        if not image_info:
+            print("Error: Image Info not set")
+            return
+
+        points = None
+        for damage_info in image_info.data_coordinates:
+            if damage_info.is_selected == True:
+                points = damage_info.positive_point_coordinates
+                break
+        if points is None:
+            print("Error: No observation is selected!")
+            return
+
+        time.sleep(self.click_latency)
+        width, height = self.__image_size or image_info.img_size
+        positive_points = np.array(points or [], dtype=np.float32).reshape(-1, 2)
+        min_axis = max(min(width, height) * 0.05, 1)
+        scales = (1.0, 0.5, 1.5) if multimask_output else (1.0,)
+
+        masks = np.zeros((len(scales), height, width), dtype=np.uint8)
+        if len(positive_points) > 0:
+            center = positive_points.mean(axis=0)
+            axes = (positive_points.max(axis=0) - positive_points.min(axis=0)) / 2 + min_axis
+            for mask, scale in zip(masks, scales):
+                cv2.ellipse(mask, (int(center[0]), int(center[1])), (max(int(axes[0] * scale), 1), max(int(axes[1] * scale), 1)), 0, 0, 360, 1, -1)
+        scores = np.linspace(0.9, 0.5, len(scales)).astype(np.float32)
+        return masks.astype(bool), scores
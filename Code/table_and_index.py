@@ -28,6 +28,15 @@ class TableAndIndex:
            return None
 
         return self.__damage_table.iloc[self.__current_index].to_dict()
+
+    def peek_damage_table_rows(self, count: int) -> list:
+        """
+        Returns the next count rows as (index, row) tuples, without incrementing the index.
+        The first one is the row, which get_damage_table_row returns next.
+        """
+        first_index = self.__current_index + 1
+        last_index = min(first_index + count, self.__total_length)
+        return [(index, self.__damage_table.iloc[index].to_dict()) for index in range(first_index, last_index)]
     
     def get_total_length(self):
         return self.__total_length
@@ -0,0 +1,64 @@
+from collections import OrderedDict
+from PIL import Image
+from image_info import ImageInfo
+
+
+class ThumbnailCache:
+    """
+    This class holds grid cell sized thumbnails of the frames, without their overlays.
+    The least recently used thumbnails are dropped, when more than max_entries are cached,
+    so the memory depends on the size of the shown grid instead of the number of frames.
+    """
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max(int(max_entries), 1)
+        self.__thumbnails = OrderedDict()
+        self.__latest_keys = {}     # image_path: key of the last thumbnail cached for that image
+
+    def __len__(self) -> int:
+        return len(self.__thumbnails)
+
+    def get(self, image_info: ImageInfo, size: tuple, fast: bool = False) -> Image.Image:
+        """
+        Returns the thumbnail of the image_info with the given (width, height) size.
+        If fast is set and no thumbnail of that size is cached, a quickly scaled thumbnail is returned without caching it,
+        e.g. while the window is resized and the size changes with every event.
+        """
+        key = (image_info.image_path, tuple(size))
+        thumbnail = self.__thumbnails.get(key)
+        if thumbnail is not None:
+            self.__thumbnails.move_to_end(key)
+            return thumbnail
+
+        if fast:
+            # Scaling a thumbnail of an other size is much faster than decoding the frame again
+            latest_key = self.__latest_keys.get(image_info.image_path)
+            if latest_key in self.__thumbnails:
+                return self.__thumbnails[latest_key].resize(size, Image.Resampling.BILINEAR)
+            return self.__create_thumbnail(image_info, size, Image.Resampling.BILINEAR)
+
+        thumbnail = self.__create_thumbnail(image_info, size)
+        self.__thumbnails[key] = thumbnail
+        self.__latest_keys[image_info.image_path] = key
+        while len(self.__thumbnails) > self.max_entries:
+            evicted_key, _ = self.__thumbnails.popitem(last=False)
+            if self.__latest_keys.get(evicted_key[0]) == evicted_key:
+                del self.__latest_keys[evicted_key[0]]
+        return thumbnail
+
+    def invalidate(self, image_path: str):
+        """Drops all thumbnails of the given image, e.g. when its file changed."""
+        for key in [key for key in self.__thumbnails if key[0] == image_path]:
+            del self.__thumbnails[key]
+        self.__latest_keys.pop(image_path, None)
+
+    def clear(self):
+        self.__thumbnails.clear()
+        self.__latest_keys.clear()
+
+    def __create_thumbnail(self, image_info: ImageInfo, size: tuple, resample=Image.Resampling.LANCZOS) -> Image.Image:
+        # A loaded full image is reused, otherwise the image is read without keeping it in the ImageInfo
+        if image_info.is_loaded:
+            image = image_info.image
+        else:
+            image = image_info.read_image(draft_size=size)
+        return image.convert("RGB").resize(size, resample)
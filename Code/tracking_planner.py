@@ -0,0 +1,99 @@
+from dataclasses import dataclass, field
+
+
+@dataclass
+class TrackedObject:
+    """An intervall of an observation, which SAM2 tracks as its own object."""
+    obj_id: int
+    damage_index: int
+    start_frame_index: int
+    end_frame_index: int
+    first_prompt_index: int
+
+
+@dataclass
+class Sweep:
+    """One propagation of SAM2 from start_frame_index over num_frames further frames, forwards or backwards."""
+    start_frame_index: int
+    num_frames: int
+    reverse: bool
+    obj_ids: list = field(default_factory=list)
+
+    @property
+    def frame_count(self) -> int:
+        # The start frame is propagated as well
+        return self.num_frames + 1
+
+
+@dataclass
+class TrackingPlan:
+    sweeps: list = field(default_factory=list)
+    separate_sweeps: int = 0            # Sweeps needed when every intervall is tracked on its own
+    separate_frame_count: int = 0       # Frames encoded when every intervall is tracked on its own
+    executed_sweeps: int = 0
+    executed_frame_count: int = 0
+
+    @property
+    def frame_count(self) -> int:
+        return sum(sweep.frame_count for sweep in self.sweeps)
+
+    def get_report(self) -> str:
+        return (f"Tracking plan: {len(self.sweeps)} sweeps over {self.frame_count} frames planned, "
+                f"{self.executed_sweeps} sweeps over {self.executed_frame_count} frames executed "
+                f"(separate intervalls: {self.separate_sweeps} sweeps over {self.separate_frame_count} frames)")
+
+
+class TrackingPlanner:
+    """
+    This class plans the propagation sweeps for a set of tracked objects.
+    The frames every object needs forwards (first frame with points to end of its intervall) and backwards
+    (start of its intervall to first frame with points) are merged on the frame timeline, and every connected range
+    becomes one sweep for all objects in it. So overlapping or adjacent intervalls share their sweeps,
+    and frames between intervalls, which no object needs, are not propagated at all.
+    """
+    def plan(self, tracked_objects: list) -> TrackingPlan:
+        tracking_plan = TrackingPlan()
+        if not tracked_objects:
+            return tracking_plan
+
+        forward_ranges = [(tracked_object.first_prompt_index, tracked_object.end_frame_index, tracked_object.obj_id) for tracked_object in tracked_objects]
+        backward_ranges = [(tracked_object.start_frame_index, tracked_object.first_prompt_index, tracked_object.obj_id) for tracked_object in tracked_objects
+                           if tracked_object.first_prompt_index > tracked_object.start_frame_index]
+
+        backward_sweeps = []
+        for first_frame, last_frame, obj_ids in self.__merge_ranges(backward_ranges):
+            backward_sweeps.append(Sweep(last_frame, last_frame - first_frame, True, obj_ids))
+
+        # A single frame forwards is only needed, if no backward sweep starts on it
+        backward_starts = {sweep.start_frame_index for sweep in backward_sweeps}
+        forward_sweeps = []
+        for first_frame, last_frame, obj_ids in self.__merge_ranges(forward_ranges):
+            if first_frame == last_frame and first_frame in backward_starts:
+                continue
+            forward_sweeps.append(Sweep(first_frame, last_frame - first_frame, False, obj_ids))
+
+        # All forward sweeps run first, so the backward sweeps can use their outputs as memory
+        tracking_plan.sweeps = forward_sweeps + backward_sweeps[::-1]
+
+        # Tracking every intervall on its own runs a forward and a backward sweep from its first frame with points
+        for tracked_object in tracked_objects:
+            for num_frames in (tracked_object.end_frame_index - tracked_object.first_prompt_index, tracked_object.first_prompt_index - tracked_object.start_frame_index):
+                if num_frames > 0:
+                    tracking_plan.separate_sweeps += 1
+                    tracking_plan.separate_frame_count += num_frames + 1
+
+        return tracking_plan
+
+    def __merge_ranges(self, ranges: list) -> list:
+        """
+        Merges overlapping and adjacent (first frame, last frame, obj_id) ranges.
+        Returns a list of (first frame, last frame, obj_ids) sorted by the first frame.
+        """
+        merged = []
+        for first_frame, last_frame, obj_id in sorted(ranges):
+            if merged and first_frame <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], last_frame)
+                merged[-1][2].append(obj_id)
+            else:
+                merged.append([first_frame, last_frame, [obj_id]])
+        return [tuple(merged_range) for merged_range in merged]
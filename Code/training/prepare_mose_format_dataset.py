@@ -1,8 +1,13 @@
 import os
+import sys
 import json
+import numpy as np
 from PIL import Image, ImageDraw
 import shutil
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from mask_rle import decode_mask
+
 def generate_masks(dataset_path, output_path):
     folder_list = os.listdir(dataset_path)
     for list_index, video_folder in enumerate(folder_list):
@@ -71,6 +76,15 @@ def generate_masks(dataset_path, output_path):
 
             mask_has_data = False  # Track if this mask has any content
             for category_idx, observation in enumerate(observations.values(), start=1):
+                # Masks stored as run length encoding are drawn as they are, without converting them into polygons
+                if observation.get("Mask RLE"):
+                    object_mask = decode_mask(observation["Mask RLE"])
+                    if object_mask.any():
+                        mask_has_data = True
+                        color = COLOR_MAP.get(category_idx, (255, 255, 255))
+                        draw.bitmap((0, 0), Image.fromarray(object_mask.astype(np.uint8) * 255, "L"), fill=color)
+                    continue
+
                 for mask_polygon in observation.get("Mask Polygon", []):
                     points = [(int(point[0]), int(point[1])) for point in mask_polygon]
                     if len(points) > 2: